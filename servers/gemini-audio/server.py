@@ -9,8 +9,15 @@ import json
 import logging
 import os
 import base64
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 import tempfile
 import mimetypes
 
@@ -44,11 +51,354 @@ SUPPORTED_AUDIO_FORMATS = {
     '.weba': 'audio/webm'
 }
 
+# Analysis prompts by kind; analyze_many accepts these names or free-form prompts
+ANALYSIS_PROMPTS = {
+    'comprehensive': """Analyze this audio file and provide a comprehensive analysis including:
+    1. Transcription of any speech
+    2. Audio quality assessment
+    3. Background sounds or music
+    4. Emotional tone or mood
+    5. Language detection (if speech is present)
+    6. Audio duration and characteristics
+    7. Any notable features or content
+    
+    Provide the analysis in a structured format.""",
+    'transcription': """Please transcribe all speech in this audio file. 
+    Provide the transcription with timestamps if possible, and note:
+    - Speaker identification if multiple speakers
+    - Any unclear or inaudible parts
+    - The confidence level of the transcription
+    - Language of the speech""",
+    'music': """Analyze this audio file for musical content:
+    - Genre identification
+    - Instrument recognition
+    - Tempo and rhythm analysis
+    - Mood and energy level
+    - Audio quality assessment
+    - Any vocals or lyrics (transcribe if present)
+    - Similar artists or songs (if recognizable)""",
+    'events': """Analyze this audio file for various audio events and sounds:
+    - Environmental sounds (traffic, nature, crowds, etc.)
+    - Actions or activities (footsteps, doors, machinery, etc.)
+    - Animal sounds
+    - Vehicle sounds
+    - Human activities (typing, cooking, sports, etc.)
+    - Any other notable audio events
+    
+    Provide timestamps and confidence levels for each detected event.""",
+    'quality': """Analyze the technical quality of this audio file:
+    - Audio bitrate and sample rate (if determinable)
+    - Dynamic range and compression
+    - Noise level and signal-to-noise ratio
+    - Clipping or distortion issues
+    - Overall audio quality rating (1-10)
+    - Recommendations for improvement
+    - Suitability for different use cases (podcast, music, speech recognition, etc.)"""
+}
+
+# Upload registry settings
+UPLOAD_TTL_SECONDS = float(os.getenv("GEMINI_UPLOAD_TTL_SECONDS", 3600))
+UPLOAD_CACHE_SIZE = int(os.getenv("GEMINI_UPLOAD_CACHE_SIZE", 32))
+# Gemini deletes uploaded files after 48 hours, so a handle is never reused past this age
+MAX_UPLOAD_TTL_SECONDS = 47 * 3600
+HASH_CHUNK_SIZE = 1024 * 1024
+# Content hashes remembered for (path, size, mtime) identities, least recently used dropped first
+HASH_CACHE_SIZE = 1024
+
+# Concurrency settings: Gemini API calls in flight at once across all tool calls
+MAX_CONCURRENT_REQUESTS = max(1, int(os.getenv("GEMINI_MAX_CONCURRENT_REQUESTS", 16)))
+# Blocking SDK and file calls run here so they never stall the event loop
+_blocking_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS + 4, thread_name_prefix="gemini")
+
+async def run_blocking(func: Callable, *args, **kwargs):
+    """Run a blocking call in the worker pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, functools.partial(func, *args, **kwargs))
+
+# Processing poll settings: the first check is scheduled from the predicted processing
+# time, later checks back off exponentially up to the max interval until the deadline
+POLL_MIN_INTERVAL_SECONDS = float(os.getenv("GEMINI_POLL_MIN_INTERVAL_SECONDS", 0.5))
+POLL_MAX_INTERVAL_SECONDS = float(os.getenv("GEMINI_POLL_MAX_INTERVAL_SECONDS", 15))
+PROCESSING_DEADLINE_SECONDS = float(os.getenv("GEMINI_PROCESSING_DEADLINE_SECONDS", 900))
+# Prediction used until this process has observed a audio file being processed
+DEFAULT_PROCESSING_SECONDS_PER_MB = 0.5
+BYTES_PER_MB = 1024 * 1024
+
+# Pre-upload proxy: when enabled, audio is transcoded with ffmpeg to mono 16 kHz Opus
+# before upload, which is all the model uses of the signal
+UPLOAD_PROXY = os.getenv("GEMINI_UPLOAD_PROXY", "false").lower() in ("1", "true", "yes")
+PROXY_AUDIO_BITRATE = os.getenv("GEMINI_PROXY_AUDIO_BITRATE", "24k")
+PROXY_SUFFIX = '.ogg'
+PROXY_MIME_TYPE = 'audio/ogg'
+PROXY_FFMPEG_ARGS = ['-vn', '-ac', '1', '-ar', '16000', '-c:a', 'libopus', '-b:a', PROXY_AUDIO_BITRATE]
+# Distinguishes proxy uploads from uploads of the original in the upload registry
+PROXY_VARIANT = f"proxy-opus-16k-{PROXY_AUDIO_BITRATE}"
+# Proxy transcodes are CPU-bound, so only a few run at once
+MAX_PROXY_TRANSCODES = max(1, (os.cpu_count() or 2) // 2)
+
+class ProcessingMetrics:
+    """Observed Gemini processing latency per MB, used to predict how long a new upload takes"""
+    
+    def __init__(self, default_seconds_per_mb: float):
+        self.seconds_per_mb = default_seconds_per_mb
+        self.files = 0
+        self.timeouts = 0
+        self.polls = 0
+        self.total_mb = 0.0
+        self.rated_mb = 0.0
+        self.total_seconds = 0.0
+        self.max_seconds_per_mb = 0.0
+        self.last = None
+        self.proxied_files = 0
+        self.proxy_saved_bytes = 0
+    
+    @staticmethod
+    def _size_mb(size_bytes: int) -> float:
+        # Processing has a fixed overhead, so small files are rated as if they were 1 MB
+        return max(size_bytes / BYTES_PER_MB, 1.0)
+    
+    def expected_seconds(self, size_bytes: int) -> float:
+        return self._size_mb(size_bytes) * self.seconds_per_mb
+    
+    def record(self, size_bytes: int, seconds: float, polls: int):
+        size_mb = self._size_mb(size_bytes)
+        rate = seconds / size_mb
+        # Weighted towards recent files so predictions follow the service's current speed
+        self.seconds_per_mb = rate if self.files == 0 else 0.7 * self.seconds_per_mb + 0.3 * rate
+        self.files += 1
+        self.polls += polls
+        self.total_mb += size_bytes / BYTES_PER_MB
+        self.rated_mb += size_mb
+        self.total_seconds += seconds
+        self.max_seconds_per_mb = max(self.max_seconds_per_mb, rate)
+        self.last = {"size_mb": round(size_bytes / BYTES_PER_MB, 2), "seconds": round(seconds, 2), "polls": polls}
+        logger.info(f"Audio processing took {seconds:.1f}s for {size_bytes / BYTES_PER_MB:.1f} MB "
+                    f"({rate:.2f} s/MB, {polls} polls)")
+    
+    def record_proxy(self, original_bytes: int, proxy_bytes: int):
+        self.proxied_files += 1
+        self.proxy_saved_bytes += original_bytes - proxy_bytes
+        logger.info(f"Proxy shrank audio upload from {original_bytes / BYTES_PER_MB:.1f} MB "
+                    f"to {proxy_bytes / BYTES_PER_MB:.1f} MB")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processed_files": self.files,
+            "timeouts": self.timeouts,
+            "polls": self.polls,
+            "processed_mb": round(self.total_mb, 2),
+            "predicted_seconds_per_mb": round(self.seconds_per_mb, 3),
+            "mean_seconds_per_mb": round(self.total_seconds / self.rated_mb, 3) if self.rated_mb else None,
+            "max_seconds_per_mb": round(self.max_seconds_per_mb, 3),
+            "last": self.last,
+            "proxied_files": self.proxied_files,
+            "proxy_saved_mb": round(self.proxy_saved_bytes / BYTES_PER_MB, 2),
+            "deadline_seconds": PROCESSING_DEADLINE_SECONDS
+        }
+
+class UploadRegistry:
+    """Processed Gemini uploads keyed by file content, so repeated analyses of a file skip upload and processing"""
+    
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = min(ttl_seconds, MAX_UPLOAD_TTL_SECONDS)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # content hash -> (remote file, expires at)
+        self._pending = {}  # content hash -> task of an upload in progress
+        self._hashes = OrderedDict()  # (path, size, mtime) -> content hash
+        self._hashes_lock = threading.Lock()  # content_hash runs on worker threads
+        self._in_use = {}  # content hash -> callers currently using its file
+        self._retired = {}  # content hash -> files dropped from the registry while in use
+        self.hits = 0
+        self.uploads = 0
+    
+    def content_hash(self, file_path: str) -> str:
+        """SHA-256 of the file content, remembered while the file is unchanged"""
+        stat = os.stat(file_path)
+        identity = (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._hashes_lock:
+            if identity in self._hashes:
+                self._hashes.move_to_end(identity)
+                return self._hashes[identity]
+        
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        with self._hashes_lock:
+            self._hashes[identity] = digest.hexdigest()
+            while len(self._hashes) > HASH_CACHE_SIZE:
+                self._hashes.popitem(last=False)
+        return digest.hexdigest()
+    
+    @asynccontextmanager
+    async def acquire(self, file_path: str, upload: Callable[[str], Awaitable[Any]], variant: str = ''):
+        """Yield the processed remote file for file_path, uploading it with `upload` only if needed
+        
+        `variant` names how `upload` transforms the file, so differently prepared uploads of the
+        same content are kept apart. A file is never deleted while a caller is inside the block;
+        with reuse disabled it is deleted as soon as the block exits.
+        """
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            file = await upload(file_path)
+            try:
+                yield file
+            finally:
+                self._discard(file)
+            return
+        
+        key = await run_blocking(self.content_hash, file_path)
+        if variant:
+            key = f"{key}:{variant}"
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            yield await self._get_or_upload(key, file_path, upload)
+        finally:
+            self._release(key)
+    
+    async def _get_or_upload(self, key: str, file_path: str, upload: Callable[[str], Awaitable[Any]]):
+        self._expire()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            logger.info(f"Reusing uploaded file {entry[0].name} for {file_path}")
+            return entry[0]
+        
+        # Callers asking for a file that is already being uploaded wait for that upload
+        if key in self._pending:
+            self.hits += 1
+        else:
+            self._pending[key] = asyncio.ensure_future(upload(file_path))
+            self._pending[key].add_done_callback(lambda task: self._finish_upload(key, task))
+        return await asyncio.shield(self._pending[key])
+    
+    def _release(self, key: str):
+        self._in_use[key] -= 1
+        if self._in_use[key] == 0:
+            del self._in_use[key]
+            for file in self._retired.pop(key, []):
+                self._discard(file)
+    
+    def _finish_upload(self, key: str, task: asyncio.Task):
+        self._pending.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self.uploads += 1
+        self._entries[key] = (task.result(), time.monotonic() + self.ttl_seconds)
+        while len(self._entries) > self.max_entries:
+            evicted_key, (file, _) = self._entries.popitem(last=False)
+            self._retire(evicted_key, file)
+    
+    def _expire(self):
+        now = time.monotonic()
+        for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            file, _ = self._entries.pop(key)
+            self._retire(key, file)
+    
+    def _retire(self, key: str, file):
+        """Delete a file dropped from the registry, waiting for callers still using it"""
+        if self._in_use.get(key):
+            self._retired.setdefault(key, []).append(file)
+        else:
+            self._discard(file)
+    
+    def _discard(self, file):
+        """Delete a remote file in the background"""
+        asyncio.get_running_loop().run_in_executor(_blocking_executor, self._delete, file)
+    
+    def _delete(self, file):
+        try:
+            genai.delete_file(file.name)
+            logger.info(f"Deleted uploaded file: {file.name}")
+        except Exception as e:
+            logger.warning(f"Could not delete uploaded file {file.name}: {str(e)}")
+    
+    async def clear(self) -> int:
+        """Delete every registered remote file, deferring files still in use, and return how many were dropped"""
+        count = len(self._entries)
+        idle = []
+        while self._entries:
+            key, (file, _) = self._entries.popitem(last=False)
+            if self._in_use.get(key):
+                self._retired.setdefault(key, []).append(file)
+            else:
+                idle.append(file)
+        await asyncio.gather(*(run_blocking(self._delete, file) for file in idle))
+        return count
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "registered_files": len(self._entries),
+            "uploads_in_progress": len(self._pending),
+            "files_in_use": len(self._in_use),
+            "pending_deletions": sum(len(files) for files in self._retired.values()),
+            "hits": self.hits,
+            "uploads": self.uploads,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries
+        }
+
 class AudioAnalyzer:
     """Audio analysis using Google Gemini API"""
     
     def __init__(self):
         self.model = genai.GenerativeModel('gemini-1.5-pro')
+        self.upload_registry = UploadRegistry(UPLOAD_TTL_SECONDS, UPLOAD_CACHE_SIZE)
+        self.processing_metrics = ProcessingMetrics(DEFAULT_PROCESSING_SECONDS_PER_MB)
+        self._request_slots = None
+        self._transcode_slots = None
+    
+    def _slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent API calls, created inside the running event loop"""
+        if self._request_slots is None:
+            self._request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        return self._request_slots
+    
+    async def _call_api(self, func: Callable, *args, **kwargs):
+        """Run a blocking Gemini SDK call off the event loop, holding a request slot"""
+        async with self._slots():
+            return await run_blocking(func, *args, **kwargs)
+    
+    async def _make_proxy(self, file_path: str) -> Optional[str]:
+        """Transcode to a temporary proxy file with ffmpeg; None means the original should be uploaded"""
+        if self._transcode_slots is None:
+            self._transcode_slots = asyncio.Semaphore(MAX_PROXY_TRANSCODES)
+        
+        fd, proxy_path = tempfile.mkstemp(prefix="gemini-proxy-", suffix=PROXY_SUFFIX)
+        os.close(fd)
+        try:
+            async with self._transcode_slots:
+                process = await asyncio.create_subprocess_exec(
+                    'ffmpeg', '-v', 'error', '-nostdin', '-y', '-i', file_path, *PROXY_FFMPEG_ARGS, proxy_path,
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+                )
+                try:
+                    _, stderr = await process.communicate()
+                except asyncio.CancelledError:
+                    process.kill()
+                    raise
+            
+            if process.returncode != 0:
+                logger.warning(f"Proxy transcode failed for {file_path}, uploading original: "
+                               f"{stderr.decode(errors='replace').strip()[-500:]}")
+            else:
+                original_size, proxy_size = os.path.getsize(file_path), os.path.getsize(proxy_path)
+                if proxy_size < original_size:
+                    self.processing_metrics.record_proxy(original_size, proxy_size)
+                    return proxy_path
+        except FileNotFoundError:
+            logger.warning("ffmpeg not found, uploading original file without a proxy")
+        except BaseException:
+            os.remove(proxy_path)
+            raise
+        
+        os.remove(proxy_path)
+        return None
+    
+    async def _generate(self, uploaded_file, prompt: str):
+        """Generate content for an uploaded file with the async client, holding a request slot"""
+        async with self._slots():
+            return await self.model.generate_content_async([uploaded_file, prompt])
     
     def _validate_audio_file(self, file_path: str) -> str:
         """Validate audio file and return MIME type"""
@@ -63,47 +413,65 @@ class AudioAnalyzer:
         return SUPPORTED_AUDIO_FORMATS[extension]
     
     async def upload_audio_file(self, file_path: str):
-        """Upload audio file to Gemini"""
+        """Upload audio file to Gemini, as a mono 16 kHz proxy when enabled"""
         mime_type = self._validate_audio_file(file_path)
+        proxy_path = await self._make_proxy(file_path) if UPLOAD_PROXY else None
         
         # Upload the file
-        file = genai.upload_file(file_path, mime_type=mime_type)
+        try:
+            upload_path = proxy_path or file_path
+            file = await self._call_api(genai.upload_file, upload_path, mime_type=PROXY_MIME_TYPE if proxy_path else mime_type)
+            upload_size = os.path.getsize(upload_path)
+        finally:
+            if proxy_path:
+                os.remove(proxy_path)
         logger.info(f"Uploaded audio file: {file.name}")
         
         # Wait for processing
-        while file.state.name == "PROCESSING":
-            await asyncio.sleep(1)
-            file = genai.get_file(file.name)
+        file = await self._wait_for_processing(file, upload_size)
         
         if file.state.name == "FAILED":
             raise ValueError(f"Audio file processing failed: {file.state}")
         
         return file
     
+    async def _wait_for_processing(self, file, size_bytes: int):
+        """Poll an uploaded file until it leaves PROCESSING, backing off from a size-based first check"""
+        started = time.monotonic()
+        deadline = started + PROCESSING_DEADLINE_SECONDS
+        expected = self.processing_metrics.expected_seconds(size_bytes)
+        delay = min(max(expected / 2, POLL_MIN_INTERVAL_SECONDS), POLL_MAX_INTERVAL_SECONDS)
+        polls = 0
+        
+        while file.state.name == "PROCESSING":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.processing_metrics.timeouts += 1
+                await run_blocking(self.upload_registry._delete, file)
+                raise TimeoutError(f"Audio file processing did not finish within {PROCESSING_DEADLINE_SECONDS:.0f}s: {file.name}")
+            await asyncio.sleep(min(delay, remaining))
+            file = await self._call_api(genai.get_file, file.name)
+            polls += 1
+            delay = min(delay * 2, POLL_MAX_INTERVAL_SECONDS)
+        
+        if file.state.name != "FAILED":
+            self.processing_metrics.record(size_bytes, time.monotonic() - started, polls)
+        return file
+    
     async def analyze_audio(self, file_path: str, prompt: str = None) -> Dict[str, Any]:
         """Analyze audio file with optional custom prompt"""
         try:
-            # Upload and process the audio file
-            uploaded_file = await self.upload_audio_file(file_path)
-            
-            # Default analysis prompt
-            if not prompt:
-                prompt = """Analyze this audio file and provide a comprehensive analysis including:
-                1. Transcription of any speech
-                2. Audio quality assessment
-                3. Background sounds or music
-                4. Emotional tone or mood
-                5. Language detection (if speech is present)
-                6. Audio duration and characteristics
-                7. Any notable features or content
+            # Upload and process the audio file, or reuse an earlier upload of the same content
+            self._validate_audio_file(file_path)
+            async with self.upload_registry.acquire(
+                file_path, self.upload_audio_file, PROXY_VARIANT if UPLOAD_PROXY else ''
+            ) as uploaded_file:
+                # Default analysis prompt
+                if not prompt:
+                    prompt = ANALYSIS_PROMPTS['comprehensive']
                 
-                Provide the analysis in a structured format."""
-            
-            # Generate content using the audio file
-            response = self.model.generate_content([uploaded_file, prompt])
-            
-            # Clean up the uploaded file
-            genai.delete_file(uploaded_file.name)
+                # Generate content using the audio file
+                response = await self._generate(uploaded_file, prompt)
             
             return {
                 "analysis": response.text,
@@ -120,41 +488,49 @@ class AudioAnalyzer:
     
     async def transcribe_audio(self, file_path: str) -> Dict[str, Any]:
         """Transcribe speech from audio file"""
-        prompt = """Please transcribe all speech in this audio file. 
-        Provide the transcription with timestamps if possible, and note:
-        - Speaker identification if multiple speakers
-        - Any unclear or inaudible parts
-        - The confidence level of the transcription
-        - Language of the speech"""
-        
-        return await self.analyze_audio(file_path, prompt)
+        return await self.analyze_audio(file_path, ANALYSIS_PROMPTS['transcription'])
     
     async def identify_music(self, file_path: str) -> Dict[str, Any]:
         """Identify music and audio characteristics"""
-        prompt = """Analyze this audio file for musical content:
-        - Genre identification
-        - Instrument recognition
-        - Tempo and rhythm analysis
-        - Mood and energy level
-        - Audio quality assessment
-        - Any vocals or lyrics (transcribe if present)
-        - Similar artists or songs (if recognizable)"""
-        
-        return await self.analyze_audio(file_path, prompt)
+        return await self.analyze_audio(file_path, ANALYSIS_PROMPTS['music'])
     
     async def detect_audio_events(self, file_path: str) -> Dict[str, Any]:
         """Detect and classify audio events"""
-        prompt = """Analyze this audio file for various audio events and sounds:
-        - Environmental sounds (traffic, nature, crowds, etc.)
-        - Actions or activities (footsteps, doors, machinery, etc.)
-        - Animal sounds
-        - Vehicle sounds
-        - Human activities (typing, cooking, sports, etc.)
-        - Any other notable audio events
+        return await self.analyze_audio(file_path, ANALYSIS_PROMPTS['events'])
+    
+    async def analyze_many(self, file_path: str, analyses: List[str]) -> Dict[str, Any]:
+        """Run several analyses of one audio file on a single upload, generating concurrently"""
+        if not analyses:
+            raise ValueError("At least one analysis kind or prompt is required")
+        
+        mime_type = self._validate_audio_file(file_path)
+        async with self.upload_registry.acquire(
+            file_path, self.upload_audio_file, PROXY_VARIANT if UPLOAD_PROXY else ''
+        ) as uploaded_file:
+            # Named kinds resolve to their prompt; anything else is sent as a custom prompt
+            requests = list(dict.fromkeys(analyses))
+            prompts = [ANALYSIS_PROMPTS.get(request, request) for request in requests]
+            responses = await asyncio.gather(
+                *(self._generate(uploaded_file, prompt) for prompt in prompts),
+                return_exceptions=True
+            )
         
-        Provide timestamps and confidence levels for each detected event."""
+        results = {}
+        for request, response in zip(requests, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Error in audio analysis '{request[:40]}': {str(response)}")
+                results[request] = {"success": False, "error": str(response)}
+            else:
+                results[request] = {"success": True, "analysis": response.text}
         
-        return await self.analyze_audio(file_path, prompt)
+        return {
+            "results": results,
+            "file_info": {
+                "name": Path(file_path).name,
+                "size": Path(file_path).stat().st_size,
+                "mime_type": mime_type
+            }
+        }
 
 # Initialize analyzer
 audio_analyzer = AudioAnalyzer()
@@ -276,17 +652,8 @@ async def audio_quality_check(file_path: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing audio quality assessment
     """
-    prompt = """Analyze the technical quality of this audio file:
-    - Audio bitrate and sample rate (if determinable)
-    - Dynamic range and compression
-    - Noise level and signal-to-noise ratio
-    - Clipping or distortion issues
-    - Overall audio quality rating (1-10)
-    - Recommendations for improvement
-    - Suitability for different use cases (podcast, music, speech recognition, etc.)"""
-    
     try:
-        result = await audio_analyzer.analyze_audio(file_path, prompt)
+        result = await audio_analyzer.analyze_audio(file_path, ANALYSIS_PROMPTS['quality'])
         return {
             "success": True,
             "quality_analysis": result
@@ -297,6 +664,65 @@ async def audio_quality_check(file_path: str) -> Dict[str, Any]:
             "error": str(e)
         }
 
+@mcp.tool()
+async def analyze_many(file_path: str, analyses: List[str]) -> Dict[str, Any]:
+    """
+    Run several analyses of one audio file with a single upload and concurrent model calls.
+    
+    Args:
+        file_path: Path to the audio file to analyze
+        analyses: Analysis kinds (comprehensive, transcription, music, events, quality) or custom prompts
+    
+    Returns:
+        Dictionary containing a result per requested analysis, keyed by kind or prompt
+    """
+    try:
+        result = await audio_analyzer.analyze_many(file_path, analyses)
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@mcp.tool()
+async def get_processing_metrics() -> Dict[str, Any]:
+    """
+    Get observed Gemini processing latency and upload reuse statistics.
+    
+    Returns:
+        Dictionary containing per-MB processing latency metrics and upload registry statistics
+    """
+    return {
+        "success": True,
+        "processing": audio_analyzer.processing_metrics.stats(),
+        "registry": audio_analyzer.upload_registry.stats()
+    }
+
+@mcp.tool()
+async def clear_upload_cache() -> Dict[str, Any]:
+    """
+    Delete every audio file this server keeps uploaded to Gemini for reuse.
+    
+    Returns:
+        Dictionary containing the number of deleted files and registry statistics
+    """
+    try:
+        deleted = await audio_analyzer.upload_registry.clear()
+        return {
+            "success": True,
+            "deleted_files": deleted,
+            "registry": audio_analyzer.upload_registry.stats()
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
 if __name__ == "__main__":
     # Run the MCP server
     mcp.run()
@@ -9,8 +9,14 @@ import json
 import logging
 import os
 import base64
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 import tempfile
 import mimetypes
 import time
@@ -45,11 +51,492 @@ SUPPORTED_VIDEO_FORMATS = {
     '.m4v': 'video/mp4'
 }
 
+# Analysis prompts by kind; analyze_many accepts these names or free-form prompts
+ANALYSIS_PROMPTS = {
+    'comprehensive': """Analyze this video comprehensively and provide detailed insights including:
+    
+    1. **Visual Content Analysis:**
+       - Scene descriptions and key visual elements
+       - Objects, people, and activities identified
+       - Setting and environment description
+       - Color schemes and visual composition
+    
+    2. **Motion and Action Analysis:**
+       - Camera movements and angles
+       - Subject movements and actions
+       - Scene transitions and cuts
+       - Overall pacing and rhythm
+    
+    3. **Audio Content (if present):**
+       - Speech transcription and speaker identification
+       - Background music or sound effects
+       - Audio quality and clarity
+       - Emotional tone from audio
+    
+    4. **Technical Analysis:**
+       - Video quality and resolution assessment
+       - Lighting conditions and quality
+       - Production quality evaluation
+       - Any technical issues noticed
+    
+    5. **Content Classification:**
+       - Genre or category identification
+       - Target audience assessment
+       - Content themes and messages
+       - Emotional impact and mood
+    
+    6. **Temporal Analysis:**
+       - Key moments and timestamps
+       - Story structure or progression
+       - Important events chronologically
+    
+    Please provide the analysis in a well-structured format with clear sections.""",
+    'scenes': """Analyze this video and extract key scenes. For each scene, provide:
+    
+    - Scene number and approximate timestamp
+    - Detailed visual description
+    - Key objects, people, and actions
+    - Setting and location description
+    - Emotional tone or mood of the scene
+    - Significance or importance to the overall content
+    - Any dialogue or important audio elements
+    
+    Focus on identifying distinct scenes and major transitions. Provide timestamps where possible.""",
+    'transcription': """Transcribe all speech and dialogue in this video. Provide:
+    
+    - Complete transcription of all spoken words
+    - Speaker identification (if multiple speakers)
+    - Timestamps for different segments
+    - Tone and emotional delivery notes
+    - Any background audio or music descriptions
+    - Confidence level of transcription
+    - Language identification
+    - Non-verbal audio cues (laughter, applause, etc.)
+    
+    Format the output as a clear transcript with speaker labels and timestamps.""",
+    'objects': """Analyze this video to identify and catalog all visible elements:
+    
+    **People:**
+    - Number of people visible
+    - Age groups and demographics
+    - Clothing and appearance descriptions
+    - Actions and behaviors
+    - Facial expressions and emotions (if visible)
+    
+    **Objects:**
+    - All significant objects and items
+    - Brands or text visible in the video
+    - Technology and devices shown
+    - Furniture and environment elements
+    
+    **Locations and Settings:**
+    - Indoor/outdoor classification
+    - Type of location (office, home, street, etc.)
+    - Architectural features
+    - Geographic or cultural indicators
+    
+    **Activities and Events:**
+    - Main activities taking place
+    - Interactions between people
+    - Use of objects and tools
+    
+    Provide detailed descriptions and timestamps where possible.""",
+    'quality': """Analyze the technical quality of this video and provide assessment on:
+    
+    **Visual Quality:**
+    - Resolution and clarity assessment
+    - Color accuracy and saturation
+    - Brightness and contrast levels
+    - Sharpness and focus quality
+    - Any visual artifacts or issues
+    
+    **Production Quality:**
+    - Camera work and stability
+    - Framing and composition
+    - Lighting quality and consistency
+    - Professional production indicators
+    
+    **Audio Quality:**
+    - Audio clarity and volume levels
+    - Background noise assessment
+    - Audio-video synchronization
+    - Overall sound production quality
+    
+    **Technical Issues:**
+    - Compression artifacts
+    - Frame rate issues
+    - Any glitches or problems
+    - File corruption indicators
+    
+    **Overall Assessment:**
+    - Quality rating (1-10 scale)
+    - Suitability for different purposes
+    - Recommendations for improvement
+    - Best use cases for this video quality level""",
+    'activities': """Analyze this video to detect and classify all actions and activities:
+    
+    **Human Actions:**
+    - Physical movements and gestures
+    - Facial expressions and emotions
+    - Interactions with objects or people
+    - Sports or exercise activities
+    - Work-related activities
+    
+    **Environmental Activities:**
+    - Weather conditions and changes
+    - Traffic and vehicle movements
+    - Nature activities (animals, water, etc.)
+    - Crowd movements and behaviors
+    
+    **Event Detection:**
+    - Meetings or presentations
+    - Entertainment or performance events
+    - Educational or instructional content
+    - Social gatherings or celebrations
+    
+    **Temporal Analysis:**
+    - Duration of each activity
+    - Sequence and order of events
+    - Simultaneous activities
+    - Activity transitions and changes
+    
+    Provide timestamps and confidence levels for each detected activity.""",
+    'content_safety': """Analyze this video for content safety and appropriateness:
+    
+    **Content Classification:**
+    - Age appropriateness rating
+    - Content category (educational, entertainment, etc.)
+    - Target audience identification
+    
+    **Safety Assessment:**
+    - Potentially sensitive content identification
+    - Violence or aggressive behavior detection
+    - Inappropriate language or content
+    - Adult content indicators
+    
+    **Compliance Analysis:**
+    - Platform suitability (YouTube, social media, etc.)
+    - Educational content assessment
+    - Professional content evaluation
+    
+    **Content Themes:**
+    - Main topics and subjects covered
+    - Educational value assessment
+    - Entertainment value evaluation
+    - Information accuracy (if factual content)
+    
+    Provide recommendations for content usage and distribution."""
+}
+
+# Upload registry settings
+UPLOAD_TTL_SECONDS = float(os.getenv("GEMINI_UPLOAD_TTL_SECONDS", 3600))
+UPLOAD_CACHE_SIZE = int(os.getenv("GEMINI_UPLOAD_CACHE_SIZE", 32))
+# Gemini deletes uploaded files after 48 hours, so a handle is never reused past this age
+MAX_UPLOAD_TTL_SECONDS = 47 * 3600
+HASH_CHUNK_SIZE = 1024 * 1024
+# Content hashes remembered for (path, size, mtime) identities, least recently used dropped first
+HASH_CACHE_SIZE = 1024
+
+# Concurrency settings: Gemini API calls in flight at once across all tool calls
+MAX_CONCURRENT_REQUESTS = max(1, int(os.getenv("GEMINI_MAX_CONCURRENT_REQUESTS", 16)))
+# Blocking SDK and file calls run here so they never stall the event loop
+_blocking_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS + 4, thread_name_prefix="gemini")
+
+async def run_blocking(func: Callable, *args, **kwargs):
+    """Run a blocking call in the worker pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, functools.partial(func, *args, **kwargs))
+
+# Processing poll settings: the first check is scheduled from the predicted processing
+# time, later checks back off exponentially up to the max interval until the deadline
+POLL_MIN_INTERVAL_SECONDS = float(os.getenv("GEMINI_POLL_MIN_INTERVAL_SECONDS", 0.5))
+POLL_MAX_INTERVAL_SECONDS = float(os.getenv("GEMINI_POLL_MAX_INTERVAL_SECONDS", 15))
+PROCESSING_DEADLINE_SECONDS = float(os.getenv("GEMINI_PROCESSING_DEADLINE_SECONDS", 900))
+# Prediction used until this process has observed a video file being processed
+DEFAULT_PROCESSING_SECONDS_PER_MB = 2.0
+BYTES_PER_MB = 1024 * 1024
+
+# Pre-upload proxy: when enabled, videos are transcoded with ffmpeg to a small low-frame-rate
+# copy before upload, since the model samples video at about 1 fps
+UPLOAD_PROXY = os.getenv("GEMINI_UPLOAD_PROXY", "false").lower() in ("1", "true", "yes")
+PROXY_FPS = float(os.getenv("GEMINI_PROXY_FPS", 1))
+PROXY_HEIGHT = int(os.getenv("GEMINI_PROXY_HEIGHT", 720))
+PROXY_SUFFIX = '.mp4'
+PROXY_MIME_TYPE = 'video/mp4'
+PROXY_FFMPEG_ARGS = [
+    '-vf', f"fps={PROXY_FPS:g},scale=-2:'min({PROXY_HEIGHT},ih)'",
+    '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '28', '-pix_fmt', 'yuv420p',
+    '-c:a', 'aac', '-ac', '1', '-ar', '16000', '-b:a', '32k',
+    '-movflags', '+faststart'
+]
+# Distinguishes proxy uploads from uploads of the original in the upload registry
+PROXY_VARIANT = f"proxy-{PROXY_FPS:g}fps-{PROXY_HEIGHT}p"
+# Proxy transcodes are CPU-bound, so only a few run at once
+MAX_PROXY_TRANSCODES = max(1, (os.cpu_count() or 2) // 2)
+
+class ProcessingMetrics:
+    """Observed Gemini processing latency per MB, used to predict how long a new upload takes"""
+    
+    def __init__(self, default_seconds_per_mb: float):
+        self.seconds_per_mb = default_seconds_per_mb
+        self.files = 0
+        self.timeouts = 0
+        self.polls = 0
+        self.total_mb = 0.0
+        self.rated_mb = 0.0
+        self.total_seconds = 0.0
+        self.max_seconds_per_mb = 0.0
+        self.last = None
+        self.proxied_files = 0
+        self.proxy_saved_bytes = 0
+    
+    @staticmethod
+    def _size_mb(size_bytes: int) -> float:
+        # Processing has a fixed overhead, so small files are rated as if they were 1 MB
+        return max(size_bytes / BYTES_PER_MB, 1.0)
+    
+    def expected_seconds(self, size_bytes: int) -> float:
+        return self._size_mb(size_bytes) * self.seconds_per_mb
+    
+    def record(self, size_bytes: int, seconds: float, polls: int):
+        size_mb = self._size_mb(size_bytes)
+        rate = seconds / size_mb
+        # Weighted towards recent files so predictions follow the service's current speed
+        self.seconds_per_mb = rate if self.files == 0 else 0.7 * self.seconds_per_mb + 0.3 * rate
+        self.files += 1
+        self.polls += polls
+        self.total_mb += size_bytes / BYTES_PER_MB
+        self.rated_mb += size_mb
+        self.total_seconds += seconds
+        self.max_seconds_per_mb = max(self.max_seconds_per_mb, rate)
+        self.last = {"size_mb": round(size_bytes / BYTES_PER_MB, 2), "seconds": round(seconds, 2), "polls": polls}
+        logger.info(f"Video processing took {seconds:.1f}s for {size_bytes / BYTES_PER_MB:.1f} MB "
+                    f"({rate:.2f} s/MB, {polls} polls)")
+    
+    def record_proxy(self, original_bytes: int, proxy_bytes: int):
+        self.proxied_files += 1
+        self.proxy_saved_bytes += original_bytes - proxy_bytes
+        logger.info(f"Proxy shrank video upload from {original_bytes / BYTES_PER_MB:.1f} MB "
+                    f"to {proxy_bytes / BYTES_PER_MB:.1f} MB")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processed_files": self.files,
+            "timeouts": self.timeouts,
+            "polls": self.polls,
+            "processed_mb": round(self.total_mb, 2),
+            "predicted_seconds_per_mb": round(self.seconds_per_mb, 3),
+            "mean_seconds_per_mb": round(self.total_seconds / self.rated_mb, 3) if self.rated_mb else None,
+            "max_seconds_per_mb": round(self.max_seconds_per_mb, 3),
+            "last": self.last,
+            "proxied_files": self.proxied_files,
+            "proxy_saved_mb": round(self.proxy_saved_bytes / BYTES_PER_MB, 2),
+            "deadline_seconds": PROCESSING_DEADLINE_SECONDS
+        }
+
+class UploadRegistry:
+    """Processed Gemini uploads keyed by file content, so repeated analyses of a file skip upload and processing"""
+    
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = min(ttl_seconds, MAX_UPLOAD_TTL_SECONDS)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # content hash -> (remote file, expires at)
+        self._pending = {}  # content hash -> task of an upload in progress
+        self._hashes = OrderedDict()  # (path, size, mtime) -> content hash
+        self._hashes_lock = threading.Lock()  # content_hash runs on worker threads
+        self._in_use = {}  # content hash -> callers currently using its file
+        self._retired = {}  # content hash -> files dropped from the registry while in use
+        self.hits = 0
+        self.uploads = 0
+    
+    def content_hash(self, file_path: str) -> str:
+        """SHA-256 of the file content, remembered while the file is unchanged"""
+        stat = os.stat(file_path)
+        identity = (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._hashes_lock:
+            if identity in self._hashes:
+                self._hashes.move_to_end(identity)
+                return self._hashes[identity]
+        
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        with self._hashes_lock:
+            self._hashes[identity] = digest.hexdigest()
+            while len(self._hashes) > HASH_CACHE_SIZE:
+                self._hashes.popitem(last=False)
+        return digest.hexdigest()
+    
+    @asynccontextmanager
+    async def acquire(self, file_path: str, upload: Callable[[str], Awaitable[Any]], variant: str = ''):
+        """Yield the processed remote file for file_path, uploading it with `upload` only if needed
+        
+        `variant` names how `upload` transforms the file, so differently prepared uploads of the
+        same content are kept apart. A file is never deleted while a caller is inside the block;
+        with reuse disabled it is deleted as soon as the block exits.
+        """
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            file = await upload(file_path)
+            try:
+                yield file
+            finally:
+                self._discard(file)
+            return
+        
+        key = await run_blocking(self.content_hash, file_path)
+        if variant:
+            key = f"{key}:{variant}"
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            yield await self._get_or_upload(key, file_path, upload)
+        finally:
+            self._release(key)
+    
+    async def _get_or_upload(self, key: str, file_path: str, upload: Callable[[str], Awaitable[Any]]):
+        self._expire()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            logger.info(f"Reusing uploaded file {entry[0].name} for {file_path}")
+            return entry[0]
+        
+        # Callers asking for a file that is already being uploaded wait for that upload
+        if key in self._pending:
+            self.hits += 1
+        else:
+            self._pending[key] = asyncio.ensure_future(upload(file_path))
+            self._pending[key].add_done_callback(lambda task: self._finish_upload(key, task))
+        return await asyncio.shield(self._pending[key])
+    
+    def _release(self, key: str):
+        self._in_use[key] -= 1
+        if self._in_use[key] == 0:
+            del self._in_use[key]
+            for file in self._retired.pop(key, []):
+                self._discard(file)
+    
+    def _finish_upload(self, key: str, task: asyncio.Task):
+        self._pending.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self.uploads += 1
+        self._entries[key] = (task.result(), time.monotonic() + self.ttl_seconds)
+        while len(self._entries) > self.max_entries:
+            evicted_key, (file, _) = self._entries.popitem(last=False)
+            self._retire(evicted_key, file)
+    
+    def _expire(self):
+        now = time.monotonic()
+        for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            file, _ = self._entries.pop(key)
+            self._retire(key, file)
+    
+    def _retire(self, key: str, file):
+        """Delete a file dropped from the registry, waiting for callers still using it"""
+        if self._in_use.get(key):
+            self._retired.setdefault(key, []).append(file)
+        else:
+            self._discard(file)
+    
+    def _discard(self, file):
+        """Delete a remote file in the background"""
+        asyncio.get_running_loop().run_in_executor(_blocking_executor, self._delete, file)
+    
+    def _delete(self, file):
+        try:
+            genai.delete_file(file.name)
+            logger.info(f"Deleted uploaded file: {file.name}")
+        except Exception as e:
+            logger.warning(f"Could not delete uploaded file {file.name}: {str(e)}")
+    
+    async def clear(self) -> int:
+        """Delete every registered remote file, deferring files still in use, and return how many were dropped"""
+        count = len(self._entries)
+        idle = []
+        while self._entries:
+            key, (file, _) = self._entries.popitem(last=False)
+            if self._in_use.get(key):
+                self._retired.setdefault(key, []).append(file)
+            else:
+                idle.append(file)
+        await asyncio.gather(*(run_blocking(self._delete, file) for file in idle))
+        return count
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "registered_files": len(self._entries),
+            "uploads_in_progress": len(self._pending),
+            "files_in_use": len(self._in_use),
+            "pending_deletions": sum(len(files) for files in self._retired.values()),
+            "hits": self.hits,
+            "uploads": self.uploads,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries
+        }
+
 class VideoAnalyzer:
     """Video analysis using Google Gemini API"""
     
     def __init__(self):
         self.model = genai.GenerativeModel('gemini-1.5-pro')
+        self.upload_registry = UploadRegistry(UPLOAD_TTL_SECONDS, UPLOAD_CACHE_SIZE)
+        self.processing_metrics = ProcessingMetrics(DEFAULT_PROCESSING_SECONDS_PER_MB)
+        self._request_slots = None
+        self._transcode_slots = None
+    
+    def _slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent API calls, created inside the running event loop"""
+        if self._request_slots is None:
+            self._request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        return self._request_slots
+    
+    async def _call_api(self, func: Callable, *args, **kwargs):
+        """Run a blocking Gemini SDK call off the event loop, holding a request slot"""
+        async with self._slots():
+            return await run_blocking(func, *args, **kwargs)
+    
+    async def _make_proxy(self, file_path: str) -> Optional[str]:
+        """Transcode to a temporary proxy file with ffmpeg; None means the original should be uploaded"""
+        if self._transcode_slots is None:
+            self._transcode_slots = asyncio.Semaphore(MAX_PROXY_TRANSCODES)
+        
+        fd, proxy_path = tempfile.mkstemp(prefix="gemini-proxy-", suffix=PROXY_SUFFIX)
+        os.close(fd)
+        try:
+            async with self._transcode_slots:
+                process = await asyncio.create_subprocess_exec(
+                    'ffmpeg', '-v', 'error', '-nostdin', '-y', '-i', file_path, *PROXY_FFMPEG_ARGS, proxy_path,
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+                )
+                try:
+                    _, stderr = await process.communicate()
+                except asyncio.CancelledError:
+                    process.kill()
+                    raise
+            
+            if process.returncode != 0:
+                logger.warning(f"Proxy transcode failed for {file_path}, uploading original: "
+                               f"{stderr.decode(errors='replace').strip()[-500:]}")
+            else:
+                original_size, proxy_size = os.path.getsize(file_path), os.path.getsize(proxy_path)
+                if proxy_size < original_size:
+                    self.processing_metrics.record_proxy(original_size, proxy_size)
+                    return proxy_path
+        except FileNotFoundError:
+            logger.warning("ffmpeg not found, uploading original file without a proxy")
+        except BaseException:
+            os.remove(proxy_path)
+            raise
+        
+        os.remove(proxy_path)
+        return None
+    
+    async def _generate(self, uploaded_file, prompt: str):
+        """Generate content for an uploaded file with the async client, holding a request slot"""
+        async with self._slots():
+            return await self.model.generate_content_async([uploaded_file, prompt])
     
     def _validate_video_file(self, file_path: str) -> str:
         """Validate video file and return MIME type"""
@@ -64,18 +551,22 @@ class VideoAnalyzer:
         return SUPPORTED_VIDEO_FORMATS[extension]
     
     async def upload_video_file(self, file_path: str):
-        """Upload video file to Gemini"""
+        """Upload video file to Gemini, as a low-frame-rate proxy when enabled"""
         mime_type = self._validate_video_file(file_path)
+        proxy_path = await self._make_proxy(file_path) if UPLOAD_PROXY else None
         
         # Upload the file
-        file = genai.upload_file(file_path, mime_type=mime_type)
+        try:
+            upload_path = proxy_path or file_path
+            file = await self._call_api(genai.upload_file, upload_path, mime_type=PROXY_MIME_TYPE if proxy_path else mime_type)
+            upload_size = os.path.getsize(upload_path)
+        finally:
+            if proxy_path:
+                os.remove(proxy_path)
         logger.info(f"Uploaded video file: {file.name}")
         
         # Wait for processing
-        while file.state.name == "PROCESSING":
-            logger.info("Video processing... waiting")
-            await asyncio.sleep(2)
-            file = genai.get_file(file.name)
+        file = await self._wait_for_processing(file, upload_size)
         
         if file.state.name == "FAILED":
             raise ValueError(f"Video file processing failed: {file.state}")
@@ -83,58 +574,44 @@ class VideoAnalyzer:
         logger.info(f"Video processing completed: {file.state.name}")
         return file
     
+    async def _wait_for_processing(self, file, size_bytes: int):
+        """Poll an uploaded file until it leaves PROCESSING, backing off from a size-based first check"""
+        started = time.monotonic()
+        deadline = started + PROCESSING_DEADLINE_SECONDS
+        expected = self.processing_metrics.expected_seconds(size_bytes)
+        delay = min(max(expected / 2, POLL_MIN_INTERVAL_SECONDS), POLL_MAX_INTERVAL_SECONDS)
+        polls = 0
+        
+        while file.state.name == "PROCESSING":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.processing_metrics.timeouts += 1
+                await run_blocking(self.upload_registry._delete, file)
+                raise TimeoutError(f"Video file processing did not finish within {PROCESSING_DEADLINE_SECONDS:.0f}s: {file.name}")
+            logger.info("Video processing... waiting")
+            await asyncio.sleep(min(delay, remaining))
+            file = await self._call_api(genai.get_file, file.name)
+            polls += 1
+            delay = min(delay * 2, POLL_MAX_INTERVAL_SECONDS)
+        
+        if file.state.name != "FAILED":
+            self.processing_metrics.record(size_bytes, time.monotonic() - started, polls)
+        return file
+    
     async def analyze_video(self, file_path: str, prompt: str = None) -> Dict[str, Any]:
         """Analyze video file with optional custom prompt"""
         try:
-            # Upload and process the video file
-            uploaded_file = await self.upload_video_file(file_path)
-            
-            # Default analysis prompt
-            if not prompt:
-                prompt = """Analyze this video comprehensively and provide detailed insights including:
-                
-                1. **Visual Content Analysis:**
-                   - Scene descriptions and key visual elements
-                   - Objects, people, and activities identified
-                   - Setting and environment description
-                   - Color schemes and visual composition
+            # Upload and process the video file, or reuse an earlier upload of the same content
+            self._validate_video_file(file_path)
+            async with self.upload_registry.acquire(
+                file_path, self.upload_video_file, PROXY_VARIANT if UPLOAD_PROXY else ''
+            ) as uploaded_file:
+                # Default analysis prompt
+                if not prompt:
+                    prompt = ANALYSIS_PROMPTS['comprehensive']
                 
-                2. **Motion and Action Analysis:**
-                   - Camera movements and angles
-                   - Subject movements and actions
-                   - Scene transitions and cuts
-                   - Overall pacing and rhythm
-                
-                3. **Audio Content (if present):**
-                   - Speech transcription and speaker identification
-                   - Background music or sound effects
-                   - Audio quality and clarity
-                   - Emotional tone from audio
-                
-                4. **Technical Analysis:**
-                   - Video quality and resolution assessment
-                   - Lighting conditions and quality
-                   - Production quality evaluation
-                   - Any technical issues noticed
-                
-                5. **Content Classification:**
-                   - Genre or category identification
-                   - Target audience assessment
-                   - Content themes and messages
-                   - Emotional impact and mood
-                
-                6. **Temporal Analysis:**
-                   - Key moments and timestamps
-                   - Story structure or progression
-                   - Important events chronologically
-                
-                Please provide the analysis in a well-structured format with clear sections."""
-            
-            # Generate content using the video file
-            response = self.model.generate_content([uploaded_file, prompt])
-            
-            # Clean up the uploaded file
-            genai.delete_file(uploaded_file.name)
+                # Generate content using the video file
+                response = await self._generate(uploaded_file, prompt)
             
             return {
                 "analysis": response.text,
@@ -151,138 +628,57 @@ class VideoAnalyzer:
     
     async def extract_scenes(self, file_path: str) -> Dict[str, Any]:
         """Extract and describe key scenes from video"""
-        prompt = """Analyze this video and extract key scenes. For each scene, provide:
-        
-        - Scene number and approximate timestamp
-        - Detailed visual description
-        - Key objects, people, and actions
-        - Setting and location description
-        - Emotional tone or mood of the scene
-        - Significance or importance to the overall content
-        - Any dialogue or important audio elements
-        
-        Focus on identifying distinct scenes and major transitions. Provide timestamps where possible."""
-        
-        return await self.analyze_video(file_path, prompt)
+        return await self.analyze_video(file_path, ANALYSIS_PROMPTS['scenes'])
     
     async def transcribe_video_speech(self, file_path: str) -> Dict[str, Any]:
         """Transcribe all speech and dialogue from video"""
-        prompt = """Transcribe all speech and dialogue in this video. Provide:
-        
-        - Complete transcription of all spoken words
-        - Speaker identification (if multiple speakers)
-        - Timestamps for different segments
-        - Tone and emotional delivery notes
-        - Any background audio or music descriptions
-        - Confidence level of transcription
-        - Language identification
-        - Non-verbal audio cues (laughter, applause, etc.)
-        
-        Format the output as a clear transcript with speaker labels and timestamps."""
-        
-        return await self.analyze_video(file_path, prompt)
+        return await self.analyze_video(file_path, ANALYSIS_PROMPTS['transcription'])
     
     async def identify_objects_people(self, file_path: str) -> Dict[str, Any]:
         """Identify and catalog objects, people, and entities in the video"""
-        prompt = """Analyze this video to identify and catalog all visible elements:
-        
-        **People:**
-        - Number of people visible
-        - Age groups and demographics
-        - Clothing and appearance descriptions
-        - Actions and behaviors
-        - Facial expressions and emotions (if visible)
-        
-        **Objects:**
-        - All significant objects and items
-        - Brands or text visible in the video
-        - Technology and devices shown
-        - Furniture and environment elements
-        
-        **Locations and Settings:**
-        - Indoor/outdoor classification
-        - Type of location (office, home, street, etc.)
-        - Architectural features
-        - Geographic or cultural indicators
-        
-        **Activities and Events:**
-        - Main activities taking place
-        - Interactions between people
-        - Use of objects and tools
-        
-        Provide detailed descriptions and timestamps where possible."""
-        
-        return await self.analyze_video(file_path, prompt)
+        return await self.analyze_video(file_path, ANALYSIS_PROMPTS['objects'])
     
     async def analyze_video_quality(self, file_path: str) -> Dict[str, Any]:
         """Analyze technical video quality aspects"""
-        prompt = """Analyze the technical quality of this video and provide assessment on:
-        
-        **Visual Quality:**
-        - Resolution and clarity assessment
-        - Color accuracy and saturation
-        - Brightness and contrast levels
-        - Sharpness and focus quality
-        - Any visual artifacts or issues
-        
-        **Production Quality:**
-        - Camera work and stability
-        - Framing and composition
-        - Lighting quality and consistency
-        - Professional production indicators
-        
-        **Audio Quality:**
-        - Audio clarity and volume levels
-        - Background noise assessment
-        - Audio-video synchronization
-        - Overall sound production quality
-        
-        **Technical Issues:**
-        - Compression artifacts
-        - Frame rate issues
-        - Any glitches or problems
-        - File corruption indicators
-        
-        **Overall Assessment:**
-        - Quality rating (1-10 scale)
-        - Suitability for different purposes
-        - Recommendations for improvement
-        - Best use cases for this video quality level"""
-        
-        return await self.analyze_video(file_path, prompt)
+        return await self.analyze_video(file_path, ANALYSIS_PROMPTS['quality'])
     
     async def detect_actions_activities(self, file_path: str) -> Dict[str, Any]:
         """Detect and classify actions and activities in the video"""
-        prompt = """Analyze this video to detect and classify all actions and activities:
-        
-        **Human Actions:**
-        - Physical movements and gestures
-        - Facial expressions and emotions
-        - Interactions with objects or people
-        - Sports or exercise activities
-        - Work-related activities
-        
-        **Environmental Activities:**
-        - Weather conditions and changes
-        - Traffic and vehicle movements
-        - Nature activities (animals, water, etc.)
-        - Crowd movements and behaviors
-        
-        **Event Detection:**
-        - Meetings or presentations
-        - Entertainment or performance events
-        - Educational or instructional content
-        - Social gatherings or celebrations
+        return await self.analyze_video(file_path, ANALYSIS_PROMPTS['activities'])
+    
+    async def analyze_many(self, file_path: str, analyses: List[str]) -> Dict[str, Any]:
+        """Run several analyses of one video file on a single upload, generating concurrently"""
+        if not analyses:
+            raise ValueError("At least one analysis kind or prompt is required")
         
-        **Temporal Analysis:**
-        - Duration of each activity
-        - Sequence and order of events
-        - Simultaneous activities
-        - Activity transitions and changes
+        mime_type = self._validate_video_file(file_path)
+        async with self.upload_registry.acquire(
+            file_path, self.upload_video_file, PROXY_VARIANT if UPLOAD_PROXY else ''
+        ) as uploaded_file:
+            # Named kinds resolve to their prompt; anything else is sent as a custom prompt
+            requests = list(dict.fromkeys(analyses))
+            prompts = [ANALYSIS_PROMPTS.get(request, request) for request in requests]
+            responses = await asyncio.gather(
+                *(self._generate(uploaded_file, prompt) for prompt in prompts),
+                return_exceptions=True
+            )
         
-        Provide timestamps and confidence levels for each detected activity."""
+        results = {}
+        for request, response in zip(requests, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Error in video analysis '{request[:40]}': {str(response)}")
+                results[request] = {"success": False, "error": str(response)}
+            else:
+                results[request] = {"success": True, "analysis": response.text}
         
-        return await self.analyze_video(file_path, prompt)
+        return {
+            "results": results,
+            "file_info": {
+                "name": Path(file_path).name,
+                "size": Path(file_path).stat().st_size,
+                "mime_type": mime_type
+            }
+        }
 
 # Initialize analyzer
 video_analyzer = VideoAnalyzer()
@@ -450,37 +846,70 @@ async def analyze_video_content_safety(file_path: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing content safety analysis
     """
-    prompt = """Analyze this video for content safety and appropriateness:
-    
-    **Content Classification:**
-    - Age appropriateness rating
-    - Content category (educational, entertainment, etc.)
-    - Target audience identification
-    
-    **Safety Assessment:**
-    - Potentially sensitive content identification
-    - Violence or aggressive behavior detection
-    - Inappropriate language or content
-    - Adult content indicators
+    try:
+        result = await video_analyzer.analyze_video(file_path, ANALYSIS_PROMPTS['content_safety'])
+        return {
+            "success": True,
+            "content_safety": result
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@mcp.tool()
+async def analyze_many(file_path: str, analyses: List[str]) -> Dict[str, Any]:
+    """
+    Run several analyses of one video file with a single upload and concurrent model calls.
     
-    **Compliance Analysis:**
-    - Platform suitability (YouTube, social media, etc.)
-    - Educational content assessment
-    - Professional content evaluation
+    Args:
+        file_path: Path to the video file to analyze
+        analyses: Analysis kinds (comprehensive, scenes, transcription, objects, quality, activities, content_safety) or custom prompts
     
-    **Content Themes:**
-    - Main topics and subjects covered
-    - Educational value assessment
-    - Entertainment value evaluation
-    - Information accuracy (if factual content)
+    Returns:
+        Dictionary containing a result per requested analysis, keyed by kind or prompt
+    """
+    try:
+        result = await video_analyzer.analyze_many(file_path, analyses)
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@mcp.tool()
+async def get_processing_metrics() -> Dict[str, Any]:
+    """
+    Get observed Gemini processing latency and upload reuse statistics.
     
-    Provide recommendations for content usage and distribution."""
+    Returns:
+        Dictionary containing per-MB processing latency metrics and upload registry statistics
+    """
+    return {
+        "success": True,
+        "processing": video_analyzer.processing_metrics.stats(),
+        "registry": video_analyzer.upload_registry.stats()
+    }
+
+@mcp.tool()
+async def clear_upload_cache() -> Dict[str, Any]:
+    """
+    Delete every video file this server keeps uploaded to Gemini for reuse.
     
+    Returns:
+        Dictionary containing the number of deleted files and registry statistics
+    """
     try:
-        result = await video_analyzer.analyze_video(file_path, prompt)
+        deleted = await video_analyzer.upload_registry.clear()
         return {
             "success": True,
-            "content_safety": result
+            "deleted_files": deleted,
+            "registry": video_analyzer.upload_registry.stats()
         }
     except Exception as e:
         return {
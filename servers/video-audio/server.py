@@ -5,10 +5,1234 @@ import re # For parsing silencedetect output
 import tempfile # For add_b_roll
 import shutil # For cleaning up temporary directories
 import subprocess # For running external commands
+import asyncio # For offloading blocking tools from the event loop
+import functools # For preserving tool signatures when wrapping
+import threading # For bounding concurrent ffmpeg processes
+from concurrent.futures import ThreadPoolExecutor # Worker pool for blocking tools
+import time # For job timestamps and ETA estimates
+import uuid # For background job IDs
+import inspect # For validating background job arguments
+import copy # For handing out private copies of cached probe results
+import hashlib # For on-disk cache file names
+import json # For the on-disk probe cache
+import bisect # For keyframe lookups
+import glob # For batch input patterns
+from collections import Counter, OrderedDict # LRU ordering for caches, reader counts
+import stat # For recognising named pipes
+from contextlib import nullcontext, contextmanager # Slot-free stream writers, scratch workspaces
+from urllib.parse import urlparse # For container names of stream URLs
+
+try:
+    import numpy as np # Optional: enables the fast PCM silence detector
+except ImportError:
+    np = None
 
 # Create an MCP server instance
 mcp = FastMCP("VideoAudioServer")
 
+# --- Execution Layer ---
+# Blocking tools run in a worker pool so a long encode never stalls the event loop,
+# while the number of ffmpeg processes running at the same time is capped separately.
+MAX_FFMPEG_PROCESSES = int(os.getenv("VIDEO_AUDIO_MAX_FFMPEG_PROCESSES", os.cpu_count() or 4))
+TOOL_WORKERS = int(os.getenv("VIDEO_AUDIO_TOOL_WORKERS", max(32, MAX_FFMPEG_PROCESSES * 4)))
+CONCAT_WORKERS = int(os.getenv("VIDEO_AUDIO_CONCAT_WORKERS", MAX_FFMPEG_PROCESSES))
+BATCH_WORKERS = int(os.getenv("VIDEO_AUDIO_BATCH_WORKERS", MAX_FFMPEG_PROCESSES))
+
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="video-audio-tool")
+_ffmpeg_slots = threading.BoundedSemaphore(MAX_FFMPEG_PROCESSES)
+
+_job_tools = {} # Tool name -> blocking implementation, for background jobs
+
+def _in_worker(func):
+    """Wraps a blocking tool so it runs in the worker pool instead of on the event loop.
+    The blocking implementation is also registered so it can be submitted as a background job.
+    """
+    _job_tools[func.__name__] = func
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_tool_executor, functools.partial(func, *args, **kwargs))
+    return wrapper
+
+def _run_ffmpeg(cmd, output_duration: float = None) -> tuple:
+    """Runs an ffmpeg command to completion while holding one of the process slots.
+    When called from a background job, progress is tracked and the process can be cancelled.
+
+    Args:
+        cmd: An ffmpeg-python output node or a full argument list starting with 'ffmpeg' (or 'ffprobe').
+        output_duration: Expected length of the output in seconds, used for progress in place of the
+                         longest input 'Duration:' (which overstates it for seeked or multi-input passes).
+    Returns:
+        A (stdout, stderr) tuple of bytes.
+    Raises:
+        ffmpeg.Error: If ffmpeg exits with a non-zero status or the job was cancelled.
+    """
+    args = cmd.compile() if hasattr(cmd, 'compile') else list(cmd)
+    job = getattr(_job_context, 'job', None)
+    # Progress goes to stdout, so only track it when the command does not write its own output there
+    track_progress = (job is not None and args[0] != 'ffprobe'
+                      and not any(arg == '-' or str(arg).startswith('pipe:') for arg in args))
+    if track_progress:
+        args = [args[0], '-progress', 'pipe:1', '-nostats'] + args[1:]
+    stream_error = _stream_args_error(args)
+    if stream_error:
+        raise ffmpeg.Error(args[0], b'', stream_error.encode('utf8'))
+    writes_stream = args[0] != 'ffprobe' and _is_stream(args[-1])
+    if writes_stream:
+        # Stream outputs need a muxer that never seeks back; named pipes already "exist", so force overwrite
+        args = [args[0], '-y', *args[1:-1], *_stream_output_args(args[-1]), args[-1]]
+
+    # A stream writer blocks until its reader connects and is paced by it, so it does not take a slot:
+    # holding one could leave the reader waiting for that very slot.
+    with (nullcontext() if writes_stream else _ffmpeg_slots):
+        if job is not None and job.cancel_requested:
+            raise ffmpeg.Error(args[0], b'', b'Job was cancelled before ffmpeg started.')
+        process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if job is None:
+            stdout, stderr = process.communicate()
+        else:
+            job.attach_process(process)
+            try:
+                if track_progress:
+                    stdout, stderr = _follow_ffmpeg_progress(process, job, output_duration)
+                else:
+                    stdout, stderr = process.communicate()
+            finally:
+                job.detach_process(process)
+    if process.returncode != 0:
+        raise ffmpeg.Error(args[0], stdout, stderr)
+    return stdout, stderr
+
+def _map_in_parallel(func, items: list, max_workers: int) -> list:
+    """Applies func to every item on a short-lived thread pool and returns the results in order.
+    The caller's background job is carried over, so processes started by func stay cancellable.
+    """
+    job = getattr(_job_context, 'job', None)
+
+    def run(item):
+        _job_context.job = job
+        try:
+            return func(item)
+        finally:
+            _job_context.job = None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        return list(pool.map(run, items))
+
+# --- Stream I/O ---
+# Inputs and outputs may be live streams instead of files: a local HTTP endpoint
+# (e.g. http://127.0.0.1:8090/clip.mp4) or a named pipe created with mkfifo. A tool writing to an
+# HTTP URL serves it itself with '-listen 1', and MP4/MOV outputs are fragmented, so the next tool
+# can start reading while the previous one is still encoding and nothing is written to disk.
+STREAM_URL_PREFIXES = ('http://', 'https://')
+# Stream URLs are local only: inputs are never fetched from, and outputs never served to, other hosts
+STREAM_URL_HOSTS = ('127.0.0.1', '::1', 'localhost')
+_FRAGMENTED_MOVFLAGS = 'frag_keyframe+empty_moov+default_base_moof'
+_STREAM_MUXERS = {
+    'mp4': 'mp4', 'm4v': 'mp4', 'm4a': 'mp4', 'mov': 'mov', 'mkv': 'matroska', 'mka': 'matroska',
+    'webm': 'webm', 'ts': 'mpegts', 'flv': 'flv', 'nut': 'nut', 'mp3': 'mp3', 'aac': 'adts',
+    'wav': 'wav', 'flac': 'flac', 'ogg': 'ogg', 'opus': 'opus',
+}
+
+def _is_stream(path) -> bool:
+    """True for HTTP stream URLs and named pipes, which can be read or written only once, front to back."""
+    if not isinstance(path, str):
+        return False
+    if path.startswith(STREAM_URL_PREFIXES):
+        return True
+    try:
+        return stat.S_ISFIFO(os.stat(path).st_mode)
+    except (OSError, ValueError):
+        return False
+
+def _stream_url_error(url: str, is_output: bool = False):
+    """Why a stream URL cannot be used, or None: it must be on a loopback host, and outputs must be
+    plain http, since '-listen 1' cannot serve https without a certificate."""
+    parsed = urlparse(url)
+    if parsed.hostname not in STREAM_URL_HOSTS:
+        return f"{url} is not a local stream URL; use a loopback host ({', '.join(STREAM_URL_HOSTS)})."
+    if is_output and parsed.scheme == 'https':
+        return f"{url} cannot be served over https; write stream outputs to an http:// URL."
+    return None
+
+def _stream_args_error(args: list):
+    """Checks every stream URL in an ffmpeg argument list: values of '-i' are inputs, any other URL is an output."""
+    for i, arg in enumerate(args):
+        if isinstance(arg, str) and arg.startswith(STREAM_URL_PREFIXES):
+            error = _stream_url_error(arg, is_output=(i == 0 or args[i - 1] != '-i'))
+            if error:
+                return error
+    return None
+
+def _stream_input_error(path: str):
+    """Message for tools that must probe their input before running, when path is a stream; None for files."""
+    if isinstance(path, str) and path.startswith(STREAM_URL_PREFIXES) and _stream_url_error(path):
+        return _stream_url_error(path)
+    if _is_stream(path):
+        return f"{path} is a stream; this operation needs to probe its input first, so pass a file instead."
+    return None
+
+def _input_exists(path: str) -> bool:
+    """Replacement for os.path.exists on tool inputs that also accepts stream URLs and named pipes."""
+    return _is_stream(path) or os.path.exists(path)
+
+def _stream_output_args(output_path: str) -> list:
+    """Returns the output options ffmpeg needs to write output_path as a stream (empty for files).
+
+    The muxer is picked from the extension (MPEG-TS if there is none), MP4/MOV are fragmented
+    so they need no seek back to the header, and HTTP outputs are served with '-listen 1'.
+    """
+    if not _is_stream(output_path):
+        return []
+    is_url = output_path.startswith(STREAM_URL_PREFIXES)
+    name = urlparse(output_path).path if is_url else output_path
+    muxer = _STREAM_MUXERS.get(_output_container(name), 'mpegts')
+    args = ['-listen', '1'] if is_url else []
+    args.extend(['-f', muxer])
+    if muxer in ('mp4', 'mov'):
+        args.extend(['-movflags', _FRAGMENTED_MOVFLAGS])
+    return args
+
+# --- Background Jobs ---
+# Long edits can be submitted as jobs: the call returns a job ID straight away and the
+# job's ffmpeg processes report progress through '-progress' and can be killed on cancel.
+MAX_CONCURRENT_JOBS = int(os.getenv("VIDEO_AUDIO_MAX_JOBS", MAX_FFMPEG_PROCESSES))
+MAX_RETAINED_JOBS = int(os.getenv("VIDEO_AUDIO_MAX_RETAINED_JOBS", 1000))
+
+_job_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix="video-audio-job")
+_jobs = {} # Job ID -> _Job, in submission order
+_jobs_lock = threading.Lock()
+_job_context = threading.local() # Holds the _Job being executed by the current worker thread
+
+_ERROR_PREFIXES = ('Error', 'An unexpected error', 'Runtime error')
+
+def _is_error_result(result) -> bool:
+    """Returns True if a tool's status message reports a failure."""
+    return isinstance(result, str) and result.startswith(_ERROR_PREFIXES)
+
+class _Job:
+    """State of one background tool invocation and the ffmpeg processes it is running."""
+
+    def __init__(self, job_id: str, tool_name: str, arguments: dict):
+        self.job_id = job_id
+        self.tool_name = tool_name
+        self.arguments = arguments
+        self.status = 'queued'
+        self.result = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self.future = None
+        self.passes_completed = 0
+        self.removed_outputs = [] # Partial output files deleted after cancellation
+        self._lock = threading.Lock()
+        # Process -> [started_at, encoded_seconds, input_duration_seconds] for every running ffmpeg pass
+        self._passes = {}
+
+    def attach_process(self, process):
+        with self._lock:
+            self._passes[process] = [time.time(), 0.0, 0.0]
+            cancelled = self.cancel_requested
+        if cancelled:
+            # cancel() ran between the pre-start check and Popen
+            process.kill()
+
+    def detach_process(self, process):
+        with self._lock:
+            self._passes.pop(process, None)
+            if process.returncode == 0:
+                self.passes_completed += 1
+
+    def update_pass(self, process, encoded_seconds: float = None, input_duration: float = None):
+        with self._lock:
+            state = self._passes.get(process)
+            if state is None:
+                return
+            if encoded_seconds is not None:
+                state[1] = encoded_seconds
+            if input_duration is not None:
+                state[2] = max(state[2], input_duration)
+
+    def cancel(self) -> bool:
+        """Requests cancellation, killing any running ffmpeg process. Returns False if already finished."""
+        with self._lock:
+            if self.status in ('completed', 'failed', 'cancelled'):
+                return False
+            self.cancel_requested = True
+            processes = list(self._passes)
+        if self.future is not None and self.future.cancel():
+            # Never started, so there is nothing to kill
+            self.status = 'cancelled'
+            self.finished_at = time.time()
+            return True
+        for process in processes:
+            try:
+                process.kill()
+            except OSError:
+                pass
+        return True
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            now = time.time()
+            passes = []
+            for started_at, encoded, duration in self._passes.values():
+                fraction = min(encoded / duration, 1.0) if duration > 0 else None
+                elapsed = now - started_at
+                eta = elapsed * (1 - fraction) / fraction if fraction else None
+                passes.append({
+                    'encoded_seconds': round(encoded, 2),
+                    'input_duration_seconds': round(duration, 2) if duration else None,
+                    'progress_percent': round(fraction * 100, 1) if fraction is not None else None,
+                    'eta_seconds': round(eta, 1) if eta is not None else None,
+                })
+            progress = None
+            if self.status == 'completed':
+                progress = 100.0
+            elif passes and all(p['progress_percent'] is not None for p in passes):
+                progress = round(sum(p['progress_percent'] for p in passes) / len(passes), 1)
+            etas = [p['eta_seconds'] for p in passes if p['eta_seconds'] is not None]
+            return {
+                'job_id': self.job_id,
+                'tool_name': self.tool_name,
+                'status': self.status,
+                'progress_percent': progress,
+                'eta_seconds': max(etas) if etas else None,
+                'passes_completed': self.passes_completed,
+                'running_passes': passes,
+                'submitted_at': self.submitted_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'result': self.result,
+                'removed_partial_outputs': list(self.removed_outputs),
+            }
+
+def _follow_ffmpeg_progress(process, job, output_duration: float = None) -> tuple:
+    """Reads '-progress pipe:1' output from a running ffmpeg process into the job's state.
+    stderr is drained on a helper thread so neither pipe can fill up and stall ffmpeg.
+    The pass length is output_duration if given, otherwise the longest input duration ffmpeg reports.
+    """
+    stderr_chunks = []
+    if output_duration is not None:
+        job.update_pass(process, input_duration=output_duration)
+
+    def drain_stderr():
+        for line in iter(process.stderr.readline, b''):
+            stderr_chunks.append(line)
+            match = output_duration is None and re.search(rb"Duration: (\d+):(\d+):(\d+\.?\d*)", line)
+            if match:
+                hours, minutes, seconds = match.groups()
+                job.update_pass(process, input_duration=int(hours) * 3600 + int(minutes) * 60 + float(seconds))
+
+    stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+    stderr_thread.start()
+    for line in iter(process.stdout.readline, b''):
+        key, _, value = line.decode('utf8', 'replace').strip().partition('=')
+        # Despite its name, out_time_ms is reported in microseconds
+        if key in ('out_time_us', 'out_time_ms') and value.lstrip('-').isdigit():
+            job.update_pass(process, encoded_seconds=max(int(value), 0) / 1_000_000)
+    process.wait()
+    stderr_thread.join()
+    return b'', b''.join(stderr_chunks)
+
+def _output_file_arguments(arguments: dict) -> list:
+    """Output file paths in a tool's arguments: '..._output_path'/'output_..._path' values, including
+    those inside lists of dicts (e.g. transcode_ladder renditions). Streams are left out."""
+    def is_output(name, value):
+        return isinstance(value, str) and 'output' in name and name.endswith('_path') and not _is_stream(value)
+
+    paths = []
+    for name, value in arguments.items():
+        if is_output(name, value):
+            paths.append(value)
+        elif isinstance(value, list):
+            paths.extend(item_value for item in value if isinstance(item, dict)
+                         for item_name, item_value in item.items() if is_output(item_name, item_value))
+    return paths
+
+def _file_mtime(path: str):
+    """Modification time in ns of a regular file, or None if there is none at path."""
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return None
+    return file_stat.st_mtime_ns if stat.S_ISREG(file_stat.st_mode) else None
+
+def _remove_partial_outputs(before: dict) -> list:
+    """Deletes output files a cancelled job created or rewrote; files it never touched are kept."""
+    removed = []
+    for path, mtime_before in before.items():
+        mtime_after = _file_mtime(path)
+        if mtime_after is not None and mtime_after != mtime_before:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError:
+                pass
+    return removed
+
+def _execute_job(job: _Job, func):
+    """Runs a job's tool on the job executor and records the outcome."""
+    if job.cancel_requested:
+        job.status = 'cancelled'
+        job.finished_at = time.time()
+        return
+    job.status = 'running'
+    job.started_at = time.time()
+    outputs_before = {path: _file_mtime(path) for path in _output_file_arguments(job.arguments)}
+    _job_context.job = job
+    try:
+        result = func(**job.arguments)
+    except Exception as e:
+        result = f"An unexpected error occurred: {str(e)}"
+    finally:
+        _job_context.job = None
+    job.result = result
+    job.finished_at = time.time()
+    if job.cancel_requested:
+        if _is_error_result(result):
+            # The tool was cut short, and a killed ffmpeg leaves a truncated file behind
+            job.removed_outputs = _remove_partial_outputs(outputs_before)
+        job.status = 'cancelled'
+    elif _is_error_result(result):
+        job.status = 'failed'
+    else:
+        job.status = 'completed'
+
+def _prune_finished_jobs():
+    """Drops the oldest finished jobs once more than MAX_RETAINED_JOBS are kept."""
+    with _jobs_lock:
+        excess = len(_jobs) - MAX_RETAINED_JOBS
+        if excess <= 0:
+            return
+        for job_id in [j.job_id for j in _jobs.values() if j.status in ('completed', 'failed', 'cancelled')][:excess]:
+            del _jobs[job_id]
+
+# --- Probe Cache ---
+# ffprobe results are cached in memory (LRU) and optionally on disk, keyed by the file's
+# identity so an edited or replaced file is probed again.
+PROBE_CACHE_SIZE = int(os.getenv("VIDEO_AUDIO_PROBE_CACHE_SIZE", 512))
+PROBE_CACHE_DIR = os.getenv("VIDEO_AUDIO_PROBE_CACHE_DIR") # Optional on-disk cache
+
+def _file_identity(media_path: str):
+    """Returns (real path, size, mtime in ns, inode) for a local file, or None if it cannot be stat'ed."""
+    try:
+        st = os.stat(media_path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return (os.path.realpath(media_path), st.st_size, st.st_mtime_ns, st.st_ino)
+
+class _ProbeCache:
+    """LRU cache of parsed ffprobe output with hit/miss counters."""
+
+    def __init__(self, max_entries: int, cache_dir: str = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(repr(key).encode('utf8')).hexdigest() + '.json')
+
+    def probe(self, media_path: str) -> dict:
+        """Returns the ffprobe result for media_path, probing only if the file is not cached.
+        Raises ffmpeg.Error exactly like ffmpeg.probe.
+        """
+        key = _file_identity(media_path)
+        if key is None:
+            # Not a local file (or missing); let ffprobe report it
+            return ffmpeg.probe(media_path)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self._entries[key])
+
+        result = None
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), 'r', encoding='utf8') as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                result = None
+
+        if result is None:
+            result = ffmpeg.probe(media_path)
+            with self._lock:
+                self.misses += 1
+            if self.cache_dir:
+                disk_path = self._disk_path(key)
+                temp_path = f"{disk_path}.{threading.get_ident()}.tmp"
+                try:
+                    with open(temp_path, 'w', encoding='utf8') as f:
+                        json.dump(result, f)
+                    os.replace(temp_path, disk_path)
+                except OSError:
+                    pass
+        else:
+            with self._lock:
+                self.disk_hits += 1
+
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return copy.deepcopy(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else None,
+                'disk_cache_dir': self.cache_dir,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+_probe_cache = _ProbeCache(PROBE_CACHE_SIZE, PROBE_CACHE_DIR)
+
+def _probe_media(media_path: str) -> dict:
+    """Cached replacement for ffmpeg.probe. Raises ValueError for streams, which a probe would consume."""
+    stream_error = _stream_input_error(media_path)
+    if stream_error:
+        raise ValueError(stream_error)
+    return _probe_cache.probe(media_path)
+
+# --- Packet Index ---
+# The first video stream's packet table (presentation time, keyframe flag, byte offset, size) is read
+# once per file with ffprobe, without decoding. With NumPy it is stored as a side-car .npy file and
+# memory-mapped on later runs; lookups are binary searches, so edit tools can ask for keyframes in O(log n).
+PACKET_INDEX_DIR = os.getenv("VIDEO_AUDIO_PACKET_INDEX_DIR", os.path.join(tempfile.gettempdir(), "video-audio-index"))
+PACKET_INDEX_CACHE_SIZE = int(os.getenv("VIDEO_AUDIO_PACKET_INDEX_CACHE_SIZE", 64))
+# Side-car files are pruned least-recently-used past this size, and when unused for this long (0 disables each)
+PACKET_INDEX_DISK_BYTES = int(float(os.getenv("VIDEO_AUDIO_PACKET_INDEX_DISK_MB", 256)) * 1024 * 1024)
+PACKET_INDEX_MAX_AGE = float(os.getenv("VIDEO_AUDIO_PACKET_INDEX_MAX_AGE_DAYS", 30)) * 86400
+_PACKET_INDEX_VERSION = 1 # Bump when the stored layout changes
+
+class _PacketIndex:
+    """Video packets of one file, sorted by presentation time (seconds from the file start).
+
+    pts, is_key, pos and size are NumPy arrays (memory-mapped when loaded from disk) or lists without
+    NumPy; keyframes holds the sorted keyframe times. pos is -1 where the container does not report it.
+    """
+
+    def __init__(self, pts, is_key, pos, size):
+        self.pts = pts
+        self.is_key = is_key
+        self.pos = pos
+        self.size = size
+        if np is not None:
+            self.keyframes = np.asarray(pts)[np.asarray(is_key, dtype=bool)].tolist()
+        else:
+            self.keyframes = [t for t, key in zip(pts, is_key) if key]
+
+    def __len__(self) -> int:
+        return len(self.pts)
+
+    def frames_between(self, start: float, end: float) -> int:
+        """Number of frames presented in [start, end)."""
+        return bisect.bisect_left(self.pts, end) - bisect.bisect_left(self.pts, start)
+
+    def keyframe_at_or_after(self, t: float):
+        """Time of the first keyframe at or after t, or None."""
+        i = bisect.bisect_left(self.keyframes, t)
+        return self.keyframes[i] if i < len(self.keyframes) else None
+
+    def keyframe_at_or_before(self, t: float):
+        """Time of the last keyframe at or before t, or None."""
+        i = bisect.bisect_right(self.keyframes, t)
+        return self.keyframes[i - 1] if i else None
+
+    def keyframes_between(self, start: float, end: float) -> list:
+        """Keyframe times in [start, end]."""
+        return self.keyframes[bisect.bisect_left(self.keyframes, start):bisect.bisect_right(self.keyframes, end)]
+
+    @property
+    def last_pts(self):
+        return float(self.pts[-1]) if len(self.pts) else None
+
+_packet_indexes = OrderedDict() # File identity -> _PacketIndex
+_packet_index_lock = threading.Lock()
+_packet_index_stats = {'hits': 0, 'disk_hits': 0, 'builds': 0}
+
+def _packet_index_path(key) -> str:
+    name = hashlib.sha1(repr((_PACKET_INDEX_VERSION, key)).encode('utf8')).hexdigest()
+    return os.path.join(PACKET_INDEX_DIR, name + '.npy')
+
+def _prune_packet_index_dir():
+    """Removes side-car indexes unused for PACKET_INDEX_MAX_AGE, then the least recently used ones until the
+    directory fits in PACKET_INDEX_DISK_BYTES. Reading an index from disk refreshes its mtime."""
+    try:
+        names = os.listdir(PACKET_INDEX_DIR)
+    except OSError:
+        return
+    cutoff = time.time() - PACKET_INDEX_MAX_AGE
+    entries = []
+    for name in names:
+        path = os.path.join(PACKET_INDEX_DIR, name)
+        try:
+            file_stat = os.stat(path)
+            if PACKET_INDEX_MAX_AGE > 0 and file_stat.st_mtime < cutoff:
+                os.remove(path)
+            elif name.endswith('.npy'):
+                entries.append((file_stat.st_mtime, file_stat.st_size, path))
+        except OSError:
+            pass
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if PACKET_INDEX_DISK_BYTES <= 0 or total <= PACKET_INDEX_DISK_BYTES:
+            break
+        try:
+            os.remove(path) # A live memory map of the file stays valid
+            total -= size
+        except OSError:
+            pass
+
+def _build_packet_index(media_path: str) -> _PacketIndex:
+    """Reads the packet table with ffprobe (no decoding) and sorts it by presentation time."""
+    stdout, _ = _run_ffmpeg([
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,dts_time,size,pos,flags', '-of', 'compact=p=0', media_path
+    ])
+    start_offset = float(_probe_media(media_path)['format'].get('start_time', 0.0))
+    rows = []
+    for line in stdout.decode('utf8').splitlines():
+        fields = dict(field.split('=', 1) for field in line.split('|') if '=' in field)
+        time_str = fields.get('pts_time', 'N/A')
+        if time_str == 'N/A':
+            time_str = fields.get('dts_time', 'N/A')
+        if time_str == 'N/A':
+            continue
+        pos = fields.get('pos', 'N/A')
+        rows.append((float(time_str) - start_offset, 'K' in fields.get('flags', ''),
+                     int(pos) if pos != 'N/A' else -1, int(fields.get('size', 0))))
+    rows.sort(key=lambda row: row[0])
+
+    if np is None:
+        return _PacketIndex([r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows], [r[3] for r in rows])
+    table = np.array(rows, dtype=[('pts', '<f8'), ('key', '?'), ('pos', '<i8'), ('size', '<i4')])
+    return _PacketIndex(table['pts'], table['key'], table['pos'], table['size'])
+
+def _get_packet_index(media_path: str) -> _PacketIndex:
+    """Returns the packet index of media_path from memory, the side-car store, or a fresh ffprobe scan."""
+    key = _file_identity(media_path)
+    if key is None:
+        return _build_packet_index(media_path)
+
+    with _packet_index_lock:
+        if key in _packet_indexes:
+            _packet_indexes.move_to_end(key)
+            _packet_index_stats['hits'] += 1
+            return _packet_indexes[key]
+
+    index = None
+    disk_path = _packet_index_path(key) if np is not None and PACKET_INDEX_DIR else None
+    if disk_path:
+        try:
+            table = np.load(disk_path, mmap_mode='r')
+            index = _PacketIndex(table['pts'], table['key'], table['pos'], table['size'])
+            os.utime(disk_path) # Marks it recently used for pruning
+        except (OSError, ValueError, KeyError):
+            index = None
+    if index is not None:
+        stat_name = 'disk_hits'
+    else:
+        index = _build_packet_index(media_path)
+        stat_name = 'builds'
+        if disk_path:
+            table = np.empty(len(index), dtype=[('pts', '<f8'), ('key', '?'), ('pos', '<i8'), ('size', '<i4')])
+            table['pts'], table['key'], table['pos'], table['size'] = index.pts, index.is_key, index.pos, index.size
+            temp_path = f"{disk_path}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(PACKET_INDEX_DIR, exist_ok=True)
+                with open(temp_path, 'wb') as f:
+                    np.save(f, table)
+                os.replace(temp_path, disk_path)
+            except OSError:
+                pass
+            _prune_packet_index_dir()
+
+    with _packet_index_lock:
+        _packet_index_stats[stat_name] += 1
+        _packet_indexes[key] = index
+        while len(_packet_indexes) > PACKET_INDEX_CACHE_SIZE:
+            _packet_indexes.popitem(last=False)
+    return index
+
+if np is not None and PACKET_INDEX_DIR:
+    _prune_packet_index_dir()
+
+# --- Scratch Space ---
+# Intermediates (normalized clips, render parts, smart-cut pieces) go to a managed scratch area instead of
+# ad-hoc mkdtemp directories. A fast tier (e.g. /dev/shm or NVMe) takes files while its byte budget lasts,
+# larger ones spill to the slow tier, each job can be capped, and reusable intermediates are kept for a TTL.
+SCRATCH_DIR = os.getenv("VIDEO_AUDIO_SCRATCH_DIR", os.path.join(tempfile.gettempdir(), "video-audio-scratch"))
+SCRATCH_FAST_DIR = os.getenv("VIDEO_AUDIO_SCRATCH_FAST_DIR", "") # Empty disables the fast tier
+SCRATCH_FAST_BYTES = int(float(os.getenv("VIDEO_AUDIO_SCRATCH_FAST_MB", 1024)) * 1024 * 1024)
+SCRATCH_JOB_QUOTA_BYTES = int(float(os.getenv("VIDEO_AUDIO_SCRATCH_JOB_QUOTA_MB", 0)) * 1024 * 1024) # 0 = unlimited
+SCRATCH_REUSE_TTL = float(os.getenv("VIDEO_AUDIO_SCRATCH_REUSE_TTL", 600))
+
+class _ScratchWorkspace:
+    """Scratch files of one tool call. Removed, together with its reservations, when the call ends."""
+
+    def __init__(self, manager: '_ScratchManager'):
+        self.manager = manager
+        self.dirs = {}  # tier -> directory, created on first use
+        self.reserved = {}  # tier -> bytes
+        self.in_use = Counter()  # Reuse key -> reads this workspace holds on it
+        self._lock = threading.Lock()
+
+    def path(self, name: str, expected_bytes: int = 0) -> str:
+        """Returns a path for a new intermediate of roughly expected_bytes, on the fast tier if it fits.
+        Raises RuntimeError if the workspace would exceed VIDEO_AUDIO_SCRATCH_JOB_QUOTA_MB.
+        """
+        expected_bytes = max(0, int(expected_bytes))
+        with self._lock:
+            total = sum(self.reserved.values()) + expected_bytes
+            if SCRATCH_JOB_QUOTA_BYTES and total > SCRATCH_JOB_QUOTA_BYTES:
+                raise RuntimeError(f"Scratch quota exceeded: this job needs about {total // (1024 * 1024)} MB, "
+                                   f"the limit is {SCRATCH_JOB_QUOTA_BYTES // (1024 * 1024)} MB.")
+            tier = self.manager.reserve(expected_bytes)
+            self.reserved[tier] = self.reserved.get(tier, 0) + expected_bytes
+            if tier not in self.dirs:
+                root = self.manager.roots[tier]
+                os.makedirs(root, exist_ok=True)
+                self.dirs[tier] = tempfile.mkdtemp(dir=root)
+            return os.path.join(self.dirs[tier], name)
+
+    def reuse(self, key):
+        """Returns the path of a kept intermediate for key, or None. It stays valid until the workspace closes."""
+        path = self.manager.lookup(key)
+        if path is not None:
+            with self._lock:
+                self.in_use[key] += 1
+        return path
+
+    def keep(self, key, path: str) -> str:
+        """Moves a finished intermediate into the reuse store under key and returns its new path."""
+        kept_path = self.manager.store(key, path)
+        if kept_path != path:
+            with self._lock:
+                self.in_use[key] += 1
+        return kept_path
+
+    def close(self):
+        for directory in self.dirs.values():
+            shutil.rmtree(directory, ignore_errors=True)
+        self.manager.release(self.reserved, self.in_use)
+
+class _ScratchManager:
+    """Tier placement, byte accounting and the TTL reuse store shared by every workspace."""
+
+    def __init__(self, slow_dir: str, fast_dir: str = None, fast_bytes: int = 0, reuse_ttl: float = 0):
+        self.roots = {'slow': slow_dir}
+        if fast_dir:
+            self.roots['fast'] = os.path.join(fast_dir, "video-audio-scratch")
+        self.fast_bytes = fast_bytes
+        self.reuse_ttl = reuse_ttl
+        self.used = {tier: 0 for tier in self.roots}  # Reserved by open workspaces plus kept intermediates
+        self._kept = OrderedDict()  # key -> [path, tier, size, expires_at, readers]
+        self._lock = threading.Lock()
+        self.stats = {'workspaces': 0, 'fast_placements': 0, 'spills': 0, 'reuse_hits': 0, 'reuse_misses': 0}
+        self._sweep_stale()
+
+    def _sweep_stale(self):
+        """Removes kept intermediates left behind by earlier server runs once they are past the TTL."""
+        cutoff = time.time() - self.reuse_ttl
+        for root in self.roots.values():
+            reuse_dir = os.path.join(root, "reuse")
+            try:
+                names = os.listdir(reuse_dir)
+            except OSError:
+                continue
+            for name in names:
+                path = os.path.join(reuse_dir, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    @contextmanager
+    def workspace(self):
+        """Yields a fresh _ScratchWorkspace and cleans it up when the block exits."""
+        workspace = _ScratchWorkspace(self)
+        with self._lock:
+            self.stats['workspaces'] += 1
+        try:
+            yield workspace
+        finally:
+            workspace.close()
+
+    def reserve(self, expected_bytes: int) -> str:
+        """Picks the tier for a new file and charges expected_bytes to it."""
+        with self._lock:
+            self._purge()
+            if 'fast' in self.roots:
+                if self.used['fast'] + expected_bytes <= self.fast_bytes:
+                    self.used['fast'] += expected_bytes
+                    self.stats['fast_placements'] += 1
+                    return 'fast'
+                self.stats['spills'] += 1
+            self.used['slow'] += expected_bytes
+            return 'slow'
+
+    def release(self, reserved: dict, reads: Counter):
+        with self._lock:
+            for tier, size in reserved.items():
+                self.used[tier] = max(0, self.used[tier] - size)
+            for key, count in reads.items():
+                if key in self._kept:
+                    self._kept[key][4] -= count
+            self._purge()
+
+    def lookup(self, key):
+        if key is None or self.reuse_ttl <= 0:
+            return None
+        with self._lock:
+            self._purge()
+            entry = self._kept.get(key)
+            if entry is None or not os.path.exists(entry[0]):
+                self.stats['reuse_misses'] += 1
+                return None
+            self.stats['reuse_hits'] += 1
+            entry[3] = time.time() + self.reuse_ttl
+            entry[4] += 1
+            self._kept.move_to_end(key)
+            return entry[0]
+
+    def store(self, key, path: str) -> str:
+        """Moves path into the reuse store (on the tier it already lives on) and returns the new path.
+        The caller counts as a reader of the kept file until its workspace closes.
+        """
+        if key is None or self.reuse_ttl <= 0:
+            return path
+        size = os.path.getsize(path)
+        tier = 'fast' if 'fast' in self.roots and path.startswith(self.roots['fast']) else 'slow'
+        reuse_dir = os.path.join(self.roots[tier], "reuse")
+        os.makedirs(reuse_dir, exist_ok=True)
+        kept_path = os.path.join(reuse_dir, hashlib.sha1(repr(key).encode('utf8')).hexdigest()
+                                 + os.path.splitext(path)[1])
+        with self._lock:
+            entry = self._kept.get(key)
+            if entry is not None and os.path.exists(entry[0]):
+                # Another call produced the same intermediate meanwhile; share that one
+                entry[3] = time.time() + self.reuse_ttl
+                entry[4] += 1
+                return entry[0]
+            if entry is not None:
+                self.used[entry[1]] = max(0, self.used[entry[1]] - entry[2])
+            os.replace(path, kept_path)  # Same file system: the workspace lives under the same root
+            self._kept[key] = [kept_path, tier, size, time.time() + self.reuse_ttl, 1]
+            self._kept.move_to_end(key)
+            self.used[tier] += size
+            self._purge()
+        return kept_path
+
+    def _purge(self):
+        """Drops expired, unread intermediates. Call with the lock held."""
+        now = time.time()
+        for key in [key for key, entry in self._kept.items() if entry[3] <= now and entry[4] <= 0]:
+            path, tier, size, _, _ = self._kept.pop(key)
+            self.used[tier] = max(0, self.used[tier] - size)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._purge()
+            return {
+                'roots': dict(self.roots),
+                'used_bytes': dict(self.used),
+                'fast_limit_bytes': self.fast_bytes if 'fast' in self.roots else None,
+                'job_quota_bytes': SCRATCH_JOB_QUOTA_BYTES or None,
+                'kept_intermediates': len(self._kept),
+                'reuse_ttl_seconds': self.reuse_ttl,
+                **self.stats,
+            }
+
+_scratch = _ScratchManager(SCRATCH_DIR, SCRATCH_FAST_DIR, SCRATCH_FAST_BYTES, SCRATCH_REUSE_TTL)
+
+# --- Result Cache ---
+# Outputs of successful tool calls are kept in a content-addressed store keyed on the content of every
+# input file, the other arguments, the output format and the ffmpeg version. Repeating a call copies the
+# stored output into place instead of encoding again. Entries are evicted least-recently-used by size.
+# Off by default: without reflinks every stored output is a second full copy, and the first call hashes each input.
+RESULT_CACHE_DIR = os.getenv("VIDEO_AUDIO_RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "video-audio-results"))
+RESULT_CACHE_BYTES = int(float(os.getenv("VIDEO_AUDIO_RESULT_CACHE_MB", 0)) * 1024 * 1024) # 0 disables
+_HASH_CHUNK_BYTES = 1024 * 1024
+_FICLONE = 0x40049409 # Linux ioctl for reflink copies (Btrfs, XFS)
+_OUTPUT_TOKEN = "\x00output\x00"
+
+_ffmpeg_version = None
+_content_digests = OrderedDict() # _file_identity -> digest, so unchanged files are hashed once
+_content_digests_lock = threading.Lock()
+
+def _get_ffmpeg_version() -> str:
+    """Returns the first line of 'ffmpeg -version', read once per server run."""
+    global _ffmpeg_version
+    if _ffmpeg_version is None:
+        try:
+            completed = subprocess.run(['ffmpeg', '-version'], capture_output=True, timeout=30)
+            _ffmpeg_version = completed.stdout.decode('utf8', 'replace').splitlines()[0]
+        except (OSError, subprocess.SubprocessError, IndexError):
+            _ffmpeg_version = 'unknown'
+    return _ffmpeg_version
+
+def _content_digest(path: str) -> str:
+    """SHA-256 of a file's content, memoized on its identity (path, size, mtime, inode)."""
+    identity = _file_identity(path)
+    with _content_digests_lock:
+        if identity in _content_digests:
+            _content_digests.move_to_end(identity)
+            return _content_digests[identity]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    with _content_digests_lock:
+        _content_digests[identity] = digest.hexdigest()
+        while len(_content_digests) > PROBE_CACHE_SIZE:
+            _content_digests.popitem(last=False)
+    return digest.hexdigest()
+
+def _clone_or_copy(source: str, destination: str):
+    """Puts an independent copy of source at destination: a reflink if the filesystem supports it, else a full copy.
+
+    Never hardlinks, so rewriting one output in place cannot change the cache entry or other outputs served from it.
+    """
+    directory = os.path.dirname(os.path.abspath(destination))
+    temp_path = os.path.join(directory, f".{os.path.basename(destination)}.{uuid.uuid4().hex}.tmp")
+    try:
+        try:
+            import fcntl
+            with open(source, 'rb') as src, open(temp_path, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except (OSError, ImportError):
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class _ResultCache:
+    """Size-bounded LRU store of tool outputs, with their status messages, on disk."""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> {'path', 'size', 'mtime_ns', 'message'}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        if max_bytes > 0:
+            self._load()
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self):
+        """Rebuilds the index from the side-car files of earlier runs, least recently used first."""
+        try:
+            names = [name for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+        except OSError:
+            return
+        loaded = []
+        for name in names:
+            try:
+                with open(os.path.join(self.cache_dir, name), 'r', encoding='utf8') as f:
+                    entry = json.load(f)
+                loaded.append((os.path.getmtime(os.path.join(self.cache_dir, name)), name[:-5], entry))
+            except (OSError, ValueError):
+                continue
+        for _, key, entry in sorted(loaded, key=lambda item: item[0]):
+            self._entries[key] = entry
+            self.total_bytes += entry['size']
+        with self._lock:
+            self._evict()
+
+    def get(self, key: str):
+        """Returns (path, message template) for a valid entry, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                try:
+                    st = os.stat(entry['path'])
+                    valid = st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns']
+                except OSError:
+                    valid = False
+                if not valid:
+                    # Missing, or modified in place
+                    self._remove(key)
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        try:
+            os.utime(self._meta_path(key))
+        except OSError:
+            pass
+        return entry['path'], entry['message']
+
+    def put(self, key: str, output_path: str, message: str):
+        size = os.path.getsize(output_path)
+        if size > self.max_bytes:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_path = os.path.join(self.cache_dir, key + os.path.splitext(output_path)[1])
+        _clone_or_copy(output_path, entry_path)
+        st = os.stat(entry_path)
+        entry = {'path': entry_path, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'message': message}
+        with open(self._meta_path(key), 'w', encoding='utf8') as f:
+            json.dump(entry, f)
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries[key]['size']
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self.total_bytes += entry['size']
+            self.stores += 1
+            self._evict()
+
+    def _remove(self, key: str):
+        """Drops an entry and its files. Call with the lock held."""
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry['size']
+        for path in (entry['path'], self._meta_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'cache_dir': self.cache_dir,
+            }
+
+_result_cache = _ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_BYTES)
+
+def _normalize_cache_value(value):
+    """Makes a tool argument hashable and location-independent: files are replaced by their content digest."""
+    if isinstance(value, str):
+        if os.path.isfile(value):
+            return ('file', _content_digest(value))
+        return value
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _normalize_cache_value(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize_cache_value(v) for v in value)
+    return repr(value)
+
+def _has_stream_argument(value) -> bool:
+    if isinstance(value, str):
+        return _is_stream(value)
+    if isinstance(value, dict):
+        return any(_has_stream_argument(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_has_stream_argument(v) for v in value)
+    return False
+
+def _result_cached(func):
+    """Serves repeated calls of a file-to-file tool from the result cache.
+
+    The tool's output parameter is its first 'output_..._path' argument. Calls that read or write a
+    stream are never cached, and only successful results (see _is_error_result) are stored.
+    """
+    signature = inspect.signature(func)
+    output_param = next(name for name in signature.parameters
+                        if name.startswith('output_') and name.endswith('_path'))
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if RESULT_CACHE_BYTES <= 0:
+            return func(*args, **kwargs)
+        try:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            output_path = arguments.pop(output_param)
+            if _has_stream_argument(arguments) or _is_stream(output_path):
+                return func(*args, **kwargs)
+            if arguments.get('encode_profile', False) is None:
+                arguments['encode_profile'] = DEFAULT_ENCODE_PROFILE
+            key_material = (func.__name__, _get_ffmpeg_version(), os.path.splitext(output_path)[1].lower(),
+                            _normalize_cache_value(arguments))
+            key = hashlib.sha256(repr(key_material).encode('utf8')).hexdigest()
+        except (TypeError, OSError, StopIteration):
+            return func(*args, **kwargs)
+
+        cached = _result_cache.get(key)
+        if cached is not None:
+            cached_path, template = cached
+            try:
+                _clone_or_copy(cached_path, output_path)
+                return f"{template.replace(_OUTPUT_TOKEN, output_path)} [served from result cache]"
+            except OSError:
+                pass
+
+        result = func(*args, **kwargs)
+        if not _is_error_result(result) and isinstance(result, str) and os.path.isfile(output_path):
+            try:
+                _result_cache.put(key, output_path, result.replace(output_path, _OUTPUT_TOKEN))
+            except OSError:
+                pass
+        return result
+    return wrapper
+
+# --- Encode Profiles ---
+# Named speed/quality trade-offs for the x264/x265 encoders, shared by every tool that re-encodes
+# video. 'standard' matches each encoder's own defaults (CRF 23 for x264, 28 for x265); 'draft' renders
+# many times faster for previews. x265 reaches a given quality at a CRF about 5 higher than x264.
+ENCODE_PROFILES = {
+    'draft': {'preset': 'ultrafast', 'crf': 28, 'crf_x265': 33},
+    'preview': {'preset': 'veryfast', 'crf': 23, 'crf_x265': 28},
+    'standard': {'preset': 'medium', 'crf': 23, 'crf_x265': 28},
+    'publish': {'preset': 'slow', 'crf': 18, 'crf_x265': 23},
+}
+DEFAULT_ENCODE_PROFILE = os.getenv("VIDEO_AUDIO_ENCODE_PROFILE", "standard")
+
+# Encoders that take -preset/-crf, and the containers whose default video encoder is libx264
+_PROFILE_ENCODERS = {'libx264', 'libx265', 'h264', 'hevc'}
+_X265_ENCODERS = {'libx265', 'hevc'}
+_X264_DEFAULT_CONTAINERS = {'mp4', 'm4v', 'mov', 'mkv', 'matroska'}
+
+def _check_encode_profile(encode_profile: str = None):
+    """Returns an error message if encode_profile (or the server default) is unknown, else None."""
+    name = encode_profile or DEFAULT_ENCODE_PROFILE
+    if name not in ENCODE_PROFILES:
+        return f"Error: Unknown encode_profile '{name}'. Available: {', '.join(ENCODE_PROFILES)}"
+    return None
+
+def _encode_options(output_path: str, encode_profile: str = None, video_codec: str = None,
+                    target_format: str = None, video_bitrate: str = None) -> dict:
+    """Returns the preset/crf output options of an encode profile, as ffmpeg-python kwargs.
+
+    Empty when the video encoder ffmpeg will use for output_path (or video_codec) is not x264/x265,
+    e.g. VP9 for .webm. CRF is left out when an explicit video bitrate is requested.
+    """
+    if video_codec is None:
+        container = (target_format or os.path.splitext(output_path)[1].lstrip('.')).lower()
+        if container not in _X264_DEFAULT_CONTAINERS:
+            return {}
+    elif video_codec not in _PROFILE_ENCODERS:
+        return {}
+    profile = ENCODE_PROFILES[encode_profile or DEFAULT_ENCODE_PROFILE]
+    options = {'preset': profile['preset']}
+    if not video_bitrate:
+        options['crf'] = profile['crf_x265'] if video_codec in _X265_ENCODERS else profile['crf']
+    return options
+
+def _encode_args(output_path: str, encode_profile: str = None, video_codec: str = None,
+                 video_bitrate: str = None) -> list:
+    """Returns _encode_options as a list of ffmpeg command-line arguments."""
+    options = _encode_options(output_path, encode_profile, video_codec, video_bitrate=video_bitrate)
+    return [arg for key, value in options.items() for arg in (f"-{key}", str(value))]
+
+# --- Stream Copy Planner ---
+# Decides from probe data, before anything runs, which streams can be stream-copied into the output
+# container. Tools then run a single ffmpeg job instead of trying a copy and re-running on failure.
+_MATROSKA_CONTAINERS = {'mkv', 'matroska', 'mka', 'nut'}  # Accept any codec
+_CONTAINER_CODECS = {
+    # container: (video codecs, audio codecs) that its muxer accepts for stream copy
+    'mp4': ({'h264', 'hevc', 'mpeg4', 'av1', 'vp9', 'mpeg2video', 'mjpeg'},
+            {'aac', 'mp3', 'alac', 'ac3', 'eac3', 'opus', 'flac', 'mp2'}),
+    'm4v': ({'h264', 'hevc', 'mpeg4', 'av1'}, {'aac', 'mp3', 'alac', 'ac3', 'eac3'}),
+    'mov': ({'h264', 'hevc', 'mpeg4', 'prores', 'mjpeg', 'av1', 'vp9', 'mpeg2video', 'dnxhd'},
+            {'aac', 'mp3', 'alac', 'ac3', 'eac3', 'opus', 'flac', 'pcm_s16le', 'pcm_s24le', 'pcm_f32le'}),
+    'webm': ({'vp8', 'vp9', 'av1'}, {'vorbis', 'opus'}),
+    'avi': ({'mpeg4', 'h264', 'mjpeg', 'msmpeg4v2', 'msmpeg4v3', 'mpeg2video', 'huffyuv', 'ffv1'},
+            {'mp3', 'ac3', 'aac', 'mp2', 'pcm_s16le'}),
+    'flv': ({'h264', 'flv1'}, {'aac', 'mp3'}),
+    'ts': ({'h264', 'hevc', 'mpeg2video', 'mpeg1video'}, {'aac', 'mp3', 'mp2', 'ac3', 'eac3', 'opus'}),
+    'mpg': ({'mpeg1video', 'mpeg2video'}, {'mp2', 'mp3', 'ac3'}),
+    'ogg': ({'theora'}, {'vorbis', 'opus', 'flac'}),
+    'gif': ({'gif'}, set()),
+}
+_CONTAINER_ALIASES = {'mpegts': 'ts', 'm2ts': 'ts', 'mts': 'ts', 'mpeg': 'mpg', 'vob': 'mpg',
+                      'ogv': 'ogg', 'f4v': 'mp4', '3gp': 'mp4', 'qt': 'mov'}
+
+def _output_container(output_path: str, target_format: str = None) -> str:
+    """Returns the normalized container name ffmpeg will mux output_path (or target_format) into."""
+    container = (target_format or os.path.splitext(output_path)[1].lstrip('.')).lower()
+    return _CONTAINER_ALIASES.get(container, container)
+
+def _stream_copy_plan(input_path: str, output_path: str, target_format: str = None) -> dict:
+    """Returns {'video': bool, 'audio': bool, 'has_video': bool, 'has_audio': bool} for input_path.
+
+    'video'/'audio' say whether that stream can be copied into the output container without
+    re-encoding. A missing stream counts as copyable; unknown containers never are. Stream inputs
+    are not probed (that would consume them), so nothing is copied from them.
+    """
+    if _is_stream(input_path):
+        return {'video': False, 'audio': False, 'has_video': True, 'has_audio': True}
+    probe = _probe_media(input_path)
+    video = next((s for s in probe['streams'] if s['codec_type'] == 'video'
+                  and not s.get('disposition', {}).get('attached_pic')), None)
+    audio = next((s for s in probe['streams'] if s['codec_type'] == 'audio'), None)
+    container = _output_container(output_path, target_format)
+
+    def copyable(stream, kind):
+        if stream is None:
+            return True
+        if container in _MATROSKA_CONTAINERS:
+            return True
+        if container not in _CONTAINER_CODECS:
+            return False
+        return stream.get('codec_name') in _CONTAINER_CODECS[container][kind]
+
+    return {
+        'video': copyable(video, 0),
+        'audio': copyable(audio, 1),
+        'has_video': video is not None,
+        'has_audio': audio is not None,
+    }
+
+def _copy_mode(copied_video: bool = None, copied_audio: bool = None) -> str:
+    """Describes a plan for status messages, e.g. 'audio copied' or 'video copied, audio re-encoded'."""
+    parts = [f"{name} {'copied' if copied else 're-encoded'}"
+             for name, copied in (('video', copied_video), ('audio', copied_audio)) if copied is not None]
+    return ", ".join(parts)
+
 # Add a simple health_check tool
 @mcp.tool()
 def health_check() -> str:
@@ -16,6 +1240,8 @@ def health_check() -> str:
     return "Server is healthy!"
 
 @mcp.tool()
+@_in_worker
+@_result_cached
 def extract_audio_from_video(video_path: str, output_audio_path: str, audio_codec: str = 'mp3') -> str:
     """Extracts audio from a video file and saves it.
     
@@ -29,7 +1255,7 @@ def extract_audio_from_video(video_path: str, output_audio_path: str, audio_code
     try:
         input_stream = ffmpeg.input(video_path)
         output_stream = input_stream.output(output_audio_path, acodec=audio_codec)
-        output_stream.run(capture_stdout=True, capture_stderr=True)
+        _run_ffmpeg(output_stream)
         return f"Audio extracted successfully to {output_audio_path}"
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -40,7 +1266,10 @@ def extract_audio_from_video(video_path: str, output_audio_path: str, audio_code
         return f"An unexpected error occurred: {str(e)}"
 
 @mcp.tool()
-def trim_video(video_path: str, output_video_path: str, start_time: str, end_time: str) -> str:
+@_in_worker
+@_result_cached
+def trim_video(video_path: str, output_video_path: str, start_time: str, end_time: str,
+               encode_profile: str = None, mode: str = 'copy') -> str:
     """Trims a video to the specified start and end times.
 
     Args:
@@ -48,32 +1277,118 @@ def trim_video(video_path: str, output_video_path: str, start_time: str, end_tim
         output_video_path: The path to save the trimmed video file.
         start_time: The start time for trimming (HH:MM:SS or seconds).
         end_time: The end time for trimming (HH:MM:SS or seconds).
+        encode_profile: Speed/quality profile for re-encoding video ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
+        mode: How the cut is made. Options:
+            - 'copy' (default): stream copy. Fast, but the cut snaps to keyframes. Re-encodes instead when
+              the output container cannot hold the source codec.
+            - 'reencode': re-encodes the whole range with frame-accurate cut points.
+            - 'smart': frame-accurate, but only the partial GOPs at the two cut points are re-encoded; everything
+              between them is stream-copied. Needs an H.264 (yuv420p) source, otherwise it re-encodes.
     Returns:
         A status message indicating success or failure.
     """
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    if mode not in ('copy', 'reencode', 'smart'):
+        return f"Error: Invalid mode '{mode}'. Must be 'copy', 'reencode' or 'smart'."
+    if not _input_exists(video_path):
+        return f"Error: Input video file not found at {video_path}"
+
+    def reencode():
+        input_stream_recode = ffmpeg.input(video_path, ss=start_time, to=end_time)
+        output_stream_recode = input_stream_recode.output(output_video_path, **_encode_options(output_video_path, encode_profile))
+        _run_ffmpeg(output_stream_recode)
+
+    if mode == 'smart':
+        try:
+            start_s, end_s = _parse_time_to_seconds(start_time), _parse_time_to_seconds(end_time)
+            if end_s <= start_s:
+                return "Error: end_time must be after start_time."
+            copied_frames = _smart_cut(video_path, output_video_path, start_s, end_s, encode_profile)
+            if copied_frames is not None:
+                return f"Video trimmed successfully (smart cut, {copied_frames} frames stream-copied) to {output_video_path}"
+            reencode()
+            return f"Video trimmed successfully (re-encoded; smart cut not possible for this source or range) to {output_video_path}"
+        except ffmpeg.Error as e:
+            error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+            return f"Error trimming video (smart cut): {error_message}"
+        except ValueError as e:
+            return f"Error with input values (e.g., time format): {str(e)}"
+        except Exception as e:
+            return f"An unexpected error occurred: {str(e)}"
+
+    if mode == 'reencode':
+        try:
+            reencode()
+            return f"Video trimmed successfully (re-encoded) to {output_video_path}"
+        except ffmpeg.Error as e:
+            error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+            return f"Error trimming video: {error_message}"
+        except Exception as e:
+            return f"An unexpected error occurred: {str(e)}"
+
     try:
+        plan = _stream_copy_plan(video_path, output_video_path)
+        if not plan['video']:
+            # The output container cannot take the source video codec (or the source is a stream), so re-encode
+            reencode()
+            return f"Video trimmed successfully (re-encoded; the source cannot be stream-copied into the output container) to {output_video_path}"
         input_stream = ffmpeg.input(video_path, ss=start_time, to=end_time)
-        # Attempt to copy codecs to avoid re-encoding if possible
-        output_stream = input_stream.output(output_video_path, c='copy') 
-        output_stream.run(capture_stdout=True, capture_stderr=True)
-        return f"Video trimmed successfully (codec copy) to {output_video_path}"
+        output_options = {'vcodec': 'copy'}
+        if plan['audio']:
+            output_options['acodec'] = 'copy'
+        _run_ffmpeg(input_stream.output(output_video_path, **output_options))
+        return f"Video trimmed successfully (codec copy; {_copy_mode(plan['video'], plan['audio'])}) to {output_video_path}"
     except ffmpeg.Error as e:
-        error_message_copy = e.stderr.decode('utf8') if e.stderr else str(e)
-        try:
-            # Fallback to re-encoding if codec copy fails
-            input_stream_recode = ffmpeg.input(video_path, ss=start_time, to=end_time)
-            output_stream_recode = input_stream_recode.output(output_video_path)
-            output_stream_recode.run(capture_stdout=True, capture_stderr=True)
-            return f"Video trimmed successfully (re-encoded) to {output_video_path}"
-        except ffmpeg.Error as e_recode:
-            error_message_recode = e_recode.stderr.decode('utf8') if e_recode.stderr else str(e_recode)
-            return f"Error trimming video. Copy attempt: {error_message_copy}. Re-encode attempt: {error_message_recode}"
+        error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+        return f"Error trimming video: {error_message}"
     except FileNotFoundError:
         return f"Error: Input video file not found at {video_path}"
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
 
 @mcp.tool()
+@_in_worker
+def get_keyframes(video_path: str, start_time: str = None, end_time: str = None) -> dict:
+    """Lists the keyframe times of a video's first video stream, from the persistent packet index.
+
+    Useful for choosing cut points: a trim_video 'copy' cut that starts on a keyframe is frame-accurate.
+
+    Args:
+        video_path: Path to the input video file.
+        start_time: Only list keyframes at or after this time (HH:MM:SS or seconds). Optional.
+        end_time: Only list keyframes at or before this time (HH:MM:SS or seconds). Optional.
+    Returns:
+        A dict with the keyframe times in seconds, the frame count and the average GOP length,
+        or an error message.
+    """
+    stream_error = _stream_input_error(video_path)
+    if stream_error:
+        return {'error': stream_error}
+    if not os.path.exists(video_path):
+        return {'error': f"Input video file not found at {video_path}"}
+    try:
+        start_s = _parse_time_to_seconds(start_time) if start_time is not None else float('-inf')
+        end_s = _parse_time_to_seconds(end_time) if end_time is not None else float('inf')
+        index = _get_packet_index(video_path)
+    except ValueError as e:
+        return {'error': f"Invalid time value: {str(e)}"}
+    except ffmpeg.Error as e:
+        return {'error': f"Error indexing video: {e.stderr.decode('utf8') if e.stderr else str(e)}"}
+    if not len(index):
+        return {'error': f"No video packets found in {video_path}"}
+    return {
+        'keyframes': [round(t, 6) for t in index.keyframes_between(start_s, end_s)],
+        'frame_count': len(index),
+        'keyframe_count': len(index.keyframes),
+        'average_gop_frames': round(len(index) / len(index.keyframes), 2) if index.keyframes else None,
+    }
+
+@mcp.tool()
+@_in_worker
+@_result_cached
 def convert_audio_properties(input_audio_path: str, output_audio_path: str, target_format: str, 
                                bitrate: str = None, sample_rate: int = None, channels: int = None) -> str:
     """Converts audio file format and ALL specified properties like bitrate, sample rate, and channels.
@@ -100,7 +1415,7 @@ def convert_audio_properties(input_audio_path: str, output_audio_path: str, targ
         kwargs['format'] = target_format
 
         output_stream = stream.output(output_audio_path, **kwargs)
-        output_stream.run(capture_stdout=True, capture_stderr=True)
+        _run_ffmpeg(output_stream)
         return f"Audio converted successfully to {output_audio_path} with format {target_format} and specified properties."
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -111,25 +1426,29 @@ def convert_audio_properties(input_audio_path: str, output_audio_path: str, targ
         return f"An unexpected error occurred: {str(e)}"
 
 @mcp.tool()
+@_in_worker
+@_result_cached
 def convert_video_properties(input_video_path: str, output_video_path: str, target_format: str,
                                resolution: str = None, video_codec: str = None, video_bitrate: str = None,
                                frame_rate: int = None, audio_codec: str = None, audio_bitrate: str = None,
-                               audio_sample_rate: int = None, audio_channels: int = None) -> str:
+                               audio_sample_rate: int = None, audio_channels: int = None,
+                               encode_profile: str = None) -> str:
     """Converts video file format and ALL specified properties like resolution, codecs, bitrates, and frame rate.
-    Args listed in PRD.
+    Args listed in PRD. encode_profile selects the x264/x265 speed/quality profile
+    ('draft', 'preview', 'standard', 'publish'); defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
     try:
         stream = ffmpeg.input(input_video_path)
         kwargs = {}
         vf_filters = []
 
         if resolution and resolution.lower() != 'preserve':
-            if 'x' in resolution: 
-                vf_filters.append(f"scale={resolution}")
-            else: 
-                vf_filters.append(f"scale=-2:{resolution}")
+            vf_filters.append(_scale_filter(resolution))
         
         if vf_filters:
             kwargs['vf'] = ",".join(vf_filters)
@@ -142,9 +1461,10 @@ def convert_video_properties(input_video_path: str, output_video_path: str, targ
         if audio_sample_rate: kwargs['ar'] = audio_sample_rate
         if audio_channels: kwargs['ac'] = audio_channels
         kwargs['format'] = target_format
+        kwargs.update(_encode_options(output_video_path, encode_profile, video_codec, target_format, video_bitrate))
 
         output_stream = stream.output(output_video_path, **kwargs)
-        output_stream.run(capture_stdout=True, capture_stderr=True)
+        _run_ffmpeg(output_stream)
         return f"Video converted successfully to {output_video_path} with format {target_format} and specified properties."
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -155,15 +1475,30 @@ def convert_video_properties(input_video_path: str, output_video_path: str, targ
         return f"An unexpected error occurred: {str(e)}"
 
 @mcp.tool()
+@_in_worker
+@_result_cached
 def change_aspect_ratio(video_path: str, output_video_path: str, target_aspect_ratio: str, 
-                          resize_mode: str = 'pad', padding_color: str = 'black') -> str:
+                          resize_mode: str = 'pad', padding_color: str = 'black', encode_profile: str = None) -> str:
     """Changes the aspect ratio of a video, using padding or cropping.
-    Args listed in PRD.
+    Args listed in PRD. encode_profile selects the x264/x265 speed/quality profile
+    ('draft', 'preview', 'standard', 'publish'); defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    try:
+        num, den = map(int, target_aspect_ratio.split(':'))
+        target_ar_val = num / den
+    except (ValueError, ZeroDivisionError):
+        return f"Error: Invalid target_aspect_ratio format. Expected 'num:den' (e.g., '16:9')."
+    stream_error = _stream_input_error(video_path)
+    if stream_error:
+        return f"Error: {stream_error}"
     try:
-        probe = ffmpeg.probe(video_path)
+        encode_options = _encode_options(output_video_path, encode_profile)
+        probe = _probe_media(video_path)
         video_stream_info = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
         if not video_stream_info:
             return "Error: No video stream found in the input file."
@@ -171,25 +1506,19 @@ def change_aspect_ratio(video_path: str, output_video_path: str, target_aspect_r
         original_width = int(video_stream_info['width'])
         original_height = int(video_stream_info['height'])
 
-        num, den = map(int, target_aspect_ratio.split(':'))
-        target_ar_val = num / den
         original_ar_val = original_width / original_height
 
         vf_filter = ""
-        # Attempt to copy codecs if the operation doesn't strictly require re-encoding video stream
-        # This is mostly for padding. Cropping implies re-encoding the video stream.
-        codec_to_use = None 
+        if resize_mode not in ('pad', 'crop'):
+            return f"Error: Invalid resize_mode '{resize_mode}'. Must be 'pad' or 'crop'."
+        if abs(original_ar_val - target_ar_val) < 1e-4:
+            message = _run_planned_ffmpeg(video_path, output_video_path, {}, copy_video=True, copy_audio=True,
+                                          video_encode_options=encode_options)
+            if message.startswith("Operation successful"):
+                return f"Video aspect ratio already matches. {message}"
+            return message
 
         if resize_mode == 'pad':
-            if abs(original_ar_val - target_ar_val) < 1e-4:
-                try:
-                    ffmpeg.input(video_path).output(output_video_path, c='copy').run(capture_stdout=True, capture_stderr=True)
-                    return f"Video aspect ratio already matches. Copied to {output_video_path}."
-                except ffmpeg.Error:
-                     # If copy fails, just re-encode
-                    ffmpeg.input(video_path).output(output_video_path).run(capture_stdout=True, capture_stderr=True)
-                    return f"Video aspect ratio already matches. Re-encoded to {output_video_path}."
-            
             if original_ar_val > target_ar_val: 
                 final_w = int(original_height * target_ar_val)
                 final_h = original_height
@@ -198,52 +1527,32 @@ def change_aspect_ratio(video_path: str, output_video_path: str, target_aspect_r
                 final_w = original_width
                 final_h = int(original_width / target_ar_val)
                 vf_filter = f"scale={final_w}:{final_h}:force_original_aspect_ratio=decrease,pad={final_w}:{final_h}:(ow-iw)/2:(oh-ih)/2:{padding_color}"
-            codec_to_use = 'copy' # Try to copy for padding, audio will be copied too
-
-        elif resize_mode == 'crop':
-            if abs(original_ar_val - target_ar_val) < 1e-4:
-                try:
-                    ffmpeg.input(video_path).output(output_video_path, c='copy').run(capture_stdout=True, capture_stderr=True)
-                    return f"Video aspect ratio already matches. Copied to {output_video_path}."
-                except ffmpeg.Error:
-                    ffmpeg.input(video_path).output(output_video_path).run(capture_stdout=True, capture_stderr=True)
-                    return f"Video aspect ratio already matches. Re-encoded to {output_video_path}."
-            
+        else:
             if original_ar_val > target_ar_val: 
                 new_width = int(original_height * target_ar_val)
                 vf_filter = f"crop={new_width}:{original_height}:(iw-{new_width})/2:0"
             else: 
                 new_height = int(original_width / target_ar_val)
                 vf_filter = f"crop={original_width}:{new_height}:0:(ih-{new_height})/2"
-        else:
-            return f"Error: Invalid resize_mode '{resize_mode}'. Must be 'pad' or 'crop'."
-        
-        try:
-            # Try with specified video filter and copying audio codec
-            ffmpeg.input(video_path).output(output_video_path, vf=vf_filter, acodec='copy').run(capture_stdout=True, capture_stderr=True)
-            return f"Video aspect ratio changed (audio copy) to {target_aspect_ratio} using {resize_mode}. Saved to {output_video_path}"
-        except ffmpeg.Error as e_acopy:
-            # Fallback to re-encoding audio if audio copy failed
-            try:
-                ffmpeg.input(video_path).output(output_video_path, vf=vf_filter).run(capture_stdout=True, capture_stderr=True)
-                return f"Video aspect ratio changed (audio re-encoded) to {target_aspect_ratio} using {resize_mode}. Saved to {output_video_path}"
-            except ffmpeg.Error as e_recode_all:
-                err_acopy_msg = e_acopy.stderr.decode('utf8') if e_acopy.stderr else str(e_acopy)
-                err_recode_msg = e_recode_all.stderr.decode('utf8') if e_recode_all.stderr else str(e_recode_all)
-                return f"Error changing aspect ratio. Audio copy attempt failed: {err_acopy_msg}. Full re-encode attempt also failed: {err_recode_msg}."
+
+        copy_audio = _stream_copy_plan(video_path, output_video_path)['audio']
+        if copy_audio:
+            encode_options['acodec'] = 'copy'
+        _run_ffmpeg(ffmpeg.input(video_path).output(output_video_path, vf=vf_filter, **encode_options))
+        return f"Video aspect ratio changed ({_copy_mode(copied_audio=copy_audio)}) to {target_aspect_ratio} using {resize_mode}. Saved to {output_video_path}"
 
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
         return f"Error changing aspect ratio: {error_message}"
     except FileNotFoundError:
         return f"Error: Input video file not found at {video_path}"
-    except ValueError:
-        return f"Error: Invalid target_aspect_ratio format. Expected 'num:den' (e.g., '16:9')."
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
 
 # --- Granular Audio Property Tools ---
 @mcp.tool()
+@_in_worker
+@_result_cached
 def convert_audio_format(input_audio_path: str, output_audio_path: str, target_format: str) -> str:
     """Converts an audio file to the specified target format.
     Args:
@@ -254,7 +1563,7 @@ def convert_audio_format(input_audio_path: str, output_audio_path: str, target_f
         A status message indicating success or failure.
     """
     try:
-        ffmpeg.input(input_audio_path).output(output_audio_path, format=target_format).run(capture_stdout=True, capture_stderr=True)
+        _run_ffmpeg(ffmpeg.input(input_audio_path).output(output_audio_path, format=target_format))
         return f"Audio format converted to {target_format} and saved to {output_audio_path}"
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -265,6 +1574,8 @@ def convert_audio_format(input_audio_path: str, output_audio_path: str, target_f
         return f"An unexpected error occurred: {str(e)}"
 
 @mcp.tool()
+@_in_worker
+@_result_cached
 def set_audio_bitrate(input_audio_path: str, output_audio_path: str, bitrate: str) -> str:
     """Sets the bitrate for an audio file.
     Args:
@@ -275,7 +1586,7 @@ def set_audio_bitrate(input_audio_path: str, output_audio_path: str, bitrate: st
         A status message indicating success or failure.
     """
     try:
-        ffmpeg.input(input_audio_path).output(output_audio_path, audio_bitrate=bitrate).run(capture_stdout=True, capture_stderr=True)
+        _run_ffmpeg(ffmpeg.input(input_audio_path).output(output_audio_path, audio_bitrate=bitrate))
         return f"Audio bitrate set to {bitrate} and saved to {output_audio_path}"
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -286,6 +1597,8 @@ def set_audio_bitrate(input_audio_path: str, output_audio_path: str, bitrate: st
         return f"An unexpected error occurred: {str(e)}"
 
 @mcp.tool()
+@_in_worker
+@_result_cached
 def set_audio_sample_rate(input_audio_path: str, output_audio_path: str, sample_rate: int) -> str:
     """Sets the sample rate for an audio file.
     Args:
@@ -296,7 +1609,7 @@ def set_audio_sample_rate(input_audio_path: str, output_audio_path: str, sample_
         A status message indicating success or failure.
     """
     try:
-        ffmpeg.input(input_audio_path).output(output_audio_path, ar=sample_rate).run(capture_stdout=True, capture_stderr=True)
+        _run_ffmpeg(ffmpeg.input(input_audio_path).output(output_audio_path, ar=sample_rate))
         return f"Audio sample rate set to {sample_rate} Hz and saved to {output_audio_path}"
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -307,6 +1620,8 @@ def set_audio_sample_rate(input_audio_path: str, output_audio_path: str, sample_
         return f"An unexpected error occurred: {str(e)}"
 
 @mcp.tool()
+@_in_worker
+@_result_cached
 def set_audio_channels(input_audio_path: str, output_audio_path: str, channels: int) -> str:
     """Sets the number of channels for an audio file (1 for mono, 2 for stereo).
     Args:
@@ -317,7 +1632,7 @@ def set_audio_channels(input_audio_path: str, output_audio_path: str, channels:
         A status message indicating success or failure.
     """
     try:
-        ffmpeg.input(input_audio_path).output(output_audio_path, ac=channels).run(capture_stdout=True, capture_stderr=True)
+        _run_ffmpeg(ffmpeg.input(input_audio_path).output(output_audio_path, ac=channels))
         return f"Audio channels set to {channels} and saved to {output_audio_path}"
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -329,161 +1644,271 @@ def set_audio_channels(input_audio_path: str, output_audio_path: str, channels:
 
 # --- Granular Video Property Tools ---
 
-def _run_ffmpeg_with_fallback(input_path: str, output_path: str, primary_kwargs: dict, fallback_kwargs: dict) -> str:
-    """Helper to run ffmpeg command with primary kwargs, falling back to other kwargs on ffmpeg.Error."""
+def _run_planned_ffmpeg(input_path: str, output_path: str, output_kwargs: dict, copy_video: bool = False,
+                        copy_audio: bool = False, video_encode_options: dict = None, target_format: str = None) -> str:
+    """Runs one ffmpeg job, stream-copying the requested streams only where _stream_copy_plan allows it.
+
+    video_encode_options are applied instead when the video is requested for copy but cannot be.
+    """
     try:
-        ffmpeg.input(input_path).output(output_path, **primary_kwargs).run(capture_stdout=True, capture_stderr=True)
-        return f"Operation successful (primary method) and saved to {output_path}"
-    except ffmpeg.Error as e_primary:
-        try:
-            ffmpeg.input(input_path).output(output_path, **fallback_kwargs).run(capture_stdout=True, capture_stderr=True)
-            return f"Operation successful (fallback method) and saved to {output_path}"
-        except ffmpeg.Error as e_fallback:
-            err_primary_msg = e_primary.stderr.decode('utf8') if e_primary.stderr else str(e_primary)
-            err_fallback_msg = e_fallback.stderr.decode('utf8') if e_fallback.stderr else str(e_fallback)
-            return f"Error. Primary method failed: {err_primary_msg}. Fallback method also failed: {err_fallback_msg}"
+        plan = _stream_copy_plan(input_path, output_path, target_format)
+        kwargs = dict(output_kwargs)
+        copied_video = copied_audio = None
+        if copy_video:
+            copied_video = plan['video']
+            if copied_video:
+                kwargs['vcodec'] = 'copy'
+            else:
+                kwargs.update(video_encode_options or {})
+        if copy_audio:
+            copied_audio = plan['audio']
+            if copied_audio:
+                kwargs['acodec'] = 'copy'
+        _run_ffmpeg(ffmpeg.input(input_path).output(output_path, **kwargs))
+        return f"Operation successful ({_copy_mode(copied_video, copied_audio)}) and saved to {output_path}"
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+        return f"Error processing {input_path}: {error_message}"
     except FileNotFoundError:
         return f"Error: Input file not found at {input_path}"
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
 
+def _scale_filter(resolution: str) -> str:
+    """Returns a scale filter for 'WxH', or for a bare height with the width kept even and in proportion."""
+    if 'x' in resolution:
+        return f"scale={resolution}"
+    return f"scale=-2:{resolution}"
+
 @mcp.tool()
-def convert_video_format(input_video_path: str, output_video_path: str, target_format: str) -> str:
-    """Converts a video file to the specified target format, attempting to copy codecs first.
+@_in_worker
+@_result_cached
+def convert_video_format(input_video_path: str, output_video_path: str, target_format: str,
+                         encode_profile: str = None) -> str:
+    """Converts a video file to the specified target format, copying every stream the format accepts as-is.
     Args:
         input_video_path: Path to the source video file.
         output_video_path: Path to save the converted video file.
         target_format: Desired output video format (e.g., 'mp4', 'mov', 'avi').
+        encode_profile: Speed/quality profile for the video re-encode ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
-    primary_kwargs = {'format': target_format, 'vcodec': 'copy', 'acodec': 'copy'}
-    fallback_kwargs = {'format': target_format} # Re-encode both streams
-    return _run_ffmpeg_with_fallback(input_video_path, output_video_path, primary_kwargs, fallback_kwargs)
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    video_encode_options = _encode_options(output_video_path, encode_profile, target_format=target_format)
+    return _run_planned_ffmpeg(input_video_path, output_video_path, {'format': target_format},
+                               copy_video=True, copy_audio=True, video_encode_options=video_encode_options,
+                               target_format=target_format)
 
 @mcp.tool()
-def set_video_resolution(input_video_path: str, output_video_path: str, resolution: str) -> str:
-    """Sets the resolution of a video, attempting to copy the audio stream.
+@_in_worker
+@_result_cached
+def set_video_resolution(input_video_path: str, output_video_path: str, resolution: str,
+                         encode_profile: str = None) -> str:
+    """Sets the resolution of a video, copying the audio stream when the output container accepts it.
     Args:
         input_video_path: Path to the source video file.
         output_video_path: Path to save the video with the new resolution.
         resolution: Target video resolution (e.g., '1920x1080', '1280x720', or '720' for height).
+        encode_profile: Speed/quality profile for the video re-encode ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
-    vf_filters = []
-    if 'x' in resolution:
-        vf_filters.append(f"scale={resolution}")
-    else:
-        vf_filters.append(f"scale=-2:{resolution}")
-    vf_filter_str = ",".join(vf_filters)
-    
-    primary_kwargs = {'vf': vf_filter_str, 'acodec': 'copy'}
-    fallback_kwargs = {'vf': vf_filter_str} # Re-encode audio
-    return _run_ffmpeg_with_fallback(input_video_path, output_video_path, primary_kwargs, fallback_kwargs)
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    vf_filter_str = _scale_filter(resolution)
+    encode_options = _encode_options(output_video_path, encode_profile)
+    return _run_planned_ffmpeg(input_video_path, output_video_path, {'vf': vf_filter_str, **encode_options},
+                               copy_audio=True)
 
 @mcp.tool()
-def set_video_codec(input_video_path: str, output_video_path: str, video_codec: str) -> str:
-    """Sets the video codec of a video, attempting to copy the audio stream.
+@_in_worker
+@_result_cached
+def set_video_codec(input_video_path: str, output_video_path: str, video_codec: str,
+                    encode_profile: str = None) -> str:
+    """Sets the video codec of a video, copying the audio stream when the output container accepts it.
     Args:
         input_video_path: Path to the source video file.
         output_video_path: Path to save the video with the new video codec.
         video_codec: Target video codec (e.g., 'libx264', 'libx265', 'vp9').
+        encode_profile: Speed/quality profile for the video re-encode ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
-    primary_kwargs = {'vcodec': video_codec, 'acodec': 'copy'}
-    fallback_kwargs = {'vcodec': video_codec} # Re-encode audio
-    return _run_ffmpeg_with_fallback(input_video_path, output_video_path, primary_kwargs, fallback_kwargs)
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    encode_options = _encode_options(output_video_path, encode_profile, video_codec)
+    return _run_planned_ffmpeg(input_video_path, output_video_path, {'vcodec': video_codec, **encode_options},
+                               copy_audio=True)
 
 @mcp.tool()
-def set_video_bitrate(input_video_path: str, output_video_path: str, video_bitrate: str) -> str:
-    """Sets the video bitrate of a video, attempting to copy the audio stream.
+@_in_worker
+@_result_cached
+def set_video_bitrate(input_video_path: str, output_video_path: str, video_bitrate: str,
+                      encode_profile: str = None) -> str:
+    """Sets the video bitrate of a video, copying the audio stream when the output container accepts it.
     Args:
         input_video_path: Path to the source video file.
         output_video_path: Path to save the video with the new video bitrate.
         video_bitrate: Target video bitrate (e.g., '1M', '2500k').
+        encode_profile: Profile whose encoder preset is used ('draft', 'preview', 'standard', 'publish');
+                        its CRF is ignored in favour of video_bitrate. Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
-    primary_kwargs = {'video_bitrate': video_bitrate, 'acodec': 'copy'}
-    fallback_kwargs = {'video_bitrate': video_bitrate} # Re-encode audio
-    return _run_ffmpeg_with_fallback(input_video_path, output_video_path, primary_kwargs, fallback_kwargs)
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    encode_options = _encode_options(output_video_path, encode_profile, video_bitrate=video_bitrate)
+    return _run_planned_ffmpeg(input_video_path, output_video_path, {'video_bitrate': video_bitrate, **encode_options},
+                               copy_audio=True)
 
 @mcp.tool()
-def set_video_frame_rate(input_video_path: str, output_video_path: str, frame_rate: int) -> str:
-    """Sets the frame rate of a video, attempting to copy the audio stream.
+@_in_worker
+@_result_cached
+def set_video_frame_rate(input_video_path: str, output_video_path: str, frame_rate: int,
+                         encode_profile: str = None) -> str:
+    """Sets the frame rate of a video, copying the audio stream when the output container accepts it.
     Args:
         input_video_path: Path to the source video file.
         output_video_path: Path to save the video with the new frame rate.
         frame_rate: Target video frame rate (e.g., 24, 30, 60).
+        encode_profile: Speed/quality profile for the video re-encode ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
-    primary_kwargs = {'r': frame_rate, 'acodec': 'copy'}
-    fallback_kwargs = {'r': frame_rate} # Re-encode audio
-    return _run_ffmpeg_with_fallback(input_video_path, output_video_path, primary_kwargs, fallback_kwargs)
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    encode_options = _encode_options(output_video_path, encode_profile)
+    return _run_planned_ffmpeg(input_video_path, output_video_path, {'r': frame_rate, **encode_options},
+                               copy_audio=True)
 
 @mcp.tool()
-def set_video_audio_track_codec(input_video_path: str, output_video_path: str, audio_codec: str) -> str:
-    """Sets the audio codec of a video's audio track, attempting to copy the video stream.
+@_in_worker
+@_result_cached
+def set_video_audio_track_codec(input_video_path: str, output_video_path: str, audio_codec: str,
+                                encode_profile: str = None) -> str:
+    """Sets the audio codec of a video's audio track, copying the video stream when the output container accepts it.
     Args:
         input_video_path: Path to the source video file.
         output_video_path: Path to save the video with the new audio codec.
         audio_codec: Target audio codec (e.g., 'aac', 'mp3').
+        encode_profile: Speed/quality profile used if the video has to be re-encoded ('draft', 'preview',
+                        'standard', 'publish'). Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
-    primary_kwargs = {'acodec': audio_codec, 'vcodec': 'copy'}
-    fallback_kwargs = {'acodec': audio_codec} # Re-encode video
-    return _run_ffmpeg_with_fallback(input_video_path, output_video_path, primary_kwargs, fallback_kwargs)
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    return _run_planned_ffmpeg(input_video_path, output_video_path, {'acodec': audio_codec},
+                               copy_video=True, video_encode_options=_encode_options(output_video_path, encode_profile))
 
 @mcp.tool()
-def set_video_audio_track_bitrate(input_video_path: str, output_video_path: str, audio_bitrate: str) -> str:
-    """Sets the audio bitrate of a video's audio track, attempting to copy the video stream.
+@_in_worker
+@_result_cached
+def set_video_audio_track_bitrate(input_video_path: str, output_video_path: str, audio_bitrate: str,
+                                  encode_profile: str = None) -> str:
+    """Sets the audio bitrate of a video's audio track, copying the video stream when the output container accepts it.
     Args:
         input_video_path: Path to the source video file.
         output_video_path: Path to save the video with the new audio bitrate.
         audio_bitrate: Target audio bitrate (e.g., '128k', '192k').
+        encode_profile: Speed/quality profile used if the video has to be re-encoded ('draft', 'preview',
+                        'standard', 'publish'). Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
-    primary_kwargs = {'audio_bitrate': audio_bitrate, 'vcodec': 'copy'}
-    fallback_kwargs = {'audio_bitrate': audio_bitrate} # Re-encode video
-    return _run_ffmpeg_with_fallback(input_video_path, output_video_path, primary_kwargs, fallback_kwargs)
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    return _run_planned_ffmpeg(input_video_path, output_video_path, {'audio_bitrate': audio_bitrate},
+                               copy_video=True, video_encode_options=_encode_options(output_video_path, encode_profile))
 
 @mcp.tool()
-def set_video_audio_track_sample_rate(input_video_path: str, output_video_path: str, audio_sample_rate: int) -> str:
-    """Sets the audio sample rate of a video's audio track, attempting to copy the video stream.
+@_in_worker
+@_result_cached
+def set_video_audio_track_sample_rate(input_video_path: str, output_video_path: str, audio_sample_rate: int,
+                                      encode_profile: str = None) -> str:
+    """Sets the audio sample rate of a video's audio track, copying the video stream when the output container accepts it.
     Args:
         input_video_path: Path to the source video file.
         output_video_path: Path to save the video with the new audio sample rate.
         audio_sample_rate: Target audio sample rate in Hz (e.g., 44100, 48000).
+        encode_profile: Speed/quality profile used if the video has to be re-encoded ('draft', 'preview',
+                        'standard', 'publish'). Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
-    primary_kwargs = {'ar': audio_sample_rate, 'vcodec': 'copy'} # ar for audio sample rate
-    fallback_kwargs = {'ar': audio_sample_rate} # Re-encode video
-    return _run_ffmpeg_with_fallback(input_video_path, output_video_path, primary_kwargs, fallback_kwargs)
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    return _run_planned_ffmpeg(input_video_path, output_video_path, {'ar': audio_sample_rate}, # ar for audio sample rate
+                               copy_video=True, video_encode_options=_encode_options(output_video_path, encode_profile))
 
 @mcp.tool()
-def set_video_audio_track_channels(input_video_path: str, output_video_path: str, audio_channels: int) -> str:
-    """Sets the number of audio channels of a video's audio track, attempting to copy the video stream.
+@_in_worker
+@_result_cached
+def set_video_audio_track_channels(input_video_path: str, output_video_path: str, audio_channels: int,
+                                   encode_profile: str = None) -> str:
+    """Sets the number of audio channels of a video's audio track, copying the video stream when the output container accepts it.
     Args:
         input_video_path: Path to the source video file.
         output_video_path: Path to save the video with the new audio channel layout.
         audio_channels: Number of audio channels (1 for mono, 2 for stereo).
+        encode_profile: Speed/quality profile used if the video has to be re-encoded ('draft', 'preview',
+                        'standard', 'publish'). Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
-    primary_kwargs = {'ac': audio_channels, 'vcodec': 'copy'} # ac for audio channels
-    fallback_kwargs = {'ac': audio_channels} # Re-encode video
-    return _run_ffmpeg_with_fallback(input_video_path, output_video_path, primary_kwargs, fallback_kwargs)
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    return _run_planned_ffmpeg(input_video_path, output_video_path, {'ac': audio_channels}, # ac for audio channels
+                               copy_video=True, video_encode_options=_encode_options(output_video_path, encode_profile))
 
 # --- Phase 3: Overlays and Basic Enhancements ---
 
+def _subtitles_filter(srt_file_path: str, font_style: dict = None) -> str:
+    """Builds the subtitles filter string, with force_style built from a font_style dict (see add_subtitles)."""
+    style_args = []
+    if font_style:
+        if 'font_name' in font_style: style_args.append(f"FontName={font_style['font_name']}")
+        if 'font_size' in font_style: style_args.append(f"FontSize={font_style['font_size']}")
+        if 'font_color' in font_style: style_args.append(f"PrimaryColour={font_style['font_color']}")
+        if 'outline_color' in font_style: style_args.append(f"OutlineColour={font_style['outline_color']}")
+        if 'outline_width' in font_style: style_args.append(f"Outline={font_style['outline_width']}") # Outline thickness
+        if 'shadow_color' in font_style: style_args.append(f"ShadowColour={font_style['shadow_color']}")
+        if 'shadow_offset_x' in font_style or 'shadow_offset_y' in font_style:
+            # FFmpeg 'Shadow' is more like a distance. Outline might be better for simple shadow.
+            # For more control, ASS uses ShadowX, ShadowY. Let's use 'Shadow' for simplicity if only one is given.
+            shadow_val = font_style.get('shadow_offset_x', font_style.get('shadow_offset_y', 1))
+            style_args.append(f"Shadow={shadow_val}")
+        if 'alignment' in font_style: style_args.append(f"Alignment={font_style['alignment']}")
+        if 'margin_v' in font_style: style_args.append(f"MarginV={font_style['margin_v']}")
+        if 'margin_l' in font_style: style_args.append(f"MarginL={font_style['margin_l']}")
+        if 'margin_r' in font_style: style_args.append(f"MarginR={font_style['margin_r']}")
+        # Add more style mappings as needed based on FFmpeg/ASS capabilities
+
+    vf_filter_value = f"subtitles='{srt_file_path}'"
+    if style_args:
+        vf_filter_value += f":force_style='{','.join(style_args)}'"
+    return vf_filter_value
+
 @mcp.tool()
-def add_subtitles(video_path: str, srt_file_path: str, output_video_path: str, font_style: dict = None) -> str:
+@_in_worker
+@_result_cached
+def add_subtitles(video_path: str, srt_file_path: str, output_video_path: str, font_style: dict = None,
+                  encode_profile: str = None) -> str:
     """Burns subtitles from an SRT file onto a video, with optional styling.
 
     Args:
@@ -505,57 +1930,32 @@ def add_subtitles(video_path: str, srt_file_path: str, output_video_path: str, f
             - 'margin_l': 10 (int, left margin)
             - 'margin_r': 10 (int, right margin)
             Default is None, which uses FFmpeg's default subtitle styling.
+        encode_profile: Speed/quality profile for the video re-encode ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
 
     Returns:
         A status message indicating success or failure.
     """
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
     try:
         # Basic validation for file existence
-        if not os.path.exists(video_path):
+        if not _input_exists(video_path):
             return f"Error: Input video file not found at {video_path}"
         if not os.path.exists(srt_file_path):
             return f"Error: SRT subtitle file not found at {srt_file_path}"
 
         input_stream = ffmpeg.input(video_path)
-        
-        style_args = []
-        if font_style:
-            if 'font_name' in font_style: style_args.append(f"FontName={font_style['font_name']}")
-            if 'font_size' in font_style: style_args.append(f"FontSize={font_style['font_size']}")
-            if 'font_color' in font_style: style_args.append(f"PrimaryColour={font_style['font_color']}")
-            if 'outline_color' in font_style: style_args.append(f"OutlineColour={font_style['outline_color']}")
-            if 'outline_width' in font_style: style_args.append(f"Outline={font_style['outline_width']}") # Outline thickness
-            if 'shadow_color' in font_style: style_args.append(f"ShadowColour={font_style['shadow_color']}")
-            if 'shadow_offset_x' in font_style or 'shadow_offset_y' in font_style:
-                # FFmpeg 'Shadow' is more like a distance. Outline might be better for simple shadow.
-                # For more control, ASS uses ShadowX, ShadowY. Let's use 'Shadow' for simplicity if only one is given.
-                shadow_val = font_style.get('shadow_offset_x', font_style.get('shadow_offset_y', 1))
-                style_args.append(f"Shadow={shadow_val}")
-            if 'alignment' in font_style: style_args.append(f"Alignment={font_style['alignment']}")
-            if 'margin_v' in font_style: style_args.append(f"MarginV={font_style['margin_v']}")
-            if 'margin_l' in font_style: style_args.append(f"MarginL={font_style['margin_l']}")
-            if 'margin_r' in font_style: style_args.append(f"MarginR={font_style['margin_r']}")
-            # Add more style mappings as needed based on FFmpeg/ASS capabilities
-
-        vf_filter_value = f"subtitles='{srt_file_path}'"
-        if style_args:
-            vf_filter_value += f":force_style='{','.join(style_args)}'"
-
-        # Attempt to copy audio codec to speed up processing if possible
-        output_stream = input_stream.output(output_video_path, vf=vf_filter_value, acodec='copy')
-        try:
-            output_stream.run(capture_stdout=True, capture_stderr=True)
-            return f"Subtitles added successfully (audio copied) to {output_video_path}"
-        except ffmpeg.Error as e_acopy:
-            # Fallback to re-encoding audio if audio copy failed
-            output_stream_recode_audio = input_stream.output(output_video_path, vf=vf_filter_value)
-            try:
-                output_stream_recode_audio.run(capture_stdout=True, capture_stderr=True)
-                return f"Subtitles added successfully (audio re-encoded) to {output_video_path}"
-            except ffmpeg.Error as e_recode_all:
-                err_acopy_msg = e_acopy.stderr.decode('utf8') if e_acopy.stderr else str(e_acopy)
-                err_recode_msg = e_recode_all.stderr.decode('utf8') if e_recode_all.stderr else str(e_recode_all)
-                return f"Error adding subtitles. Audio copy attempt: {err_acopy_msg}. Full re-encode attempt: {err_recode_msg}"
+        vf_filter_value = _subtitles_filter(srt_file_path, font_style)
+
+        # Copy the audio codec to speed up processing when the output container accepts it
+        encode_options = _encode_options(output_video_path, encode_profile)
+        copy_audio = _stream_copy_plan(video_path, output_video_path)['audio']
+        if copy_audio:
+            encode_options['acodec'] = 'copy'
+        _run_ffmpeg(input_stream.output(output_video_path, vf=vf_filter_value, **encode_options))
+        return f"Subtitles added successfully ({_copy_mode(copied_audio=copy_audio)}) to {output_video_path}"
 
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -565,8 +1965,56 @@ def add_subtitles(video_path: str, srt_file_path: str, output_video_path: str, f
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
 
+def _drawtext_filter(text_elements: list[dict]) -> str:
+    """Builds a chain of drawtext filters from text_elements (see add_text_overlay). Raises ValueError on a malformed element."""
+    drawtext_filters = []
+
+    for element in text_elements:
+        text = element.get('text')
+        start_time = element.get('start_time')
+        end_time = element.get('end_time')
+
+        if text is None or start_time is None or end_time is None:
+            raise ValueError("Text element is missing required keys (text, start_time, end_time).")
+        
+        # Thoroughly escape special characters in text
+        # Escape single quotes, colons, commas, backslashes, and any other special chars
+        safe_text = text.replace('\\', '\\\\').replace("'", "\\'").replace(':', '\\:').replace(',', '\\,')
+        
+        # Build filter parameters
+        filter_params = [
+            f"text='{safe_text}'",
+            f"fontsize={element.get('font_size', 24)}",
+            f"fontcolor={element.get('font_color', 'white')}",
+            f"x={element.get('x_pos', '(w-text_w)/2')}",
+            f"y={element.get('y_pos', 'h-text_h-10')}",
+            f"enable=between(t\\,{start_time}\\,{end_time})"
+        ]
+
+        # Add box parameters if box is enabled
+        if element.get('box', False):
+            filter_params.append("box=1")
+            filter_params.append(f"boxcolor={element.get('box_color', 'black@0.5')}")
+            if 'box_border_width' in element:
+                filter_params.append(f"boxborderw={element['box_border_width']}")
+
+        # Add font file if specified
+        if 'font_file' in element:
+            font_path = element['font_file'].replace('\\', '\\\\').replace("'", "\\'").replace(':', '\\:')
+            filter_params.append(f"fontfile='{font_path}'")
+
+        # Join all parameters with colons
+        drawtext_filter = f"drawtext={':'.join(filter_params)}"
+        drawtext_filters.append(drawtext_filter)
+
+    # Join all drawtext filters with commas
+    return ','.join(drawtext_filters)
+
 @mcp.tool()
-def add_text_overlay(video_path: str, output_video_path: str, text_elements: list[dict]) -> str:
+@_in_worker
+@_result_cached
+def add_text_overlay(video_path: str, output_video_path: str, text_elements: list[dict],
+                     encode_profile: str = None) -> str:
     """Adds one or more text overlays to a video at specified times and positions.
 
     Args:
@@ -585,74 +2033,31 @@ def add_text_overlay(video_path: str, output_video_path: str, text_elements: lis
             - 'box': bool (default: False)
             - 'box_color': str (default: 'black@0.5')
             - 'box_border_width': int (default: 0)
+        encode_profile: Speed/quality profile for the video re-encode ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
     try:
-        if not os.path.exists(video_path):
+        if not _input_exists(video_path):
             return f"Error: Input video file not found at {video_path}"
         if not text_elements:
             return "Error: No text elements provided for overlay."
 
         input_stream = ffmpeg.input(video_path)
-        drawtext_filters = []
-
-        for element in text_elements:
-            text = element.get('text')
-            start_time = element.get('start_time')
-            end_time = element.get('end_time')
-
-            if text is None or start_time is None or end_time is None:
-                return f"Error: Text element is missing required keys (text, start_time, end_time)."
-            
-            # Thoroughly escape special characters in text
-            # Escape single quotes, colons, commas, backslashes, and any other special chars
-            safe_text = text.replace('\\', '\\\\').replace("'", "\\'").replace(':', '\\:').replace(',', '\\,')
-            
-            # Build filter parameters
-            filter_params = [
-                f"text='{safe_text}'",
-                f"fontsize={element.get('font_size', 24)}",
-                f"fontcolor={element.get('font_color', 'white')}",
-                f"x={element.get('x_pos', '(w-text_w)/2')}",
-                f"y={element.get('y_pos', 'h-text_h-10')}",
-                f"enable=between(t\\,{start_time}\\,{end_time})"
-            ]
-
-            # Add box parameters if box is enabled
-            if element.get('box', False):
-                filter_params.append("box=1")
-                filter_params.append(f"boxcolor={element.get('box_color', 'black@0.5')}")
-                if 'box_border_width' in element:
-                    filter_params.append(f"boxborderw={element['box_border_width']}")
-
-            # Add font file if specified
-            if 'font_file' in element:
-                font_path = element['font_file'].replace('\\', '\\\\').replace("'", "\\'").replace(':', '\\:')
-                filter_params.append(f"fontfile='{font_path}'")
-
-            # Join all parameters with colons
-            drawtext_filter = f"drawtext={':'.join(filter_params)}"
-            drawtext_filters.append(drawtext_filter)
-
-        # Join all drawtext filters with commas
-        final_vf_filter = ','.join(drawtext_filters)
-
         try:
-            # First attempt: try to copy audio codec
-            stream = input_stream.output(output_video_path, vf=final_vf_filter, acodec='copy')
-            stream.run(capture_stdout=True, capture_stderr=True)
-            return f"Text overlays added successfully (audio copied) to {output_video_path}"
-        except ffmpeg.Error as e_acopy:
-            try:
-                # Second attempt: re-encode audio if copying fails
-                stream_recode = input_stream.output(output_video_path, vf=final_vf_filter)
-                stream_recode.run(capture_stdout=True, capture_stderr=True)
-                return f"Text overlays added successfully (audio re-encoded) to {output_video_path}"
-            except ffmpeg.Error as e_recode_all:
-                err_acopy_msg = e_acopy.stderr.decode('utf8') if e_acopy.stderr else str(e_acopy)
-                err_recode_msg = e_recode_all.stderr.decode('utf8') if e_recode_all.stderr else str(e_recode_all)
-                return f"Error adding text overlays. Audio copy attempt: {err_acopy_msg}. Full re-encode attempt: {err_recode_msg}"
+            final_vf_filter = _drawtext_filter(text_elements)
+        except ValueError as e:
+            return f"Error: {e}"
+        encode_options = _encode_options(output_video_path, encode_profile)
+        copy_audio = _stream_copy_plan(video_path, output_video_path)['audio']
+        if copy_audio:
+            encode_options['acodec'] = 'copy'
+        _run_ffmpeg(input_stream.output(output_video_path, vf=final_vf_filter, **encode_options))
+        return f"Text overlays added successfully ({_copy_mode(copied_audio=copy_audio)}) to {output_video_path}"
 
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -662,11 +2067,34 @@ def add_text_overlay(video_path: str, output_video_path: str, text_elements: lis
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
 
+def _overlay_coordinates(position: str) -> tuple:
+    """Maps an add_image_overlay position name (or 'x=..:y=..') to overlay filter x/y expressions."""
+    overlay_x_pos = '0'
+    overlay_y_pos = '0'
+    if position == 'top_left':
+        overlay_x_pos, overlay_y_pos = '10', '10'
+    elif position == 'top_right':
+        overlay_x_pos, overlay_y_pos = 'main_w-overlay_w-10', '10'
+    elif position == 'bottom_left':
+        overlay_x_pos, overlay_y_pos = '10', 'main_h-overlay_h-10'
+    elif position == 'bottom_right':
+        overlay_x_pos, overlay_y_pos = 'main_w-overlay_w-10', 'main_h-overlay_h-10'
+    elif position == 'center':
+        overlay_x_pos, overlay_y_pos = '(main_w-overlay_w)/2', '(main_h-overlay_h)/2'
+    elif ':' in position:
+        pos_parts = position.split(':')
+        for part in pos_parts:
+            if part.startswith('x='): overlay_x_pos = part.split('=')[1]
+            if part.startswith('y='): overlay_y_pos = part.split('=')[1]
+    return overlay_x_pos, overlay_y_pos
+
 @mcp.tool()
+@_in_worker
+@_result_cached
 def add_image_overlay(video_path: str, output_video_path: str, image_path: str, 
                         position: str = 'top_right', opacity: float = None, 
                         start_time: str = None, end_time: str = None, 
-                        width: str = None, height: str = None) -> str:
+                        width: str = None, height: str = None, encode_profile: str = None) -> str:
     """Adds an image overlay (watermark/logo) to a video.
 
     Args:
@@ -681,12 +2109,17 @@ def add_image_overlay(video_path: str, output_video_path: str, image_path: str,
         end_time: End time for the overlay (HH:MM:SS or seconds). If None, lasts till end.
         width: Width for the overlay image (e.g., '100', 'iw*0.1'). Original if None.
         height: Height for the overlay image (e.g., '50', 'ih*0.1'). Original if None.
+        encode_profile: Speed/quality profile for the video re-encode ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
 
     Returns:
         A status message indicating success or failure.
     """
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
     try:
-        if not os.path.exists(video_path):
+        if not _input_exists(video_path):
             return f"Error: Input video file not found at {video_path}"
         if not os.path.exists(image_path):
             return f"Error: Overlay image file not found at {image_path}"
@@ -713,26 +2146,11 @@ def add_image_overlay(video_path: str, output_video_path: str, image_path: str,
             processed_overlay = processed_overlay.filter('colorchannelmixer', aa=str(opacity))
 
         # Determine overlay position coordinates
-        overlay_x_pos = '0'
-        overlay_y_pos = '0'
-        if position == 'top_left':
-            overlay_x_pos, overlay_y_pos = '10', '10'
-        elif position == 'top_right':
-            overlay_x_pos, overlay_y_pos = 'main_w-overlay_w-10', '10'
-        elif position == 'bottom_left':
-            overlay_x_pos, overlay_y_pos = '10', 'main_h-overlay_h-10'
-        elif position == 'bottom_right':
-            overlay_x_pos, overlay_y_pos = 'main_w-overlay_w-10', 'main_h-overlay_h-10'
-        elif position == 'center':
-            overlay_x_pos, overlay_y_pos = '(main_w-overlay_w)/2', '(main_h-overlay_h)/2'
-        elif ':' in position:
-            pos_parts = position.split(':')
-            for part in pos_parts:
-                if part.startswith('x='): overlay_x_pos = part.split('=')[1]
-                if part.startswith('y='): overlay_y_pos = part.split('=')[1]
+        overlay_x_pos, overlay_y_pos = _overlay_coordinates(position)
 
         # Prepare overlay filter parameters
         overlay_filter_kwargs = {'x': overlay_x_pos, 'y': overlay_y_pos}
+        encode_options = _encode_options(output_video_path, encode_profile)
         
         # Add time-based enabling condition if specified
         if start_time is not None or end_time is not None:
@@ -743,24 +2161,17 @@ def add_image_overlay(video_path: str, output_video_path: str, image_path: str,
                 enable_expr = f"gte(t,{actual_start_time})"
             overlay_filter_kwargs['enable'] = enable_expr
 
-        try:
-            # Attempt 1: Create overlay with audio copying
-            video_with_overlay = ffmpeg.filter([main_input, processed_overlay], 'overlay', **overlay_filter_kwargs)
-            output_node = ffmpeg.output(video_with_overlay, main_input.audio, output_video_path, acodec='copy')
-            output_node.run(capture_stdout=True, capture_stderr=True)
-            return f"Image overlay added successfully (audio copied) to {output_video_path}"
-        except ffmpeg.Error as e_acopy:
-            try:
-                # Attempt 2: Re-encode audio if copying fails
-                # We need to reconstruct the filter chain
-                video_with_overlay_fallback = ffmpeg.filter([main_input, processed_overlay], 'overlay', **overlay_filter_kwargs)
-                output_node_fallback = ffmpeg.output(video_with_overlay_fallback, main_input.audio, output_video_path)
-                output_node_fallback.run(capture_stdout=True, capture_stderr=True)
-                return f"Image overlay added successfully (audio re-encoded) to {output_video_path}"
-            except ffmpeg.Error as e_recode:
-                err_acopy_msg = e_acopy.stderr.decode('utf8') if e_acopy.stderr else str(e_acopy)
-                err_recode_msg = e_recode.stderr.decode('utf8') if e_recode.stderr else str(e_recode)
-                return f"Error adding image overlay. Audio copy attempt: {err_acopy_msg}. Full re-encode attempt: {err_recode_msg}"
+        plan = _stream_copy_plan(video_path, output_video_path)
+        video_with_overlay = ffmpeg.filter([main_input, processed_overlay], 'overlay', **overlay_filter_kwargs)
+        output_streams = [video_with_overlay]
+        copy_audio = None
+        if plan['has_audio']:
+            output_streams.append(main_input['a?'])  # Optional, as stream inputs are not probed
+            copy_audio = plan['audio']
+            if copy_audio:
+                encode_options['acodec'] = 'copy'
+        _run_ffmpeg(ffmpeg.output(*output_streams, output_video_path, **encode_options))
+        return f"Image overlay added successfully ({_copy_mode(copied_audio=copy_audio) or 'no audio'}) to {output_video_path}"
 
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -772,11 +2183,105 @@ def add_image_overlay(video_path: str, output_video_path: str, image_path: str,
 
 # --- Phase 4: More Complex Editing & Basic AI Audio Features ---
 
+def _concat_signature(media_path: str) -> tuple:
+    """Returns the stream parameters that must be identical for clips to be joined with stream copy."""
+    probe = _probe_media(media_path)
+    video = next((s for s in probe['streams'] if s['codec_type'] == 'video'
+                  and not s.get('disposition', {}).get('attached_pic')), None)
+    audio = next((s for s in probe['streams'] if s['codec_type'] == 'audio'), None)
+    video_part = (video.get('codec_name'), video.get('profile'), video.get('width'), video.get('height'),
+                  video.get('pix_fmt'), video.get('avg_frame_rate')) if video else None
+    audio_part = (audio.get('codec_name'), audio.get('sample_rate'), audio.get('channels')) if audio else None
+    return (video_part, audio_part)
+
+# libx264 profile names for the H.264 profiles ffprobe reports
+_X264_PROFILES = {'High': 'high', 'Main': 'main', 'Constrained Baseline': 'baseline', 'Baseline': 'baseline'}
+
+def _concat_match_args(signature: tuple):
+    """Returns extra libx264/aac arguments that reproduce a clip signature exactly, or None if
+    our normalization cannot produce stream-copy compatible clips for it.
+    """
+    video_part, audio_part = signature
+    if video_part is None or audio_part is None:
+        return None
+    codec, profile, _, _, pix_fmt, _ = video_part
+    audio_codec, sample_rate, channels = audio_part
+    if codec != 'h264' or profile not in _X264_PROFILES or pix_fmt != 'yuv420p' or audio_codec != 'aac':
+        return None
+    return ['-profile:v', _X264_PROFILES[profile], '-pix_fmt', pix_fmt, '-ar', str(sample_rate), '-ac', str(channels)]
+
+def _concatenate_with_xfade(video_paths: list, output_video_path: str, boundary_transitions: list,
+                            threads: int = None, encode_profile: str = None) -> str:
+    """Joins videos with chained xfade/acrossfade filters in a single ffmpeg pass.
+
+    Every input is scaled, resampled to a common frame rate and pixel format inside the graph, so no
+    normalized intermediates are written. Offsets are computed from the running output length.
+    Raises ValueError if a transition does not fit the clips around it.
+    """
+    props = [_get_media_properties(path) for path in video_paths]
+    if not all(p['has_video'] for p in props):
+        raise ValueError("xfade transitions require every input to be a video.")
+    # If any input lacks audio the result is video-only
+    has_audio = all(p['has_audio'] for p in props)
+
+    # Common target properties, preferring the largest input (or a sensible minimum)
+    target_w = max(max(p['width'] for p in props), 640)
+    target_h = max(max(p['height'] for p in props), 360)
+    target_fps = max(max(p['avg_fps'] for p in props), 30)
+    if target_fps <= 0:
+        target_fps = 30 # safety net
+    target_rate = props[0]['sample_rate']
+
+    for i, (_, duration) in enumerate(boundary_transitions):
+        if duration >= props[i]['duration'] or duration >= props[i + 1]['duration']:
+            raise ValueError(f"Transition duration ({duration}s) at boundary {i} must be shorter than both adjacent "
+                             f"videos ({props[i]['duration']}s and {props[i + 1]['duration']}s).")
+    for i in range(1, len(props) - 1):
+        if boundary_transitions[i - 1][1] + boundary_transitions[i][1] > props[i]['duration']:
+            raise ValueError(f"Transitions on both sides of video {i} overlap; video {i} is only {props[i]['duration']}s long.")
+
+    filter_parts = []
+    for i in range(len(video_paths)):
+        filter_parts.append(f"[{i}:v]scale={target_w}:{target_h},setsar=1,fps={target_fps},format=yuv420p,settb=AVTB[v{i}]")
+        if has_audio:
+            filter_parts.append(f"[{i}:a]aformat=sample_fmts=fltp:sample_rates={target_rate}:channel_layouts=stereo,"
+                                f"asetpts=PTS-STARTPTS[a{i}]")
+
+    video_label, audio_label = "[v0]", "[a0]"
+    output_length = props[0]['duration']
+    for i, (effect, duration) in enumerate(boundary_transitions, start=1):
+        offset = output_length - duration
+        filter_parts.append(f"{video_label}[v{i}]xfade=transition={effect}:duration={duration}:offset={offset:.6f}[xv{i}]")
+        video_label = f"[xv{i}]"
+        if has_audio:
+            filter_parts.append(f"{audio_label}[a{i}]acrossfade=d={duration}:c1=tri:c2=tri[xa{i}]")
+            audio_label = f"[xa{i}]"
+        output_length += props[i]['duration'] - duration
+
+    cmd = ['ffmpeg']
+    for path in video_paths:
+        cmd.extend(['-i', path])
+    cmd.extend(['-filter_complex', ";".join(filter_parts), '-map', video_label])
+    if has_audio:
+        cmd.extend(['-map', audio_label])
+    cmd.extend(['-c:v', 'libx264', '-c:a', 'aac', *_encode_args(output_video_path, encode_profile, 'libx264')])
+    if threads:
+        cmd.extend(['-threads', str(threads)])
+    cmd.extend(['-y', output_video_path])
+    _run_ffmpeg(cmd, output_duration=output_length)
+
+    effects = sorted({effect for effect, _ in boundary_transitions})
+    return f"Videos concatenated successfully with '{', '.join(effects)}' transition(s) to {output_video_path}"
+
 @mcp.tool()
+@_in_worker
+@_result_cached
 def concatenate_videos(video_paths: list[str], output_video_path: str,
-                       transition_effect: str = None, transition_duration: float = None) -> str:
+                       transition_effect: str = None, transition_duration: float = None,
+                       max_workers: int = None, threads_per_job: int = None,
+                       transitions: list[dict] = None, encode_profile: str = None) -> str:
     """Concatenates multiple video files into a single output file.
-    Supports optional xfade transition when concatenating exactly two videos.
+    Supports optional xfade transitions between any number of videos, rendered in a single pass.
 
     Args:
         video_paths: A list of paths to the video files to concatenate.
@@ -805,13 +2310,25 @@ def concatenate_videos(video_paths: list[str], output_video_path: str,
             - 'pixelize': Pixelize effect
             - 'radial': Radial transition
             - 'hblur': Horizontal blur
-            Only applied if exactly two videos are provided. Defaults to None (no transition).
+            Applied at every boundary unless overridden by transitions. Defaults to None (no transition).
         transition_duration (float, optional): The duration of the xfade transition in seconds. 
                                              Required if transition_effect is specified. Defaults to None.
+        max_workers (int, optional): Number of inputs normalized in parallel.
+                                     Defaults to VIDEO_AUDIO_CONCAT_WORKERS.
+        threads_per_job (int, optional): ffmpeg '-threads' for each normalization.
+                                         Defaults to the CPU count divided by max_workers.
+        transitions (list[dict], optional): Per-boundary transitions, one dict per pair of adjacent
+            videos, with keys 'effect' and 'duration'. Missing keys fall back to transition_effect
+            and transition_duration.
+        encode_profile (str, optional): Speed/quality profile for re-encoded video ('draft', 'preview',
+            'standard', 'publish'). Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     
     Returns:
         A status message indicating success or failure.
     """
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
     if not video_paths:
         return "Error: No video paths provided for concatenation."
     if len(video_paths) < 1: # Allow single video to be "concatenated" (effectively copied/re-encoded)
@@ -821,8 +2338,29 @@ def concatenate_videos(video_paths: list[str], output_video_path: str,
         return "Error: transition_duration is required when transition_effect is specified."
     if transition_effect and transition_duration <= 0:
         return "Error: transition_duration must be positive."
-
-    # Validate transition_effect
+    if transitions is not None and len(transitions) != len(video_paths) - 1:
+        return f"Error: transitions must have one entry per boundary ({len(video_paths) - 1}), got {len(transitions)}."
+
+    # Resolve one (effect, duration) pair per boundary; per-boundary entries override the defaults
+    boundary_transitions = []
+    if transitions is not None or transition_effect:
+        for i in range(len(video_paths) - 1):
+            entry = transitions[i] if transitions is not None else {}
+            if not isinstance(entry, dict):
+                return f"Error: Transition for boundary {i} must be a dict with 'effect' and 'duration', got {entry!r}."
+            effect = entry.get('effect', transition_effect)
+            duration = entry.get('duration', transition_duration)
+            if not effect:
+                return f"Error: No transition effect given for boundary {i}."
+            try:
+                duration = float(duration)
+            except (TypeError, ValueError):
+                return f"Error: Transition duration for boundary {i} must be a number, got {duration!r}."
+            if duration <= 0:
+                return f"Error: Transition duration for boundary {i} must be positive."
+            boundary_transitions.append((effect, duration))
+
+    # Validate transition effects
     valid_transitions = {
         'dissolve', 'fade', 'fadeblack', 'fadewhite', 'fadegrays', 'distance',
         'wipeleft', 'wiperight', 'wipeup', 'wipedown',
@@ -834,11 +2372,15 @@ def concatenate_videos(video_paths: list[str], output_video_path: str,
         'hlslice', 'hrslice', 'vuslice', 'vdslice',
         'pixelize', 'radial', 'hblur'
     }
-    if transition_effect and transition_effect not in valid_transitions:
-        return f"Error: Invalid transition_effect '{transition_effect}'. Valid options: {', '.join(sorted(valid_transitions))}"
+    for effect, _ in boundary_transitions:
+        if effect not in valid_transitions:
+            return f"Error: Invalid transition_effect '{effect}'. Valid options: {', '.join(sorted(valid_transitions))}"
 
     # Check if all input files exist
     for video_path in video_paths:
+        stream_error = _stream_input_error(video_path)
+        if stream_error:
+            return f"Error: {stream_error}"
         if not os.path.exists(video_path):
             return f"Error: Input video file not found at {video_path}"
 
@@ -848,192 +2390,166 @@ def concatenate_videos(video_paths: list[str], output_video_path: str,
             # Simple copy if no processing needed, or re-encode to a standard format.
             # For now, let's assume re-encoding to ensure it matches expectations of a processed file.
             # This could be enhanced to use target_props like in add_b_roll if needed.
-            ffmpeg.input(video_paths[0]).output(output_video_path, vcodec='libx264', acodec='aac').run(capture_stdout=True, capture_stderr=True)
+            _run_ffmpeg(ffmpeg.input(video_paths[0]).output(output_video_path, vcodec='libx264', acodec='aac',
+                                                            **_encode_options(output_video_path, encode_profile, 'libx264')))
             return f"Single video processed and saved to {output_video_path}"
         except ffmpeg.Error as e:
             return f"Error processing single video: {e.stderr.decode('utf8') if e.stderr else str(e)}"
 
-    # Handle xfade transition for exactly two videos
-    if transition_effect and len(video_paths) == 2:
-        # Create a temporary directory for intermediate files
-        temp_dir = tempfile.mkdtemp()
+    # Handle xfade transitions: every boundary is rendered in one filtergraph and one encode
+    if boundary_transitions:
         try:
-            video1_path = video_paths[0]
-            video2_path = video_paths[1]
-            
-            props1 = _get_media_properties(video1_path)
-            props2 = _get_media_properties(video2_path)
-
-            if not props1['has_video'] or not props2['has_video']:
-                return "Error: xfade transition requires both inputs to be videos."
-            if transition_duration >= props1['duration']:
-                 return f"Error: Transition duration ({transition_duration}s) cannot be equal or longer than the first video's duration ({props1['duration']})."
-
-            # Check if both videos have audio
-            has_audio = props1['has_audio'] and props2['has_audio']
-            if not has_audio:
-                print("Warning: At least one video lacks audio. Xfade will be video-only or silent audio.")
-
-            # Determine common target properties for normalization before xfade
-            # Preferring higher resolution/fps from inputs, or defaulting.
-            target_w = max(props1['width'], props2['width'], 640) 
-            target_h = max(props1['height'], props2['height'], 360)
-            # Ensure a common FPS, e.g., highest of the two, or a default like 30
-            target_fps = max(props1['avg_fps'], props2['avg_fps'], 30)
-            if target_fps <= 0: 
-                target_fps = 30 # safety net
-
-            # Normalize input videos to have same dimensions and properties
-            # First video
-            norm_video1_path = os.path.join(temp_dir, "norm_video1.mp4")
-            try:
-                # Scale and set properties
-                subprocess.run([
-                    'ffmpeg',
-                    '-i', video1_path,
-                    '-vf', f'scale={target_w}:{target_h}',
-                    '-r', str(target_fps),
-                    '-c:v', 'libx264',
-                    '-c:a', 'aac',
-                    '-y',
-                    norm_video1_path
-                ], check=True, capture_output=True)
-            except subprocess.CalledProcessError as e:
-                return f"Error normalizing first video: {e.stderr.decode('utf8') if e.stderr else str(e)}"
-
-            # Second video
-            norm_video2_path = os.path.join(temp_dir, "norm_video2.mp4")
-            try:
-                # Scale and set properties
-                subprocess.run([
-                    'ffmpeg',
-                    '-i', video2_path,
-                    '-vf', f'scale={target_w}:{target_h}',
-                    '-r', str(target_fps),
-                    '-c:v', 'libx264',
-                    '-c:a', 'aac',
-                    '-y',
-                    norm_video2_path
-                ], check=True, capture_output=True)
-            except subprocess.CalledProcessError as e:
-                return f"Error normalizing second video: {e.stderr.decode('utf8') if e.stderr else str(e)}"
-
-            # Get normalized video 1 duration
-            norm_props1 = _get_media_properties(norm_video1_path)
-            norm_video1_duration = norm_props1['duration']
-            
-            if transition_duration >= norm_video1_duration:
-                return f"Error: Transition duration ({transition_duration}s) is too long for the normalized first video ({norm_video1_duration}s)."
-
-            # Calculate offset (where second video starts relative to first)
-            offset = norm_video1_duration - transition_duration
-            
-            # Create filter complex for xfade transition
-            filter_complex = f"[0:v][1:v]xfade=transition={transition_effect}:duration={transition_duration}:offset={offset}"
-            
-            # Base command for video transition
-            cmd = [
-                'ffmpeg',
-                '-i', norm_video1_path,
-                '-i', norm_video2_path,
-                '-filter_complex'
-            ]
-            
-            # Add appropriate filters for video and audio
-            if has_audio:
-                # Audio transition (crossfade)
-                filter_complex += f",[0:a][1:a]acrossfade=d={transition_duration}:c1=tri:c2=tri"
-                cmd.extend([filter_complex, '-map', '[v]', '-map', '[a]'])
-            else:
-                # Video only
-                filter_complex += "[v]"
-                cmd.extend([filter_complex, '-map', '[v]'])
-            
-            # Add output file and encoding parameters
-            cmd.extend([
-                '-c:v', 'libx264',
-                '-c:a', 'aac',
-                '-y',
-                output_video_path
-            ])
-            
-            try:
-                subprocess.run(cmd, check=True, capture_output=True)
-                return f"Videos concatenated successfully with '{transition_effect}' transition to {output_video_path}"
-            except subprocess.CalledProcessError as e:
-                return f"Error during xfade process: {e.stderr.decode('utf8') if e.stderr else str(e)}"
-                
+            return _concatenate_with_xfade(video_paths, output_video_path, boundary_transitions, threads_per_job,
+                                           encode_profile)
+        except ffmpeg.Error as e:
+            return f"Error during xfade process: {e.stderr.decode('utf8') if e.stderr else str(e)}"
+        except ValueError as e:
+            return f"Error: {str(e)}"
         except Exception as e:
             return f"An unexpected error occurred during xfade concatenation: {str(e)}"
-        finally:
-            # Clean up temporary directory
-            shutil.rmtree(temp_dir)
-    
-    elif transition_effect and len(video_paths) > 2:
-        return f"Error: xfade transition ('{transition_effect}') is currently only supported for exactly two videos. Found {len(video_paths)} videos."
 
     # Standard concatenation for 2+ videos without xfade
     # We'll use the concat demuxer approach
-    temp_dir = tempfile.mkdtemp()
     try:
-        # Normalize all videos to the same format/codec/resolution
-        normalized_paths = []
-        
-        # Get target properties from first video
-        first_props = _get_media_properties(video_paths[0])
-        target_w = first_props['width'] if first_props['width'] > 0 else 1280
-        target_h = first_props['height'] if first_props['height'] > 0 else 720
-        target_fps = first_props['avg_fps'] if first_props['avg_fps'] > 0 else 30
-        if target_fps <= 0:
-            target_fps = 30
-        
-        # Process each video
-        for i, video_path in enumerate(video_paths):
-            norm_path = os.path.join(temp_dir, f"norm_{i}.mp4")
-            try:
-                subprocess.run([
-                    'ffmpeg',
-                    '-i', video_path,
-                    '-vf', f'scale={target_w}:{target_h}',
-                    '-r', str(target_fps),
-                    '-c:v', 'libx264',
-                    '-c:a', 'aac',
-                    '-y',
-                    norm_path
-                ], check=True, capture_output=True)
-                normalized_paths.append(norm_path)
-            except subprocess.CalledProcessError as e:
-                return f"Error normalizing video {i}: {e.stderr.decode('utf8') if e.stderr else str(e)}"
-        
-        # Create a concat file
-        concat_list_path = os.path.join(temp_dir, "concat_list.txt")
-        with open(concat_list_path, 'w') as f:
-            for path in normalized_paths:
-                f.write(f"file '{path}'\n")
-        
-        # Run ffmpeg concat
+        with _scratch.workspace() as scratch:
+            return _concatenate_standard(video_paths, output_video_path, max_workers, threads_per_job,
+                                         encode_profile, scratch)
+    except Exception as e:
+        return f"An unexpected error occurred during standard concatenation: {str(e)}"
+
+def _concatenate_standard(video_paths: list, output_video_path: str, max_workers: int, threads_per_job: int,
+                          encode_profile: str, scratch: '_ScratchWorkspace') -> str:
+    """Joins 2+ clips with the concat demuxer, normalizing only mismatched clips into scratch space.
+    Normalized clips are kept for VIDEO_AUDIO_SCRATCH_REUSE_TTL, so repeated joins of the same clips skip the encode.
+    """
+    # Get target properties from first video
+    first_props = _get_media_properties(video_paths[0])
+    target_w = first_props['width'] if first_props['width'] > 0 else 1280
+    target_h = first_props['height'] if first_props['height'] > 0 else 720
+    target_fps = first_props['avg_fps'] if first_props['avg_fps'] > 0 else 30
+    if target_fps <= 0:
+        target_fps = 30
+    
+    # Only clips whose streams differ from the first clip need re-encoding. If the first clip is
+    # itself something our normalization can reproduce exactly, matching clips are used as-is.
+    signatures = [_concat_signature(video_path) for video_path in video_paths]
+    target_signature = signatures[0]
+    match_args = _concat_match_args(target_signature)
+    # Clips used as-is share the first clip's codecs, which the output container must be able to take
+    first_plan = _stream_copy_plan(video_paths[0], output_video_path)
+    if not (first_plan['video'] and first_plan['audio']):
+        to_normalize = list(range(len(video_paths)))
+        match_args = []
+    elif all(signature == target_signature for signature in signatures):
+        to_normalize = []
+    elif match_args is not None:
+        to_normalize = [i for i, signature in enumerate(signatures) if signature != target_signature]
+    else:
+        to_normalize = list(range(len(video_paths)))
+        match_args = []
+    # Use the exact rational frame rate when matching, so re-encoded clips report the same rate
+    target_rate = target_signature[0][5] if match_args else str(target_fps)
+
+    # A clip listed more than once is normalized once
+    first_index = {}
+    for i in to_normalize:
+        first_index.setdefault(video_paths[i], i)
+    to_encode = list(first_index.values())
+
+    # Normalize in parallel, splitting the CPU budget between the encodes
+    workers = max(1, min(max_workers or CONCAT_WORKERS, len(to_encode) or 1))
+    threads = threads_per_job or max(1, (os.cpu_count() or 1) // workers)
+
+    def normalize(i):
+        identity = _file_identity(video_paths[i])
+        reuse_key = None
+        if identity is not None:
+            reuse_key = ('concat-normalize', identity, target_w, target_h, target_rate, tuple(match_args),
+                         encode_profile or DEFAULT_ENCODE_PROFILE)
+        kept_path = scratch.reuse(reuse_key)
+        if kept_path is not None:
+            return kept_path, None
+        norm_path = scratch.path(f"norm_{i}.mp4", expected_bytes=identity[1] if identity else 0)
         try:
-            subprocess.run([
+            _run_ffmpeg([
                 'ffmpeg',
-                '-f', 'concat',
-                '-safe', '0',
-                '-i', concat_list_path,
-                '-c', 'copy',
+                '-i', video_paths[i],
+                '-vf', f'scale={target_w}:{target_h}',
+                '-r', target_rate,
+                '-c:v', 'libx264',
+                '-c:a', 'aac',
+                *match_args,
+                *_encode_args(norm_path, encode_profile, 'libx264'),
+                '-threads', str(threads),
                 '-y',
-                output_video_path
-            ], check=True, capture_output=True)
-            return f"Videos concatenated successfully to {output_video_path}"
-        except subprocess.CalledProcessError as e:
-            return f"Error during concatenation: {e.stderr.decode('utf8') if e.stderr else str(e)}"
-            
-    except Exception as e:
-        return f"An unexpected error occurred during standard concatenation: {str(e)}"
-    finally:
-        # Clean up temporary directory
-        shutil.rmtree(temp_dir)
+                norm_path
+            ])
+            return scratch.keep(reuse_key, norm_path), None
+        except ffmpeg.Error as e:
+            return None, f"Error normalizing video {i}: {e.stderr.decode('utf8') if e.stderr else str(e)}"
+
+    normalized = {}  # Input path -> normalized clip
+    if to_encode:
+        for i, (norm_path, error) in zip(to_encode, _map_in_parallel(normalize, to_encode, workers)):
+            if error:
+                return error
+            normalized[video_paths[i]] = norm_path
+    normalized_paths = [normalized.get(video_path, video_path) for video_path in video_paths]
+    
+    # Create a concat file
+    concat_list_path = scratch.path("concat_list.txt")
+    with open(concat_list_path, 'w') as f:
+        for path in normalized_paths:
+            f.write(_concat_list_entry(path))
+    
+    # Run ffmpeg concat
+    try:
+        _run_ffmpeg([
+            'ffmpeg',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', concat_list_path,
+            '-c', 'copy',
+            '-y',
+            output_video_path
+        ])
+        copied = len(video_paths) - len(to_normalize)
+        return f"Videos concatenated successfully to {output_video_path} ({copied} of {len(video_paths)} inputs stream-copied without re-encoding)"
+    except ffmpeg.Error as e:
+        return f"Error during concatenation: {e.stderr.decode('utf8') if e.stderr else str(e)}"
+
+def _atempo_factors(speed_factor: float) -> list:
+    """Splits a speed factor into a chain of atempo values, each within atempo's 0.5-2.0 range."""
+    atempo_value = speed_factor
+    atempo_filters = []
+    
+    # Handle audio speed outside atempo's range (0.5-2.0)
+    if speed_factor < 0.5:
+        # For speed < 0.5, use multiple atempo=0.5 filters
+        while atempo_value < 0.5:
+            atempo_filters.append(0.5)
+            atempo_value *= 2  # After applying atempo=0.5, the remaining factor doubles
+        # Add the remaining factor if needed
+        if atempo_value < 0.99:  # A bit of buffer for floating point comparison
+            atempo_filters.append(atempo_value)
+    elif speed_factor > 2.0:
+        # For speed > 2.0, use multiple atempo=2.0 filters
+        while atempo_value > 2.0:
+            atempo_filters.append(2.0)
+            atempo_value /= 2  # After applying atempo=2.0, the remaining factor halves
+        # Add the remaining factor if needed
+        if atempo_value > 1.01:  # A bit of buffer for floating point comparison
+            atempo_filters.append(atempo_value)
+    else:
+        # For speed factors within range, just use one atempo filter
+        atempo_filters.append(speed_factor)
+    return atempo_filters
 
 @mcp.tool()
-def change_video_speed(video_path: str, output_video_path: str, speed_factor: float) -> str:
+@_in_worker
+@_result_cached
+def change_video_speed(video_path: str, output_video_path: str, speed_factor: float,
+                       encode_profile: str = None) -> str:
     """Changes the playback speed of a video (and its audio).
 
     Args:
@@ -1041,56 +2557,36 @@ def change_video_speed(video_path: str, output_video_path: str, speed_factor: fl
         output_video_path: Path to save the speed-adjusted video file.
         speed_factor: The factor by which to change the speed (e.g., 2.0 for 2x speed, 0.5 for half speed).
                       Must be positive.
+        encode_profile: Speed/quality profile for the video re-encode ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     
     Returns:
         A status message indicating success or failure.
     """
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
     if speed_factor <= 0:
         return "Error: Speed factor must be positive."
-    if not os.path.exists(video_path):
+    if not _input_exists(video_path):
         return f"Error: Input video file not found at {video_path}"
 
     try:
         # Process atempo values (audio speed) - requires special handling for values outside 0.5-2.0 range
-        atempo_value = speed_factor
-        atempo_filters = []
-        
-        # Handle audio speed outside atempo's range (0.5-2.0)
-        if speed_factor < 0.5:
-            # For speed < 0.5, use multiple atempo=0.5 filters
-            while atempo_value < 0.5:
-                atempo_filters.append("atempo=0.5")
-                atempo_value *= 2  # After applying atempo=0.5, the remaining factor doubles
-            # Add the remaining factor if needed
-            if atempo_value < 0.99:  # A bit of buffer for floating point comparison
-                atempo_filters.append(f"atempo={atempo_value}")
-        elif speed_factor > 2.0:
-            # For speed > 2.0, use multiple atempo=2.0 filters
-            while atempo_value > 2.0:
-                atempo_filters.append("atempo=2.0")
-                atempo_value /= 2  # After applying atempo=2.0, the remaining factor halves
-            # Add the remaining factor if needed
-            if atempo_value > 1.01:  # A bit of buffer for floating point comparison
-                atempo_filters.append(f"atempo={atempo_value}")
-        else:
-            # For speed factors within range, just use one atempo filter
-            atempo_filters.append(f"atempo={speed_factor}")
-        
+        atempo_filters = _atempo_factors(speed_factor)
+
         # Apply separate filters to video and audio streams
         input_stream = ffmpeg.input(video_path)
         video = input_stream.video.setpts(f"{1.0/speed_factor}*PTS")
         
         # Chain multiple audio filters if needed
         audio = input_stream.audio
-        for filter_str in atempo_filters:
-            audio = audio.filter("atempo", speed_factor if filter_str == f"atempo={speed_factor}" else 
-                               0.5 if filter_str == "atempo=0.5" else 
-                               2.0 if filter_str == "atempo=2.0" else 
-                               float(filter_str.replace("atempo=", "")))
+        for atempo_value in atempo_filters:
+            audio = audio.filter("atempo", atempo_value)
         
         # Combine processed streams and output
-        output = ffmpeg.output(video, audio, output_video_path)
-        output.run(capture_stdout=True, capture_stderr=True)
+        output = ffmpeg.output(video, audio, output_video_path, **_encode_options(output_video_path, encode_profile))
+        _run_ffmpeg(output)
         
         return f"Video speed changed by factor {speed_factor} and saved to {output_video_path}"
     except ffmpeg.Error as e:
@@ -1099,10 +2595,280 @@ def change_video_speed(video_path: str, output_video_path: str, speed_factor: fl
     except Exception as e:
         return f"An unexpected error occurred while changing video speed: {str(e)}"
 
+# --- Segment Engine ---
+# Renders a list of keep-intervals from one source. Each interval is read with its own
+# input-side seek, so decoding work grows with the media kept, not with frames x segments.
+SEGMENTS_PER_PASS = int(os.getenv("VIDEO_AUDIO_SEGMENTS_PER_PASS", 32))
+
+def _concat_list_entry(path: str) -> str:
+    """Returns a concat demuxer 'file' line with single quotes escaped."""
+    escaped = os.path.abspath(path).replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+def _render_segments_pass(media_path: str, intervals: list, output_path: str, has_video: bool, has_audio: bool,
+                          encode_args: list = ()):
+    """Renders intervals of media_path into output_path with one ffmpeg process and the concat filter.
+    encode_args are extra output options for the encoder (see _encode_args).
+    """
+    cmd = ['ffmpeg']
+    for start, end in intervals:
+        cmd.extend(['-ss', f"{start:.6f}", '-t', f"{end - start:.6f}", '-i', media_path])
+    if len(intervals) == 1:
+        maps = (['-map', '0:v:0'] if has_video else []) + (['-map', '0:a:0'] if has_audio else [])
+        cmd.extend([*maps, *encode_args, '-y', output_path])
+    else:
+        labels = "".join(
+            (f"[{i}:v:0]" if has_video else "") + (f"[{i}:a:0]" if has_audio else "")
+            for i in range(len(intervals))
+        )
+        outputs = ("[v]" if has_video else "") + ("[a]" if has_audio else "")
+        filter_complex = f"{labels}concat=n={len(intervals)}:v={int(has_video)}:a={int(has_audio)}{outputs}"
+        maps = (['-map', '[v]'] if has_video else []) + (['-map', '[a]'] if has_audio else [])
+        cmd.extend(['-filter_complex', filter_complex, *maps, *encode_args, '-y', output_path])
+    _run_ffmpeg(cmd, output_duration=sum(end - start for start, end in intervals))
+
+def _concat_demux_copy(entries: list, output_path: str, scratch: '_ScratchWorkspace'):
+    """Joins concat demuxer entries into output_path with stream copy.
+
+    Args:
+        entries: A list of (path, inpoint, outpoint) tuples; inpoint/outpoint may be None.
+        scratch: Workspace that holds the concat list.
+    """
+    concat_list_path = scratch.path("concat_list.txt")
+    with open(concat_list_path, 'w') as f:
+        for path, inpoint, outpoint in entries:
+            f.write(_concat_list_entry(path))
+            if inpoint is not None:
+                f.write(f"inpoint {inpoint:.6f}\n")
+            if outpoint is not None:
+                f.write(f"outpoint {outpoint:.6f}\n")
+    _run_ffmpeg(['ffmpeg', '-f', 'concat', '-safe', '0', '-i', concat_list_path, '-c', 'copy', '-y', output_path])
+
+def _render_keep_intervals(media_path: str, intervals: list, output_path: str,
+                           has_video: bool, has_audio: bool, cut_mode: str = 'accurate', encode_args: list = ()):
+    """Writes only the (start, end) intervals of media_path, in order, to output_path.
+
+    'copy' mode stream-copies the intervals through the concat demuxer. 'accurate' mode decodes
+    each interval from its own seek point and joins them with the concat filter; long interval
+    lists are split into passes of SEGMENTS_PER_PASS whose outputs are joined with stream copy.
+    """
+    with _scratch.workspace() as scratch:
+        if cut_mode == 'copy':
+            _concat_demux_copy([(media_path, start, end) for start, end in intervals], output_path, scratch)
+            return
+        if len(intervals) <= SEGMENTS_PER_PASS:
+            _render_segments_pass(media_path, intervals, output_path, has_video, has_audio, encode_args)
+            return
+
+        extension = os.path.splitext(output_path)[1] or '.mp4'
+        # Size each part's reservation by its share of the kept media
+        total_kept = sum(end - start for start, end in intervals) or 1.0
+        source_bytes = os.path.getsize(media_path) if os.path.isfile(media_path) else 0
+        part_paths = []
+        for part_index, offset in enumerate(range(0, len(intervals), SEGMENTS_PER_PASS)):
+            part_intervals = intervals[offset:offset + SEGMENTS_PER_PASS]
+            part_share = sum(end - start for start, end in part_intervals) / total_kept
+            part_path = scratch.path(f"part_{part_index}{extension}", expected_bytes=source_bytes * part_share)
+            _render_segments_pass(media_path, part_intervals, part_path, has_video, has_audio, encode_args)
+            part_paths.append(part_path)
+        _concat_demux_copy([(path, None, None) for path in part_paths], output_path, scratch)
+
+# --- Smart Cut ---
+# Frame-accurate trims at close to stream-copy speed: only the partial GOPs at the cut points are
+# re-encoded (matching the source's H.264 parameters), the whole GOPs between them are copied.
+
+def _smart_cut(media_path: str, output_path: str, start: float, end: float, encode_profile: str = None):
+    """Writes [start, end) of media_path to output_path, re-encoding only the GOP fragments at the edges.
+
+    Returns the number of stream-copied frames, or None if the source or range cannot be smart-cut
+    (unsupported codec, or no keyframe inside the range) and the caller should re-encode instead.
+    """
+    probe = _probe_media(media_path)
+    video = next((s for s in probe['streams'] if s['codec_type'] == 'video'
+                  and not s.get('disposition', {}).get('attached_pic')), None)
+    if (video is None or video.get('codec_name') != 'h264' or video.get('profile') not in _X264_PROFILES
+            or video.get('pix_fmt') != 'yuv420p'):
+        return None
+    has_audio = any(s['codec_type'] == 'audio' for s in probe['streams'])
+
+    index = _get_packet_index(media_path)
+    copy_start = index.keyframe_at_or_after(start)
+    if copy_start is None or copy_start >= end:
+        return None
+    if end > index.last_pts:
+        copy_end = None  # The range runs to the end of the file, so the last GOP is whole
+    else:
+        copy_end = index.keyframe_at_or_before(end)
+
+    head_frames = index.frames_between(start, copy_start)
+    copy_frames = index.frames_between(copy_start, copy_end if copy_end is not None else float('inf'))
+    tail_frames = index.frames_between(copy_end, end) if copy_end is not None else 0
+    if copy_frames == 0:
+        return None
+    # Where the output really ends, for progress: end may lie past the end of the file
+    end = min(end, float(probe['format'].get('duration', end)))
+
+    extension = os.path.splitext(output_path)[1] or '.mp4'
+    # MP4/MOV edit lists hide the audio packets a stream-copy seek pulls in before the cut point;
+    # other containers would shift the video instead, so their audio is re-encoded from the exact start.
+    has_edit_lists = extension.lower() in ('.mp4', '.m4v', '.mov')
+    timescale = video.get('time_base', '1/90000').split('/')[-1]
+    edge_args = ['-c:v', 'libx264', '-profile:v', _X264_PROFILES[video['profile']], '-pix_fmt', 'yuv420p',
+                 '-fps_mode', 'passthrough', *_encode_args(output_path, encode_profile, 'libx264')]
+    if has_edit_lists:
+        edge_args.extend(['-video_track_timescale', timescale])
+
+    source_bytes = os.path.getsize(media_path)
+    total_frames = max(1, len(index.pts))
+    with _scratch.workspace() as scratch:
+        # (seek point, frame count, codec arguments, duration) for each piece. The copied piece is sought 1 us
+        # past its keyframe, so rounding of the printed timestamp can never land in the previous GOP.
+        pieces = []
+        if head_frames:
+            pieces.append((start, head_frames, edge_args, copy_start - start))
+        pieces.append((copy_start + 1e-6, copy_frames, ['-c:v', 'copy'], (copy_end or end) - copy_start))
+        if tail_frames:
+            pieces.append((copy_end, tail_frames, edge_args, end - copy_end))
+
+        piece_paths = []
+        for piece_number, (seek, frames, codec_args, duration) in enumerate(pieces):
+            piece_path = scratch.path(f"piece_{piece_number}{extension}", expected_bytes=source_bytes * frames / total_frames)
+            _run_ffmpeg(['ffmpeg', '-ss', f"{seek:.6f}", '-i', media_path, '-map', '0:v:0',
+                         '-frames:v', str(frames), *codec_args, '-an', '-y', piece_path], output_duration=duration)
+            piece_paths.append(piece_path)
+
+        concat_list_path = scratch.path("concat_list.txt")
+        with open(concat_list_path, 'w') as f:
+            for path in piece_paths:
+                f.write(_concat_list_entry(path))
+        # Video pieces are joined with stream copy; audio is taken straight from the source
+        cmd = ['ffmpeg', '-f', 'concat', '-safe', '0', '-i', concat_list_path]
+        if has_audio:
+            cmd.extend(['-ss', f"{start:.6f}", '-t', f"{end - start:.6f}", '-i', media_path, '-map', '0:v', '-map', '1:a'])
+            if has_edit_lists:
+                cmd.extend(['-c:a', 'copy'])
+        cmd.extend(['-c:v', 'copy', '-y', output_path])
+        _run_ffmpeg(cmd, output_duration=end - start)
+        return copy_frames
+
+# --- Silence Detection ---
+# Fast path: ffmpeg decodes only the audio, downmixed to 8 kHz mono PCM, and NumPy reduces it to a
+# 10 ms peak envelope. The envelope is cached per file, so trying several thresholds costs one decode.
+SILENCE_ANALYSIS_RATE = 8000
+SILENCE_WINDOW_SAMPLES = 80 # 10 ms at SILENCE_ANALYSIS_RATE
+ENVELOPE_CACHE_SIZE = int(os.getenv("VIDEO_AUDIO_ENVELOPE_CACHE_SIZE", 16))
+
+_envelope_cache = OrderedDict() # File identity -> peak envelope array
+_envelope_cache_lock = threading.Lock()
+
+def _silence_envelope(media_path: str):
+    """Returns the per-window peak amplitude (0.0-1.0) of media_path's audio as a NumPy array."""
+    key = _file_identity(media_path)
+    if key is not None:
+        with _envelope_cache_lock:
+            if key in _envelope_cache:
+                _envelope_cache.move_to_end(key)
+                return _envelope_cache[key]
+
+    pcm_bytes, _ = _run_ffmpeg([
+        'ffmpeg', '-i', media_path,
+        '-vn', '-ac', '1', '-ar', str(SILENCE_ANALYSIS_RATE),
+        '-f', 's16le', 'pipe:'
+    ])
+    samples = np.frombuffer(pcm_bytes, dtype='<i2')
+    padding = (-len(samples)) % SILENCE_WINDOW_SAMPLES
+    if padding:
+        samples = np.concatenate((samples, np.zeros(padding, dtype='<i2')))
+    # Widen before abs() so -32768 does not overflow
+    peaks = np.abs(samples.astype(np.int32)).reshape(-1, SILENCE_WINDOW_SAMPLES).max(axis=1)
+    envelope = (peaks / 32768.0).astype(np.float32)
+
+    if key is not None:
+        with _envelope_cache_lock:
+            _envelope_cache[key] = envelope
+            while len(_envelope_cache) > ENVELOPE_CACHE_SIZE:
+                _envelope_cache.popitem(last=False)
+    return envelope
+
+def _silence_intervals_from_envelope(envelope, silence_threshold_db: float, min_silence_duration_s: float) -> tuple:
+    """Finds runs of windows below the threshold lasting at least min_silence_duration_s.
+    Returns (silence_starts, silence_ends) in seconds, like silencedetect's output.
+    """
+    threshold = 10 ** (silence_threshold_db / 20.0)
+    quiet = np.concatenate(([False], envelope < threshold, [False]))
+    edges = np.flatnonzero(quiet[1:] != quiet[:-1])
+    window_s = SILENCE_WINDOW_SAMPLES / SILENCE_ANALYSIS_RATE
+    starts = edges[0::2] * window_s
+    ends = edges[1::2] * window_s
+    long_enough = (ends - starts) >= min_silence_duration_s - 1e-9
+    return np.round(starts[long_enough], 4).tolist(), np.round(ends[long_enough], 4).tolist()
+
+def _detect_silences_silencedetect(media_path: str, silence_threshold_db: float, min_silence_duration_s: float) -> tuple:
+    """Runs ffmpeg's silencedetect over the media and parses (silence_starts, silence_ends) from stderr."""
+    # The output of silencedetect is written to stderr
+    silence_detection_cmd = (
+        ffmpeg
+        .input(media_path)
+        .filter('silencedetect', n=f'{silence_threshold_db}dB', d=min_silence_duration_s)
+        .output('-', format='null') # Output to null as we only need stderr
+    )
+    _, stderr_bytes = _run_ffmpeg(silence_detection_cmd)
+    stderr_str = stderr_bytes.decode('utf8')
+
+    silence_starts = [float(x) for x in re.findall(r"silence_start: (\d+\.?\d*)", stderr_str)]
+    silence_ends = [float(x) for x in re.findall(r"silence_end: (\d+\.?\d*)", stderr_str)]
+    # silencedetect might also output silence_duration, but start/end are more direct for segmenting
+    return silence_starts, silence_ends
+
+def _detect_silences(media_path: str, silence_threshold_db: float, min_silence_duration_s: float) -> tuple:
+    """Returns (silence_starts, silence_ends) in seconds, using the PCM fast path when NumPy is available."""
+    if np is None:
+        return _detect_silences_silencedetect(media_path, silence_threshold_db, min_silence_duration_s)
+    return _silence_intervals_from_envelope(_silence_envelope(media_path), silence_threshold_db, min_silence_duration_s)
+
 @mcp.tool()
+@_in_worker
+def detect_silence(media_path: str, silence_thresholds_db: list[float] = None,
+                   min_silence_duration_ms: int = 500) -> dict:
+    """Detects silent intervals for one or more thresholds without modifying the media.
+    The audio is decoded once; every threshold is evaluated on the same cached envelope.
+
+    Args:
+        media_path: Path to the input audio or video file.
+        silence_thresholds_db: Thresholds (in dBFS) to evaluate. Defaults to [-30.0].
+        min_silence_duration_ms: Minimum duration (in milliseconds) of a silence (e.g., 500).
+    Returns:
+        A dict mapping each threshold to its list of [start, end] silence intervals in seconds,
+        or a dict with an 'error' key.
+    """
+    stream_error = _stream_input_error(media_path)
+    if stream_error:
+        return {'error': stream_error}
+    if not os.path.exists(media_path):
+        return {'error': f"Input media file not found at {media_path}"}
+    if min_silence_duration_ms <= 0:
+        return {'error': "Minimum silence duration must be positive."}
+    thresholds = silence_thresholds_db or [-30.0]
+    min_silence_duration_s = min_silence_duration_ms / 1000.0
+
+    try:
+        results = {}
+        for threshold_db in thresholds:
+            starts, ends = _detect_silences(media_path, threshold_db, min_silence_duration_s)
+            results[str(threshold_db)] = [[start, ends[i] if i < len(ends) else None] for i, start in enumerate(starts)]
+        return {'media_path': media_path, 'min_silence_duration_ms': min_silence_duration_ms, 'silences': results}
+    except ffmpeg.Error as e:
+        return {'error': f"Error detecting silence: {e.stderr.decode('utf8') if e.stderr else str(e)}"}
+    except Exception as e:
+        return {'error': f"An unexpected error occurred while detecting silence: {str(e)}"}
+
+@mcp.tool()
+@_in_worker
+@_result_cached
 def remove_silence(media_path: str, output_media_path: str, 
                    silence_threshold_db: float = -30.0, 
-                   min_silence_duration_ms: int = 500) -> str:
+                   min_silence_duration_ms: int = 500,
+                   cut_mode: str = 'accurate', encode_profile: str = None) -> str:
     """Removes silent segments from an audio or video file.
 
     Args:
@@ -1110,34 +2876,33 @@ def remove_silence(media_path: str, output_media_path: str,
         output_media_path: Path to save the media file with silences removed.
         silence_threshold_db: The noise level (in dBFS) below which is considered silence (e.g., -30.0).
         min_silence_duration_ms: Minimum duration (in milliseconds) of silence to be removed (e.g., 500).
+        cut_mode: 'accurate' (default) re-encodes the kept segments with exact cut points.
+                  'copy' stream-copies them through the concat demuxer; much faster, but video
+                  cuts snap to keyframes. Ideal for audio-only files.
+        encode_profile: Speed/quality profile for the video re-encode in 'accurate' mode ('draft', 'preview',
+                        'standard', 'publish'). Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     
     Returns:
         A status message indicating success or failure.
     """
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    stream_error = _stream_input_error(media_path)
+    if stream_error:
+        return f"Error: {stream_error}"
     if not os.path.exists(media_path):
         return f"Error: Input media file not found at {media_path}"
     if min_silence_duration_ms <= 0:
         return "Error: Minimum silence duration must be positive."
+    if cut_mode not in ('accurate', 'copy'):
+        return f"Error: Invalid cut_mode '{cut_mode}'. Must be 'accurate' or 'copy'."
 
     min_silence_duration_s = min_silence_duration_ms / 1000.0
 
     try:
-        # Step 1: Detect silence using silencedetect filter
-        # The output of silencedetect is written to stderr
-        silence_detection_process = (
-            ffmpeg
-            .input(media_path)
-            .filter('silencedetect', n=f'{silence_threshold_db}dB', d=min_silence_duration_s)
-            .output('-', format='null') # Output to null as we only need stderr
-            .run_async(pipe_stderr=True)
-        )
-        _, stderr_bytes = silence_detection_process.communicate()
-        stderr_str = stderr_bytes.decode('utf8')
-
-        # Step 2: Parse silencedetect output from stderr
-        silence_starts = [float(x) for x in re.findall(r"silence_start: (\d+\.?\d*)", stderr_str)]
-        silence_ends = [float(x) for x in re.findall(r"silence_end: (\d+\.?\d*)", stderr_str)]
-        # silencedetect might also output silence_duration, but start/end are more direct for segmenting
+        # Step 1 & 2: Detect silence (decimated PCM fast path, or silencedetect if NumPy is missing)
+        silence_starts, silence_ends = _detect_silences(media_path, silence_threshold_db, min_silence_duration_s)
 
         if not silence_starts: # No silences detected, or only one long silence which means the file might be entirely silent or entirely loud
             # If the file is entirely silent, ffmpeg might not produce silence_start/end, or it might be one large segment.
@@ -1146,7 +2911,7 @@ def remove_silence(media_path: str, output_media_path: str,
             # Or, copy the file as is.
             # Let's try to copy the file as is, as no silences were detected for removal.
             try:
-                ffmpeg.input(media_path).output(output_media_path, c='copy').run(capture_stdout=True, capture_stderr=True)
+                _run_ffmpeg(ffmpeg.input(media_path).output(output_media_path, c='copy'))
                 return f"No significant silences detected (or file is entirely silent/loud). Original media copied to {output_media_path}."
             except ffmpeg.Error as e_copy:
                  return f"No significant silences detected, but error copying original file: {e_copy.stderr.decode('utf8') if e_copy.stderr else str(e_copy)}"
@@ -1161,7 +2926,7 @@ def remove_silence(media_path: str, output_media_path: str,
              pass # Continue and see, this might mean it ends with silence and last end is EOF
 
         # Get total duration of the media for the last segment
-        probe = ffmpeg.probe(media_path)
+        probe = _probe_media(media_path)
         duration_str = probe['format']['duration']
         total_duration = float(duration_str)
 
@@ -1182,35 +2947,17 @@ def remove_silence(media_path: str, output_media_path: str,
         if not sound_segments:
             return f"Error: No sound segments were identified to keep. The media might be entirely silent according to the thresholds, or too short."
 
-        # Step 4: Construct select filter expressions
-        video_select_filter_parts = []
-        audio_select_filter_parts = []
-        for start, end in sound_segments:
-            video_select_filter_parts.append(f'between(t,{start},{end})')
-            audio_select_filter_parts.append(f'between(t,{start},{end})')
-
-        video_select_expr = "+".join(video_select_filter_parts)
-        audio_select_expr = "+".join(audio_select_filter_parts)
-
-        # Step 5: Apply filters and output
-        input_media = ffmpeg.input(media_path)
-        
-        has_video = any(s['codec_type'] == 'video' for s in probe['streams'])
+        # Step 4: Render only the sound segments and join them
+        # Cover art in audio files shows up as an attached-picture video stream; it is not a video track
+        has_video = any(s['codec_type'] == 'video' and not s.get('disposition', {}).get('attached_pic')
+                        for s in probe['streams'])
         has_audio = any(s['codec_type'] == 'audio' for s in probe['streams'])
-
-        output_streams = []
-        if has_video:
-            processed_video = input_media.video.filter('select', video_select_expr).filter('setpts', 'PTS-STARTPTS')
-            output_streams.append(processed_video)
-        if has_audio:
-            processed_audio = input_media.audio.filter('aselect', audio_select_expr).filter('asetpts', 'PTS-STARTPTS')
-            output_streams.append(processed_audio)
-        
-        if not output_streams:
+        if not has_video and not has_audio:
             return "Error: The input media does not seem to have video or audio streams."
 
-        ffmpeg.output(*output_streams, output_media_path).run(capture_stdout=True, capture_stderr=True)
-        return f"Silent segments removed. Output saved to {output_media_path}"
+        encode_args = _encode_args(output_media_path, encode_profile) if has_video else []
+        _render_keep_intervals(media_path, sound_segments, output_media_path, has_video, has_audio, cut_mode, encode_args)
+        return f"Silent segments removed ({len(sound_segments)} segments kept, {cut_mode} cut). Output saved to {output_media_path}"
 
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -1237,7 +2984,7 @@ def _parse_time_to_seconds(time_str: str) -> float:
 def _get_media_properties(media_path: str) -> dict:
     """Probes media file and returns key properties."""
     try:
-        probe = ffmpeg.probe(media_path)
+        probe = _probe_media(media_path)
         video_stream_info = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
         audio_stream_info = next((s for s in probe['streams'] if s['codec_type'] == 'audio'), None)
         
@@ -1269,13 +3016,14 @@ def _get_media_properties(media_path: str) -> dict:
 
 
 def _prepare_clip_for_concat(source_path: str, start_time_sec: float, end_time_sec: float,
-                               target_props: dict, temp_dir: str, segment_index: int) -> str:
+                               target_props: dict, scratch: '_ScratchWorkspace', segment_index: int,
+                               encode_profile: str = None) -> str:
     """Prepares a clip segment (trims, scales, sets common properties) for concatenation.
-    Returns path to the temporary processed clip.
+    Returns path to the processed clip in the scratch workspace.
     """
     try:
         # Create a unique temp file name
-        temp_output_path = os.path.join(temp_dir, f"segment_{segment_index}.mp4")
+        temp_output_path = scratch.path(f"segment_{segment_index}.mp4")
         
         input_stream = ffmpeg.input(source_path, ss=start_time_sec, to=end_time_sec)
         
@@ -1322,7 +3070,8 @@ def _prepare_clip_for_concat(source_path: str, start_time_sec: float, end_time_s
             'acodec': 'aac',
             'ar': target_props['sample_rate'], # Audio sample rate
             'ac': target_props['channels'],   # Audio channels
-            'strict': '-2' # Needed for some AAC experimental features or if defaults change
+            'strict': '-2', # Needed for some AAC experimental features or if defaults change
+            **_encode_options(temp_output_path, encode_profile, 'libx264')
         }
 
         output_streams_for_ffmpeg = []
@@ -1336,7 +3085,7 @@ def _prepare_clip_for_concat(source_path: str, start_time_sec: float, end_time_s
             # For a concatenation tool, we expect valid media.
             raise ValueError(f"No video or audio streams identified to process for segment {segment_index} from {source_path}")
 
-        ffmpeg.output(*output_streams_for_ffmpeg, temp_output_path, **output_params).run(capture_stdout=True, capture_stderr=True)
+        _run_ffmpeg(ffmpeg.output(*output_streams_for_ffmpeg, temp_output_path, **output_params))
         return temp_output_path
 
     except ffmpeg.Error as e:
@@ -1346,15 +3095,25 @@ def _prepare_clip_for_concat(source_path: str, start_time_sec: float, end_time_s
         raise RuntimeError(f"Unexpected error preparing segment {segment_index} from {source_path}: {str(e)}")
 
 @mcp.tool()
-def add_b_roll(main_video_path: str, broll_clips: list[dict], output_video_path: str) -> str:
+@_in_worker
+@_result_cached
+def add_b_roll(main_video_path: str, broll_clips: list[dict], output_video_path: str,
+               encode_profile: str = None) -> str:
     """Inserts B-roll clips into a main video as overlays.
-    Args listed in previous messages (docstring unchanged for brevity here)
+    Args listed in previous messages (docstring unchanged for brevity here). encode_profile selects
+    the x264 speed/quality profile ('draft', 'preview', 'standard', 'publish').
     """
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    stream_error = _stream_input_error(main_video_path)
+    if stream_error:
+        return f"Error: {stream_error}"
     if not os.path.exists(main_video_path):
         return f"Error: Main video file not found at {main_video_path}"
     if not broll_clips:
         try:
-            ffmpeg.input(main_video_path).output(output_video_path, c='copy').run(capture_stdout=True, capture_stderr=True)
+            _run_ffmpeg(ffmpeg.input(main_video_path).output(output_video_path, c='copy'))
             return f"No B-roll clips provided. Main video copied to {output_video_path}"
         except ffmpeg.Error as e:
             return f"No B-roll clips, but error copying main video: {e.stderr.decode('utf8') if e.stderr else str(e)}"
@@ -1363,202 +3122,146 @@ def add_b_roll(main_video_path: str, broll_clips: list[dict], output_video_path:
     valid_transitions = {'fade', 'slide_left', 'slide_right', 'slide_up', 'slide_down'}
     
     try:
-        # Create a temporary directory for intermediate files
-        temp_dir = tempfile.mkdtemp()
+        main_props = _get_media_properties(main_video_path)
+        if not main_props['has_video']:
+            return f"Error: Main video {main_video_path} has no video stream."
+            
+        # Get main video dimensions 
+        main_width = main_props['width']
+        main_height = main_props['height']
         
-        try:
-            main_props = _get_media_properties(main_video_path)
-            if not main_props['has_video']:
-                return f"Error: Main video {main_video_path} has no video stream."
-                
-            # Get main video dimensions 
-            main_width = main_props['width']
-            main_height = main_props['height']
+        # Collect every B-roll clip; scaling, fades and timing are all applied inside the final graph
+        clips = []
+        
+        for broll_item in sorted(broll_clips, key=lambda x: _parse_time_to_seconds(x['insert_at_timestamp'])):
+            clip_path = broll_item['clip_path']
+            stream_error = _stream_input_error(clip_path)
+            if stream_error:
+                return f"Error: {stream_error}"
+            if not os.path.exists(clip_path):
+                return f"Error: B-roll clip not found at {clip_path}"
             
-            # First pass: Process each B-roll clip individually
-            processed_clips = []
+            broll_props = _get_media_properties(clip_path)
+            if not broll_props['has_video']:
+                continue
             
-            for i, broll_item in enumerate(sorted(broll_clips, key=lambda x: _parse_time_to_seconds(x['insert_at_timestamp']))):
-                clip_path = broll_item['clip_path']
-                if not os.path.exists(clip_path):
-                    return f"Error: B-roll clip not found at {clip_path}"
-                
-                broll_props = _get_media_properties(clip_path)
-                if not broll_props['has_video']:
-                    continue
-                
-                # Process timestamps
-                start_time = _parse_time_to_seconds(broll_item['insert_at_timestamp'])
-                duration = _parse_time_to_seconds(broll_item.get('duration', str(broll_props['duration'])))
-                position = broll_item.get('position', 'fullscreen')
-                
-                if position not in valid_positions:
-                    return f"Error: Invalid position '{position}' for B-roll {clip_path}"
-                
-                # Create a processed version of this clip
-                temp_clip = os.path.join(temp_dir, f"processed_broll_{i}.mp4")
-                scale_factor = broll_item.get('scale', 1.0 if position == 'fullscreen' else 0.5)
-                
-                # Apply scaling based on position
-                scale_filter_parts = []
-                
-                if position == 'fullscreen':
-                    scale_filter_parts.append(f"scale={main_width}:{main_height}")
-                else:
-                    scale_filter_parts.append(f"scale=iw*{scale_factor}:ih*{scale_factor}")
-                
-                # Add fade transitions if specified
-                transition_in = broll_item.get('transition_in')
-                transition_out = broll_item.get('transition_out')
-                transition_duration = float(broll_item.get('transition_duration', 0.5))
-                
-                if transition_in == 'fade':
-                    scale_filter_parts.append(f"fade=t=in:st=0:d={transition_duration}")
-                
-                if transition_out == 'fade':
-                    # Calculate fade out start time 
-                    fade_out_start = max(0, float(broll_props['duration']) - transition_duration)
-                    scale_filter_parts.append(f"fade=t=out:st={fade_out_start}:d={transition_duration}")
-                
-                # Convert filters list to string
-                filter_string = ",".join(scale_filter_parts)
-                
-                # Process the b-roll clip
-                try:
-                    subprocess.run([
-                        'ffmpeg', 
-                        '-i', clip_path,
-                        '-vf', filter_string,
-                        '-c:v', 'libx264', 
-                        '-c:a', 'aac',
-                        '-y',  # Overwrite output if exists
-                        temp_clip
-                    ], check=True, capture_output=True)
-                except subprocess.CalledProcessError as e:
-                    return f"Error processing B-roll {i}: {e.stderr.decode('utf8') if e.stderr else str(e)}"
-                
-                # Calculate overlay coordinates based on position
-                overlay_x = "0"
-                overlay_y = "0"
-                
-                if position == 'top-left':
-                    overlay_x, overlay_y = "10", "10" 
-                elif position == 'top-right':
-                    overlay_x, overlay_y = f"W-w-10", "10"  # W=main width, w=overlay width
-                elif position == 'bottom-left':
-                    overlay_x, overlay_y = "10", "H-h-10"  # H=main height, h=overlay height
-                elif position == 'bottom-right':
-                    overlay_x, overlay_y = "W-w-10", "H-h-10"
-                elif position == 'center':
-                    overlay_x, overlay_y = "(W-w)/2", "(H-h)/2"
-                
-                # Store clip info with processed path
-                processed_clips.append({
-                    'path': temp_clip,
-                    'start_time': start_time,
-                    'duration': duration,
-                    'position': position,
-                    'overlay_x': overlay_x,
-                    'overlay_y': overlay_y,
-                    'transition_in': transition_in,
-                    'transition_out': transition_out,
-                    'transition_duration': transition_duration,
-                    'audio_mix': float(broll_item.get('audio_mix', 0.0))
-                })
+            # Process timestamps
+            start_time = _parse_time_to_seconds(broll_item['insert_at_timestamp'])
+            duration = _parse_time_to_seconds(broll_item.get('duration', str(broll_props['duration'])))
+            position = broll_item.get('position', 'fullscreen')
             
-            # Second pass: Create a filter complex for all clips
-            if not processed_clips:
-                # No valid clips to process
-                try:
-                    shutil.copy(main_video_path, output_video_path)
-                    return f"No valid B-roll clips to overlay. Main video copied to {output_video_path}"
-                except Exception as e:
-                    return f"No valid B-roll clips, but error copying main video: {str(e)}"
+            if position not in valid_positions:
+                return f"Error: Invalid position '{position}' for B-roll {clip_path}"
             
-            # Build filter string for second pass
-            filter_parts = []
+            scale_factor = broll_item.get('scale', 1.0 if position == 'fullscreen' else 0.5)
             
-            # Reference the main video
-            main_overlay = "[0:v]"
+            # Apply scaling based on position
+            clip_filter_parts = []
             
-            # Add each overlay
-            for i, clip in enumerate(processed_clips):
-                # Create unique labels
-                current_label = f"[v{i}]"
-                overlay_index = i + 1  # Start from 1 as 0 is main video
-                
-                # Basic overlay without slide transitions
-                if not (('slide' in clip['transition_in']) or ('slide' in clip['transition_out'])):
-                    # Simple overlay with enable expression
-                    overlay_filter = (
-                        f"{main_overlay}[{overlay_index}:v]overlay="
-                        f"x={clip['overlay_x']}:y={clip['overlay_y']}:"
-                        f"enable='between(t,{clip['start_time']},{clip['start_time'] + clip['duration']})'")
-                    
-                    if i < len(processed_clips) - 1:
-                        overlay_filter += current_label
-                        main_overlay = current_label
-                    else:
-                        # Last overlay, output directly
-                        overlay_filter += "[v]"
-                    
-                    filter_parts.append(overlay_filter)
-                else:
-                    # For slide transitions, we'll use a simplified approach
-                    # with basic enable condition only
-                    overlay_filter = (
-                        f"{main_overlay}[{overlay_index}:v]overlay="
-                        f"x={clip['overlay_x']}:y={clip['overlay_y']}:"
-                        f"enable='between(t,{clip['start_time']},{clip['start_time'] + clip['duration']})'")
-                    
-                    if i < len(processed_clips) - 1:
-                        overlay_filter += current_label
-                        main_overlay = current_label
-                    else:
-                        overlay_filter += "[v]"
-                    
-                    filter_parts.append(overlay_filter)
+            if position == 'fullscreen':
+                clip_filter_parts.append(f"scale={main_width}:{main_height}")
+            else:
+                clip_filter_parts.append(f"scale=iw*{scale_factor}:ih*{scale_factor}")
             
-            # Combine filter parts
-            filter_complex = ";".join(filter_parts)
+            # Add fade transitions if specified
+            transition_in = broll_item.get('transition_in')
+            transition_out = broll_item.get('transition_out')
+            transition_duration = float(broll_item.get('transition_duration', 0.5))
             
-            # Audio handling
-            audio_output = []
+            if transition_in == 'fade':
+                clip_filter_parts.append(f"fade=t=in:st=0:d={transition_duration}")
             
-            # If any clip has audio_mix > 0, we would add audio mixing here
-            # For simplicity, we'll just use the main audio track
-            if main_props['has_audio']:
-                audio_output = ['-map', '0:a']
+            if transition_out == 'fade':
+                # Fade out at the end of the visible window (the clip is cut to 'duration')
+                visible_duration = min(duration, float(broll_props['duration']))
+                fade_out_start = max(0, visible_duration - transition_duration)
+                clip_filter_parts.append(f"fade=t=out:st={fade_out_start}:d={transition_duration}")
             
-            # Prepare input files
-            input_files = ['-i', main_video_path]
-            for clip in processed_clips:
-                input_files.extend(['-i', clip['path']])
+            # Shift the clip onto the main timeline so overlay consumes it exactly at its insert point
+            clip_filter_parts.append(f"setpts=PTS-STARTPTS+{start_time}/TB")
             
-            # Build the final command
-            cmd = [
-                'ffmpeg',
-                *input_files,
-                '-filter_complex', filter_complex,
-                '-map', '[v]',
-                *audio_output,
-                '-c:v', 'libx264',
-                '-c:a', 'aac',
-                '-y',
-                output_video_path
-            ]
+            # Calculate overlay coordinates based on position
+            overlay_x = "0"
+            overlay_y = "0"
+            
+            if position == 'top-left':
+                overlay_x, overlay_y = "10", "10" 
+            elif position == 'top-right':
+                overlay_x, overlay_y = f"W-w-10", "10"  # W=main width, w=overlay width
+            elif position == 'bottom-left':
+                overlay_x, overlay_y = "10", "H-h-10"  # H=main height, h=overlay height
+            elif position == 'bottom-right':
+                overlay_x, overlay_y = "W-w-10", "H-h-10"
+            elif position == 'center':
+                overlay_x, overlay_y = "(W-w)/2", "(H-h)/2"
             
-            # Run final command
+            clips.append({
+                'path': clip_path,
+                'filter': ",".join(clip_filter_parts),
+                'start_time': start_time,
+                'duration': duration,
+                'overlay_x': overlay_x,
+                'overlay_y': overlay_y,
+            })
+        
+        if not clips:
+            # No valid clips to process
             try:
-                subprocess.run(cmd, check=True, capture_output=True)
-                return f"B-roll clips added successfully as overlays. Output at {output_video_path}"
-            except subprocess.CalledProcessError as e:
-                error_message = e.stderr.decode('utf8') if e.stderr else str(e)
-                return f"Error in final B-roll composition: {error_message}"
+                shutil.copy(main_video_path, output_video_path)
+                return f"No valid B-roll clips to overlay. Main video copied to {output_video_path}"
+            except Exception as e:
+                return f"No valid B-roll clips, but error copying main video: {str(e)}"
         
-        finally:
-            # Clean up temporary directory
-            shutil.rmtree(temp_dir)
+        # Build one filter graph: prepare each clip, then chain the overlays on the main video.
+        # Slide transitions are not animated yet; those clips are overlaid with their enable window.
+        filter_parts = []
+        main_overlay = "[0:v]"
+        for i, clip in enumerate(clips):
+            input_index = i + 1  # Start from 1 as 0 is main video
+            filter_parts.append(f"[{input_index}:v]{clip['filter']}[b{i}]")
+            output_label = f"[v{i}]" if i < len(clips) - 1 else "[v]"
+            filter_parts.append(
+                f"{main_overlay}[b{i}]overlay="
+                f"x={clip['overlay_x']}:y={clip['overlay_y']}:eof_action=pass:"
+                f"enable='between(t,{clip['start_time']},{clip['start_time'] + clip['duration']})'"
+                f"{output_label}")
+            main_overlay = output_label
+        
+        filter_complex = ";".join(filter_parts)
+        
+        # Audio handling: the main audio track is used; B-roll audio is not mixed in
+        audio_output = []
+        if main_props['has_audio']:
+            audio_output = ['-map', '0:a']
+        
+        # Prepare input files. Each B-roll input is cut to its window with '-t', so ffmpeg stops
+        # demuxing and decoding it once the window ends; together with the setpts shift, a clip is
+        # decoded only for the seconds it is actually visible.
+        input_files = ['-i', main_video_path]
+        for clip in clips:
+            input_files.extend(['-t', f"{clip['duration']:.6f}", '-i', clip['path']])
+        
+        # Build the final command: one decode per source and a single encode
+        cmd = [
+            'ffmpeg',
+            *input_files,
+            '-filter_complex', filter_complex,
+            '-map', '[v]',
+            *audio_output,
+            '-c:v', 'libx264',
+            '-c:a', 'aac',
+            *_encode_args(output_video_path, encode_profile, 'libx264'),
+            '-y',
+            output_video_path
+        ]
+        
+        # Run final command
+        try:
+            _run_ffmpeg(cmd)
+            return f"B-roll clips added successfully as overlays. Output at {output_video_path}"
+        except ffmpeg.Error as e:
+            error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+            return f"Error in final B-roll composition: {error_message}"
     
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -1571,7 +3274,10 @@ def add_b_roll(main_video_path: str, broll_clips: list[dict], output_video_path:
         return f"An unexpected error occurred in add_b_roll: {str(e)}"
 
 @mcp.tool()
-def add_basic_transitions(video_path: str, output_video_path: str, transition_type: str, duration_seconds: float) -> str:
+@_in_worker
+@_result_cached
+def add_basic_transitions(video_path: str, output_video_path: str, transition_type: str, duration_seconds: float,
+                          encode_profile: str = None) -> str:
     """Adds basic fade transitions to the beginning or end of a video.
 
     Args:
@@ -1580,9 +3286,17 @@ def add_basic_transitions(video_path: str, output_video_path: str, transition_ty
         transition_type: Type of transition. Options: 'fade_in', 'fade_out'.
                          (Note: 'crossfade_from_black' is like 'fade_in', 'crossfade_to_black' is like 'fade_out')
         duration_seconds: Duration of the fade effect in seconds.
+        encode_profile: Speed/quality profile for the video re-encode ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
     Returns:
         A status message indicating success or failure.
     """
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    stream_error = _stream_input_error(video_path)
+    if stream_error:
+        return f"Error: {stream_error}"
     if not os.path.exists(video_path):
         return f"Error: Input video file not found at {video_path}"
     if duration_seconds <= 0:
@@ -1609,7 +3323,6 @@ def add_basic_transitions(video_path: str, output_video_path: str, transition_ty
         else:
             return f"Error: Unsupported transition_type '{transition_type}'. Supported: 'fade_in', 'fade_out'."
 
-        # Attempt to copy audio, fallback to re-encoding if necessary
         output_streams = []
         if props['has_video']:
             output_streams.append(processed_video)
@@ -1620,19 +3333,15 @@ def add_basic_transitions(video_path: str, output_video_path: str, transition_ty
         
         if not output_streams:
             return "Error: No suitable video or audio streams found to apply transition."
-
-        try:
-            ffmpeg.output(*output_streams, output_video_path, acodec='copy').run(capture_stdout=True, capture_stderr=True)
-            return f"Transition '{transition_type}' applied successfully (audio copied). Output: {output_video_path}"
-        except ffmpeg.Error as e_acopy:
-            # Fallback: re-encode audio (or just output video if no audio originally)
-            try:
-                ffmpeg.output(*output_streams, output_video_path).run(capture_stdout=True, capture_stderr=True)
-                return f"Transition '{transition_type}' applied successfully (audio re-encoded/processed). Output: {output_video_path}"
-            except ffmpeg.Error as e_recode:
-                err_acopy = e_acopy.stderr.decode('utf8') if e_acopy.stderr else str(e_acopy)
-                err_recode = e_recode.stderr.decode('utf8') if e_recode.stderr else str(e_recode)
-                return f"Error applying transition. Audio copy failed: {err_acopy}. Full re-encode failed: {err_recode}."
+        encode_options = _encode_options(output_video_path, encode_profile)
+        copy_audio = None
+        if props['has_audio']:
+            # The audio is passed through untouched, so copy it when the output container accepts it
+            copy_audio = _stream_copy_plan(video_path, output_video_path)['audio']
+            if copy_audio:
+                encode_options['acodec'] = 'copy'
+        _run_ffmpeg(ffmpeg.output(*output_streams, output_video_path, **encode_options))
+        return f"Transition '{transition_type}' applied successfully ({_copy_mode(copied_audio=copy_audio) or 'no audio'}). Output: {output_video_path}"
 
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -1644,6 +3353,527 @@ def add_basic_transitions(video_path: str, output_video_path: str, transition_ty
     except Exception as e:
         return f"An unexpected error occurred in add_basic_transitions: {str(e)}"
 
+# --- Edit Pipeline ---
+# Compiles an ordered list of edits into one filtergraph so the source is decoded once and
+# encoded once, instead of once per tool call with an intermediate file in between.
+PIPELINE_VIDEO_OPS = {'resolution', 'frame_rate', 'speed', 'subtitles', 'text', 'image_overlay', 'fade_in', 'fade_out'}
+PIPELINE_AUDIO_OPS = {'speed'}
+
+def _compile_pipeline(video_path: str, operations: list) -> dict:
+    """Turns render_pipeline operations into ffmpeg input/filter arguments.
+
+    Returns a dict with 'input_args' (seek options for the main input), 'extra_inputs',
+    'video_chain' and 'audio_chain' (filtergraph strings, or None when the stream is untouched)
+    and the resulting 'duration'. Raises ValueError for unknown or malformed operations.
+    """
+    props = _get_media_properties(video_path)
+    timeline = props['duration']
+    input_args = []
+    extra_inputs = []
+    video_parts = []  # Completed, labelled filtergraph segments
+    video_filters = []  # Filters of the segment currently being built
+    video_label = "[0:v]"
+    audio_filters = []
+
+    for index, operation in enumerate(operations):
+        op = operation.get('op')
+        if op is None:
+            raise ValueError(f"Operation {index} has no 'op' key.")
+        if op in PIPELINE_VIDEO_OPS and not props['has_video']:
+            raise ValueError(f"Operation '{op}' needs a video stream, but {video_path} has none.")
+
+        if op == 'trim':
+            if index != 0:
+                raise ValueError("'trim' must be the first operation so it can be applied as an input seek.")
+            start = _parse_time_to_seconds(str(operation.get('start_time', 0)))
+            end = _parse_time_to_seconds(str(operation['end_time'])) if operation.get('end_time') is not None else timeline
+            end = min(end, timeline)
+            if end <= start:
+                raise ValueError(f"Trim end ({end}s) must be after its start ({start}s).")
+            input_args = ['-ss', f"{start:.6f}", '-t', f"{end - start:.6f}"]
+            timeline = end - start
+        elif op == 'resolution':
+            video_filters.append(_scale_filter(str(operation['resolution'])))
+        elif op == 'frame_rate':
+            video_filters.append(f"fps={operation['frame_rate']}")
+        elif op == 'speed':
+            speed_factor = float(operation['speed_factor'])
+            if speed_factor <= 0:
+                raise ValueError("Speed factor must be positive.")
+            if props['has_video']:
+                video_filters.append(f"setpts={1.0 / speed_factor}*PTS")
+            audio_filters.extend(f"atempo={factor}" for factor in _atempo_factors(speed_factor))
+            timeline /= speed_factor
+        elif op == 'subtitles':
+            if not os.path.exists(operation['srt_file_path']):
+                raise ValueError(f"SRT subtitle file not found at {operation['srt_file_path']}")
+            video_filters.append(_subtitles_filter(operation['srt_file_path'], operation.get('font_style')))
+        elif op == 'text':
+            video_filters.append(_drawtext_filter(operation['text_elements']))
+        elif op == 'image_overlay':
+            image_path = operation['image_path']
+            if not os.path.exists(image_path):
+                raise ValueError(f"Overlay image file not found at {image_path}")
+            extra_inputs.append(image_path)
+            input_index = len(extra_inputs)
+            image_filters = []
+            width, height = operation.get('width'), operation.get('height')
+            if width or height:
+                image_filters.append(f"scale={width or -1}:{height or -1}")
+            opacity = operation.get('opacity')
+            if opacity is not None and 0.0 <= opacity <= 1.0:
+                image_filters.extend(["format=rgba", f"colorchannelmixer=aa={opacity}"])
+            image_label = f"[img{input_index}]"
+            video_parts.append(f"[{input_index}:v]{','.join(image_filters) or 'null'}{image_label}")
+
+            # Close the current segment so the overlay can take it as its main input
+            base_label = f"[pre{input_index}]"
+            video_parts.append(f"{video_label}{','.join(video_filters) or 'null'}{base_label}")
+            video_filters = []
+            overlay_x, overlay_y = _overlay_coordinates(operation.get('position', 'top_right'))
+            overlay = f"overlay=x={overlay_x}:y={overlay_y}"
+            start_time, end_time = operation.get('start_time'), operation.get('end_time')
+            if start_time is not None or end_time is not None:
+                actual_start_time = start_time if start_time is not None else '0'
+                if end_time is not None:
+                    overlay += f":enable='between(t,{actual_start_time},{end_time})'"
+                else:
+                    overlay += f":enable='gte(t,{actual_start_time})'"
+            video_label = f"[ov{input_index}]"
+            video_parts.append(f"{base_label}{image_label}{overlay}{video_label}")
+        elif op in ('fade_in', 'fade_out'):
+            duration = float(operation['duration'])
+            if duration <= 0 or duration > timeline:
+                raise ValueError(f"Fade duration ({duration}s) must be positive and at most the clip length ({timeline:.3f}s).")
+            if op == 'fade_in':
+                video_filters.append(f"fade=t=in:st=0:d={duration}")
+            else:
+                video_filters.append(f"fade=t=out:st={timeline - duration:.6f}:d={duration}")
+        else:
+            raise ValueError(f"Unsupported operation '{op}'. Supported: trim, {', '.join(sorted(PIPELINE_VIDEO_OPS))}.")
+
+    touches_video = any(operation['op'] in PIPELINE_VIDEO_OPS for operation in operations)
+    touches_audio = any(operation['op'] in PIPELINE_AUDIO_OPS for operation in operations)
+    video_chain = None
+    if touches_video:
+        video_parts.append(f"{video_label}{','.join(video_filters) or 'null'}[vout]")
+        video_chain = ";".join(video_parts)
+    audio_chain = None
+    if touches_audio and props['has_audio']:
+        audio_chain = f"[0:a]{','.join(audio_filters)}[aout]"
+
+    return {
+        'input_args': input_args,
+        'extra_inputs': extra_inputs,
+        'video_chain': video_chain,
+        'audio_chain': audio_chain,
+        'has_video': props['has_video'],
+        'has_audio': props['has_audio'],
+        'duration': timeline,
+    }
+
+@mcp.tool()
+@_in_worker
+@_result_cached
+def render_pipeline(video_path: str, output_video_path: str, operations: list[dict],
+                    encode_profile: str = None) -> str:
+    """Applies an ordered list of edits in a single ffmpeg pass (one decode, one encode).
+
+    Use this instead of chaining trim_video, set_video_resolution, add_subtitles, add_image_overlay,
+    add_basic_transitions, etc.: no intermediate files are written and quality is lost only once.
+    Each operation acts on the timeline produced by the previous ones (e.g. a fade_out after a
+    trim fades out the end of the trimmed clip).
+
+    Args:
+        video_path: Path to the input video file.
+        output_video_path: Path to save the rendered video.
+        operations: A list of dicts, each with an 'op' key and that operation's parameters:
+            - {'op': 'trim', 'start_time': str, 'end_time': str} (must be first)
+            - {'op': 'resolution', 'resolution': '1280x720' or '720'}
+            - {'op': 'frame_rate', 'frame_rate': 30}
+            - {'op': 'speed', 'speed_factor': 1.5} (video and audio)
+            - {'op': 'subtitles', 'srt_file_path': str, 'font_style': dict} (font_style as in add_subtitles)
+            - {'op': 'text', 'text_elements': list[dict]} (elements as in add_text_overlay)
+            - {'op': 'image_overlay', 'image_path': str, 'position', 'opacity', 'start_time', 'end_time',
+              'width', 'height'} (as in add_image_overlay)
+            - {'op': 'fade_in', 'duration': 1.0} / {'op': 'fade_out', 'duration': 1.0}
+        encode_profile: Speed/quality profile for the video encode ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
+    Returns:
+        A status message indicating success or failure, and which streams were stream-copied.
+    """
+    stream_error = _stream_input_error(video_path)
+    if stream_error:
+        return f"Error: {stream_error}"
+    if not os.path.exists(video_path):
+        return f"Error: Input video file not found at {video_path}"
+    if not isinstance(operations, list):
+        return "Error: operations must be a list of dicts."
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+
+    try:
+        plan = _compile_pipeline(video_path, operations)
+    except (ValueError, KeyError) as e:
+        return f"Error in pipeline operations: {str(e)}"
+    except RuntimeError as e:
+        return f"Runtime error during pipeline compilation: {str(e)}"
+
+    # Decide once which streams can be copied: a stream with no filters applied is copied as-is,
+    # as long as the output container accepts its codec.
+    try:
+        copy_plan = _stream_copy_plan(video_path, output_video_path)
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+        return f"Error probing {video_path}: {error_message}"
+    copy_video = plan['has_video'] and plan['video_chain'] is None and copy_plan['video']
+    copy_audio = plan['has_audio'] and plan['audio_chain'] is None and copy_plan['audio']
+
+    cmd = ['ffmpeg', *plan['input_args'], '-i', video_path]
+    for image_path in plan['extra_inputs']:
+        cmd.extend(['-i', image_path])
+    filter_chains = [chain for chain in (plan['video_chain'], plan['audio_chain']) if chain]
+    if filter_chains:
+        cmd.extend(['-filter_complex', ";".join(filter_chains)])
+    if plan['has_video']:
+        cmd.extend(['-map', '[vout]' if plan['video_chain'] else '0:v:0'])
+        if copy_video:
+            cmd.extend(['-c:v', 'copy'])
+        else:
+            cmd.extend(_encode_args(output_video_path, encode_profile))
+    if plan['has_audio']:
+        cmd.extend(['-map', '[aout]' if plan['audio_chain'] else '0:a:0'])
+        if copy_audio:
+            cmd.extend(['-c:a', 'copy'])
+    cmd.extend(['-y', output_video_path])
+
+    copied = [name for name, is_copied in (('video', copy_video), ('audio', copy_audio)) if is_copied]
+    mode = f"{' and '.join(copied)} stream-copied" if copied else "fully re-encoded"
+    try:
+        _run_ffmpeg(cmd)
+        return f"Pipeline of {len(operations)} operation(s) rendered in one pass ({mode}) to {output_video_path}"
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+        return f"Error rendering pipeline: {error_message}"
+    except Exception as e:
+        return f"An unexpected error occurred in render_pipeline: {str(e)}"
+
+# --- Rendition Ladder ---
+
+@mcp.tool()
+@_in_worker
+def transcode_ladder(video_path: str, renditions: list[dict], audio_output_path: str = None,
+                     audio_bitrate: str = '128k', allow_upscale: bool = False, encode_profile: str = None) -> str:
+    """Encodes several renditions of a video (and optionally an audio-only track) in one ffmpeg process.
+    The source is decoded once and the decoded frames are split to every rendition's scaler and encoder.
+
+    Args:
+        video_path: Path to the input video file.
+        renditions: A list of dicts, one per output, with keys:
+            - 'output_path': str (required)
+            - 'resolution': str (required), e.g. '1920x1080' or '720' for height with proportional width
+            - 'video_bitrate': str, e.g. '3M'. Optional; the encode profile's CRF is used otherwise.
+            - 'audio_bitrate': str, e.g. '128k'. Optional; defaults to audio_bitrate.
+            - 'video_codec': str, e.g. 'libx264'. Optional; ffmpeg's default for the container otherwise.
+            - 'frame_rate': int. Optional.
+        audio_output_path: Path for an additional audio-only output (e.g. 'audio.m4a'). Optional.
+        audio_bitrate: Default audio bitrate for every output.
+        allow_upscale: If False (default), renditions taller than the source are skipped.
+        encode_profile: Speed/quality profile for the video encodes ('draft', 'preview', 'standard', 'publish').
+                        Defaults to VIDEO_AUDIO_ENCODE_PROFILE.
+    Returns:
+        A status message listing the outputs written (and any skipped renditions), or an error.
+    """
+    stream_error = _stream_input_error(video_path)
+    if stream_error:
+        return f"Error: {stream_error}"
+    if not os.path.exists(video_path):
+        return f"Error: Input video file not found at {video_path}"
+    if not renditions and not audio_output_path:
+        return "Error: No renditions or audio output requested."
+    profile_error = _check_encode_profile(encode_profile)
+    if profile_error:
+        return profile_error
+    for i, rendition in enumerate(renditions or []):
+        if not rendition.get('output_path') or not rendition.get('resolution'):
+            return f"Error: Rendition {i} needs 'output_path' and 'resolution'."
+
+    try:
+        props = _get_media_properties(video_path)
+        if renditions and not props['has_video']:
+            return f"Error: {video_path} has no video stream to build renditions from."
+        if audio_output_path and not props['has_audio']:
+            return f"Error: {video_path} has no audio stream for the audio-only output."
+
+        selected, skipped = [], []
+        for rendition in renditions or []:
+            resolution = str(rendition['resolution'])
+            target_height = int(resolution.split('x')[-1])
+            if target_height > props['height'] and not allow_upscale:
+                skipped.append(rendition['output_path'])
+            else:
+                selected.append(rendition)
+        if not selected and not audio_output_path:
+            return f"Error: Every rendition is taller than the source ({props['height']}p); set allow_upscale to encode them."
+
+        cmd = ['ffmpeg', '-i', video_path]
+        if selected:
+            split_labels = "".join(f"[split{i}]" for i in range(len(selected)))
+            filter_parts = [f"[0:v]split={len(selected)}{split_labels}"]
+            for i, rendition in enumerate(selected):
+                filters = [_scale_filter(str(rendition['resolution']))]
+                if rendition.get('frame_rate'):
+                    filters.append(f"fps={rendition['frame_rate']}")
+                filter_parts.append(f"[split{i}]{','.join(filters)}[v{i}]")
+            cmd.extend(['-filter_complex', ";".join(filter_parts)])
+
+        for i, rendition in enumerate(selected):
+            output_path = rendition['output_path']
+            video_codec = rendition.get('video_codec')
+            video_bitrate = rendition.get('video_bitrate')
+            cmd.extend(['-map', f"[v{i}]"])
+            if props['has_audio']:
+                cmd.extend(['-map', '0:a:0', '-b:a', rendition.get('audio_bitrate', audio_bitrate)])
+            if video_codec:
+                cmd.extend(['-c:v', video_codec])
+            if video_bitrate:
+                cmd.extend(['-b:v', video_bitrate])
+            cmd.extend([*_encode_args(output_path, encode_profile, video_codec, video_bitrate), '-y', output_path])
+        if audio_output_path:
+            cmd.extend(['-map', '0:a:0', '-vn', '-b:a', audio_bitrate, '-y', audio_output_path])
+
+        _run_ffmpeg(cmd)
+        written = [rendition['output_path'] for rendition in selected] + ([audio_output_path] if audio_output_path else [])
+        message = f"Ladder encoded in one pass ({len(written)} outputs): {', '.join(written)}"
+        if skipped:
+            message += f". Skipped (taller than the {props['height']}p source): {', '.join(skipped)}"
+        return message
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+        return f"Error encoding ladder: {error_message}"
+    except ValueError as e:
+        return f"Error with input values (e.g., resolution format): {str(e)}"
+    except RuntimeError as e:
+        return f"Runtime error during ladder encoding: {str(e)}"
+    except Exception as e:
+        return f"An unexpected error occurred in transcode_ladder: {str(e)}"
+
+# --- Batch Tools ---
+# Runs one single-file tool over many inputs in a single call: inputs are probed once up front,
+# items run on a bounded pool (ffmpeg processes stay capped by the execution layer) and progress is
+# reported for the batch as a whole.
+
+def _batch_io_params(func) -> tuple:
+    """Returns the names of a tool's input path parameter (its first parameter) and output path parameter
+    (its first 'output_..._path' one, as for the result cache), or None if it lacks either."""
+    names = list(inspect.signature(func).parameters)
+    output_param = next((name for name in names if name.startswith('output_') and name.endswith('_path')), None)
+    if output_param is None or names[0] == output_param or not names[0].endswith('_path'):
+        return None
+    return names[0], output_param
+
+@mcp.tool()
+async def batch_process(tool_name: str, jobs: list[dict] = None, input_glob: str = None,
+                        output_dir: str = None, output_extension: str = None, arguments: dict = None,
+                        max_workers: int = None, ctx: Context = None) -> dict:
+    """Runs a single-file tool (e.g. set_audio_bitrate, set_video_resolution, convert_audio_format)
+    over many files in one call, on a bounded worker pool.
+
+    Args:
+        tool_name: The tool to run for every item. Its first parameter must be the input path and it
+                   needs an 'output_..._path' parameter, as with all the granular property tools.
+        jobs: A list of argument dicts, one per item, exactly as the tool would be called directly.
+              Use either jobs or input_glob.
+        input_glob: A glob pattern selecting the inputs (e.g. '/media/in/**/*.wav'; '**' is recursive).
+        output_dir: Directory for outputs in input_glob mode; each output keeps its input's file name.
+        output_extension: New extension for outputs in input_glob mode (e.g. 'mp3'). Optional.
+        arguments: Arguments shared by every item (e.g. {'bitrate': '128k'}). Per-job values win.
+        max_workers: Items processed at once. Defaults to VIDEO_AUDIO_BATCH_WORKERS.
+    Returns:
+        A dict with succeeded/failed counts and a per-item list of input, output and result message.
+    """
+    func = _job_tools.get(tool_name)
+    if func is None:
+        return {'error': f"Unknown tool '{tool_name}'. Available: {', '.join(sorted(_job_tools))}"}
+    io_params = _batch_io_params(func)
+    if io_params is None:
+        return {'error': f"Tool '{tool_name}' does not take an input and output path, so it cannot be batched."}
+    input_param, output_param = io_params
+    if (jobs is None) == (input_glob is None):
+        return {'error': "Provide exactly one of jobs or input_glob."}
+
+    if input_glob is not None:
+        if not output_dir:
+            return {'error': "output_dir is required with input_glob."}
+        input_paths = sorted(path for path in glob.glob(input_glob, recursive=True) if os.path.isfile(path))
+        if not input_paths:
+            return {'error': f"No files match {input_glob}"}
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = []
+        for path in input_paths:
+            name = os.path.basename(path)
+            if output_extension:
+                name = f"{os.path.splitext(name)[0]}.{output_extension.lstrip('.')}"
+            jobs.append({input_param: path, output_param: os.path.join(output_dir, name)})
+
+    items = []
+    signature = inspect.signature(func)
+    for i, job in enumerate(jobs):
+        kwargs = {**(arguments or {}), **job}
+        try:
+            signature.bind(**kwargs)
+        except TypeError as e:
+            return {'error': f"Invalid arguments for item {i} ({tool_name}): {str(e)}"}
+        items.append(kwargs)
+
+    total = len(items)
+    workers = max(1, min(max_workers or BATCH_WORKERS, total))
+    loop = asyncio.get_running_loop()
+
+    def run_item(kwargs):
+        input_path = kwargs[input_param]
+        try:
+            # Probing goes through the cache, so each input is probed once for the whole batch.
+            # Streams are left to the tool, since a probe would consume them.
+            if not _is_stream(input_path):
+                _probe_media(input_path)
+        except ffmpeg.Error as e:
+            return f"Error: Could not read {input_path}: {e.stderr.decode('utf8') if e.stderr else str(e)}"
+        try:
+            return func(**kwargs)
+        except Exception as e:
+            return f"An unexpected error occurred: {str(e)}"
+
+    results = [None] * total
+    # Items run on the shared tool pool, at most `workers` at a time. Waiting items hold no thread,
+    # so if the call is cancelled they are dropped and only the items already running finish.
+    slots = asyncio.Semaphore(workers)
+
+    async def run_indexed(i):
+        async with slots:
+            return i, await loop.run_in_executor(_tool_executor, run_item, items[i])
+
+    tasks = [asyncio.ensure_future(run_indexed(i)) for i in range(total)]
+    try:
+        done = 0
+        for next_done in asyncio.as_completed(tasks):
+            i, result = await next_done
+            results[i] = result
+            done += 1
+            if ctx is not None:
+                await ctx.report_progress(done, total)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    report = [{
+        'input': kwargs[input_param],
+        'output': kwargs[output_param],
+        'success': not _is_error_result(result),
+        'result': result,
+    } for kwargs, result in zip(items, results)]
+    succeeded = sum(1 for item in report if item['success'])
+    return {'tool': tool_name, 'total': total, 'succeeded': succeeded, 'failed': total - succeeded, 'results': report}
+
+# --- Background Job Tools ---
+
+@mcp.tool()
+def submit_job(tool_name: str, arguments: dict) -> dict:
+    """Submits any editing tool as a background job and returns its job ID immediately.
+
+    Args:
+        tool_name: Name of the tool to run (e.g., 'add_b_roll', 'remove_silence', 'concatenate_videos').
+        arguments: The keyword arguments for that tool, exactly as it would be called directly.
+    Returns:
+        A dict with the job ID and initial status, or an error message.
+    """
+    func = _job_tools.get(tool_name)
+    if func is None:
+        return {'error': f"Unknown tool '{tool_name}'. Available: {', '.join(sorted(_job_tools))}"}
+    try:
+        inspect.signature(func).bind(**arguments)
+    except TypeError as e:
+        return {'error': f"Invalid arguments for {tool_name}: {str(e)}"}
+
+    _prune_finished_jobs()
+    job = _Job(uuid.uuid4().hex, tool_name, arguments)
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+    job.future = _job_executor.submit(_execute_job, job, func)
+    return {'job_id': job.job_id, 'status': job.status}
+
+@mcp.tool()
+def get_job_status(job_id: str) -> dict:
+    """Returns the status, progress, ETA and (once finished) the result of a background job.
+
+    Args:
+        job_id: The ID returned by submit_job.
+    Returns:
+        A dict describing the job. progress_percent and eta_seconds refer to the ffmpeg
+        pass(es) currently running; multi-pass tools report passes_completed as well.
+    """
+    job = _jobs.get(job_id)
+    if job is None:
+        return {'error': f"Job not found: {job_id}"}
+    return job.to_dict()
+
+@mcp.tool()
+def list_jobs(status: str = None) -> list[dict]:
+    """Lists background jobs, optionally filtered by status.
+
+    Args:
+        status: One of 'queued', 'running', 'completed', 'failed', 'cancelled'. Optional.
+    Returns:
+        A list of job status dicts in submission order.
+    """
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    return [job.to_dict() for job in jobs if status is None or job.status == status]
+
+@mcp.tool()
+def cancel_job(job_id: str) -> dict:
+    """Cancels a queued or running background job, killing its ffmpeg process.
+    Output files the job had started writing are deleted; get_job_status lists them
+    under 'removed_partial_outputs'.
+
+    Args:
+        job_id: The ID returned by submit_job.
+    Returns:
+        A dict with the job ID and whether cancellation was requested.
+    """
+    job = _jobs.get(job_id)
+    if job is None:
+        return {'error': f"Job not found: {job_id}"}
+    cancelled = job.cancel()
+    return {'job_id': job_id, 'cancelled': cancelled, 'status': job.status}
+
+# --- Cache Tools ---
+
+@mcp.tool()
+def get_probe_cache_stats(clear: bool = False) -> dict:
+    """Returns hit/miss counters for the media probe cache, the keyframe/packet index and the result cache,
+    and scratch space usage.
+
+    Args:
+        clear: If True, empties the in-memory caches and resets the counters after reading them.
+    Returns:
+        A dict with entry count, hits, disk hits, misses and hit rate, plus 'packet_index', 'scratch' and
+        'result_cache' dicts.
+    """
+    stats = _probe_cache.stats()
+    with _packet_index_lock:
+        stats['packet_index'] = {'entries': len(_packet_indexes), **_packet_index_stats,
+                                 'index_dir': PACKET_INDEX_DIR if np is not None else None}
+        if clear:
+            _packet_indexes.clear()
+            _packet_index_stats.update(hits=0, disk_hits=0, builds=0)
+    if clear:
+        _probe_cache.clear()
+    stats['scratch'] = _scratch.snapshot()
+    stats['result_cache'] = _result_cache.stats()
+    return stats
+
 
 # Main execution block to run the server
 if __name__ == "__main__":